@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+
+# Benchmark the Shor-code sweep on every installed framework.
+# Usage: ./Shor_code_benchmark.py [--json out.json] [--csv out.csv] [--max-errors 1] [backend ...]
+#        ./Shor_code_benchmark.py [engine ...] --levels 1 2 3 [--max-bytes N]
+
+import argparse
+import itertools
+import math
+
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from shor_common.backends import BACKENDS
+from shor_common.benchmark import (STAGES, SCALING_ENGINES, SCALING_FIELDS, runBenchmarks, runScalingBenchmarks,
+                                   writeJson, writeCsv)
+
+nbqubits = 9
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark the Shor-code sweep per backend.")
+  parser.add_argument('backends', nargs='*', help="backends, or engines with --levels, to run (default: all)")
+  parser.add_argument('--json', help="write the records to this JSON file")
+  parser.add_argument('--csv', help="write the records to this CSV file")
+  parser.add_argument('--max-errors', type=int, default=1, help="largest number of errors per pattern")
+  parser.add_argument('--levels', type=int, nargs='+',
+                      help="scaling mode: run the concatenated code at these levels (9^level qubits)")
+  parser.add_argument('--max-bytes', type=int, default=2 ** 30,
+                      help="largest statevector an engine may allocate in scaling mode")
+  args = parser.parse_args()
+
+  if args.levels:
+    sys.exit(1 if scaling(args) else 0)
+
+  # Bloch sphere angles
+  inputValues = [{'theta': 0, 'phi': 0}, # |0>
+                 {'theta': math.pi, 'phi': math.pi}, # |1>
+                 {'theta': math.pi / 2, 'phi': 0}, # 1/sqrt(2) * ( |0> + |1> )
+                 {'theta': math.pi / 2, 'phi': 2}, # Phase should not matter
+                 {'theta': math.pi * 2 / 3, 'phi': 4}] # Uneven superposition
+  allErrorIdxs = []
+  for nrOfErrors in range(args.max_errors + 1):
+    allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
+
+  records = runBenchmarks(args.backends or list(BACKENDS), inputValues, allErrorIdxs)
+  for record in records:
+    if record['status'] != 'ok':
+      print(record['backend'] + ": " + record['status'])
+      continue
+    print(record['backend'] + ": " + str(record['jobs']) + " jobs in %.3f s, peak RSS %d kB" % (record['totalSeconds'], record['peakRssKb']))
+    for stage in STAGES:
+      print("    %-10s %.4f s" % (stage, record[stage + 'Seconds']))
+  if args.json:
+    writeJson(records, args.json)
+  if args.csv:
+    writeCsv(records, args.csv)
+  if any(record.get('failures') for record in records):
+    sys.exit(1)
+
+def scaling(args):
+  records = runScalingBenchmarks(args.backends or SCALING_ENGINES, args.levels, args.max_bytes)
+  for record in records:
+    line = "%-14s level %d (%5d qubits): " % (record['engine'], record['level'], record['nbqubits'])
+    if record['status'] != 'ok':
+      print(line + record['status'])
+      continue
+    print(line + "%.4f s, peak RSS %d kB, %d of %d patterns failed"
+          % (record['constructSeconds'] + record['simulateSeconds'], record['peakRssKb'], record['failures'],
+             record['patterns']))
+  if args.json:
+    writeJson(records, args.json)
+  if args.csv:
+    writeCsv(records, args.csv, SCALING_FIELDS)
+  # The number of failed patterns over all engines and levels.
+  return sum(record.get('failures', 0) for record in records)
+
+if __name__ == '__main__':
+  main()
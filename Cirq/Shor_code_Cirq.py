@@ -5,58 +5,22 @@ import cirq
 import numpy as np
 import itertools
 
-nbqubits = 9
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
 
-def PrepareState(circuit, qubits, inputValue):
-  circuit.append([
-                  cirq.Rx(inputValue['theta'])(qubits[0]),
-                  cirq.Rz(inputValue['phi'])(qubits[0])
-                 ])
+from shor_common import circuit_ir
+from shor_common.analysis import countsFromMeasurements
+from shor_common.verification import sequentialTest
+
+nbqubits = 9
 
-def BitFlipEncode(circuit, qubits, indices):
-  circuit.append([cirq.CNOT(qubits[indices[0]], qubits[indices[1]]),
-                  cirq.CNOT(qubits[indices[0]], qubits[indices[2]])])
-  
-def PhaseFlipEncode(circuit, qubits, indices):
-  BitFlipEncode(circuit, qubits, indices)
-  for idx in indices:
-    circuit.append(cirq.H(qubits[idx]))
-    
-def ErrorIntroduction(circuit, qubits, bitErrors):
-  for err in bitErrors:
-    circuit.append([cirq.X(qubits[err]),
-                  cirq.Z(qubits[err])])
-  
-def BitFlipDecode(circuit, qubits, indices):
-  circuit.append([cirq.CNOT(qubits[indices[0]], qubits[indices[1]]),
-                  cirq.CNOT(qubits[indices[0]], qubits[indices[2]]),
-                  cirq.TOFFOLI(qubits[indices[2]], qubits[indices[1]], qubits[indices[0]])])
- 
-def PhaseFlipDecode(circuit, qubits, indices):
-  for idx in indices:
-    circuit.append(cirq.H(qubits[idx]))
-  BitFlipDecode(circuit, qubits, indices)
-  
 def createProgram(nbqubits, inputValue, errorIdxs):
-  qubits = [cirq.GridQubit(0,i) for i in range(nbqubits)]
-  circuit = cirq.Circuit()
-  
-  PrepareState(circuit, qubits, inputValue)
-  
-  PhaseFlipEncode(circuit, qubits, [0,3,6])
-  BitFlipEncode(circuit, qubits, [0,1,2])
-  BitFlipEncode(circuit, qubits, [3,4,5])
-  BitFlipEncode(circuit, qubits, [6,7,8])
-  
-  ErrorIntroduction(circuit, qubits, errorIdxs)
-  
-  BitFlipDecode(circuit, qubits, [0,1,2])
-  BitFlipDecode(circuit, qubits, [3,4,5])
-  BitFlipDecode(circuit, qubits, [6,7,8])
-  PhaseFlipDecode(circuit, qubits, [0,3,6])
-  
-  circuit.append(cirq.measure(qubits[0], key='quantum state'))
-  return circuit
+  # The circuit is built once, in circuit_ir, and lowered to Cirq. Only the
+  # data qubit is measured, under the key 'q0'.
+  return circuit_ir.toCirq(circuit_ir.createProgram(inputValue, errorIdxs) + [('MEASURE', 0)], nbqubits)
 
 def _stateForInput(th, ph):
   ampl0 = complex(np.cos(ph/2) * np.cos(th/2), np.sin(ph/2) * np.cos(th/2) * -1)
@@ -64,7 +28,6 @@ def _stateForInput(th, ph):
   return [ampl0, ampl1]
   
 def testErrorCorrection():
-  numShots = 1024
   inputValues = [{'theta': 0, 'phi': 0}, #|0>
                  {'theta': np.pi, 'phi': np.pi}, #|1>
                  {'theta': np.pi/2, 'phi': np.pi/2} #|+>
@@ -79,25 +42,21 @@ def testErrorCorrection():
     for errorIdxs in allErrorIdxs:
       inputStateComplex = _stateForInput(inputValue['theta'], inputValue['phi'])
       
-      result = createProgram(nbqubits, inputValue, errorIdxs)
-      result = cirq.Simulator().run(result, repetitions=numShots)
+      circuit = createProgram(nbqubits, inputValue, errorIdxs)
+      simulator = cirq.Simulator()
       
-      prob_0 = 0
-      prob_1 = 0
-      for i in range(numShots):
-        if result.measurements['quantum state'][i][0] == 0:
-          prob_0 += 1
-        else:
-          prob_1 += 1
-      prob_0 /= numShots
-      prob_1 /= numShots
+      def sampleOnes(shots):
+        result = simulator.run(circuit, repetitions=shots)
+        return countsFromMeasurements(result.measurements['q0'])[1]
       
-      if abs(prob_0 - abs(inputStateComplex[0])**2) < 0.0001 and abs(prob_1 - abs(inputStateComplex[1])**2) < 0.0001:
+      # Draws shots until the frequency is certainly within (or outside) 0.05 of the expected one
+      passed, shots, (low, high) = sequentialTest(sampleOnes, abs(inputStateComplex[1])**2)
+      if passed:
         print("Error correction works")
       else:
         print("Error correction fails")
-        print("Might be due to simulation results, instead of probability distributions")
-        print("Found probabilities are:", prob_0, "and", prob_1)
+        print("Probability of 1 is between", low, "and", high, "after", shots, "shots")
         
 
-testErrorCorrection()
\ No newline at end of file
+if __name__ == '__main__':
+  testErrorCorrection()
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+
+# Shor-code sweep on any framework through the shared circuit representation.
+# Usage: ./Shor_code_driver.py [--cache DIR] [backend ...]   (default: every installed backend)
+
+import argparse
+import itertools
+import math
+
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from shor_common.backends import BACKENDS, availableBackends, runBackendSweep
+
+nbqubits = 9
+
+def testErrorCorrection(backendName, cacheDirectory=None):
+  # Bloch sphere angles
+  inputValues = [{'theta': 0, 'phi': 0}, # |0>
+                 {'theta': math.pi, 'phi': math.pi}, # |1>
+                 {'theta': math.pi / 2, 'phi': 0}, # 1/sqrt(2) * ( |0> + |1> )
+                 {'theta': math.pi / 2, 'phi': 2}, # Phase should not matter
+                 {'theta': math.pi * 2 / 3, 'phi': 4}] # Uneven superposition
+  allErrorIdxs = []
+  for nrOfErrors in range(2):
+    allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
+  failures = 0
+  for inputValue, errorIdxs, passed, fidelity in runBackendSweep(backendName, inputValues, allErrorIdxs,
+                                                                       cacheDirectory=cacheDirectory):
+    if not passed:
+      failures += 1
+      print("    Error correction wrong for input value " + str(inputValue)
+          + ", errors at indices " + str(errorIdxs) + ", fidelity " + str(fidelity))
+  if failures > 0:
+    print("Error: " + backendName + " failed " + str(failures) + " tests!")
+  else:
+    print("Success: all " + backendName + " tests passed!")
+  return failures
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Run the Shor-code sweep on one or more backends.")
+  parser.add_argument('backends', nargs='*', help="backends to run (default: every installed backend)")
+  parser.add_argument('--cache', help="directory of cached results; only changed circuits are simulated")
+  args = parser.parse_args()
+  backendNames = args.backends or availableBackends()
+  # The exit status is 1 when a test failed or a backend was unknown.
+  failed = False
+  for backendName in backendNames:
+    if backendName not in BACKENDS:
+      print("Unknown backend " + backendName + ", choose from " + ", ".join(BACKENDS))
+      failed = True
+      continue
+    if not BACKENDS[backendName].available():
+      print("Backend " + backendName + " is not installed, skipping.")
+      continue
+    print("Using backend " + backendName)
+    failed |= testErrorCorrection(backendName, args.cache) > 0
+  sys.exit(1 if failed else 0)
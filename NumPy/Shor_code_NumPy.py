@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+
+# Shor-code implementation on the native NumPy statevector engine
+
+import itertools
+import math
+
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from shor_common.statevec_util import *
+import numpy as np
+from shor_common.statevec_sim import runProgramBatch, dataQubitAmplitudesBatch, isCorrected
+from shor_common.sweep import sweepErrorWeights
+from shor_common.noise import sweepErrorProbabilities
+from shor_common.density_sim import logicalFidelity
+
+nbqubits = 9
+errorProbabilities = [0.001, 0.01, 0.05, 0.1]
+
+def testErrorCorrection():
+  # Bloch sphere angles
+  inputValues = [{'theta': 0, 'phi': 0}, # |0>
+                 {'theta': math.pi, 'phi': math.pi}, # |1>
+                 {'theta': math.pi / 2, 'phi': 0}, # 1/sqrt(2) * ( |0> + |1> )
+                 {'theta': math.pi / 2, 'phi': 2}, # Phase should not matter
+                 {'theta': math.pi * 2 / 3, 'phi': 4}] # Uneven superposition
+  failures = 0
+  # All inputs are propagated through the circuit in one batched pass per error pattern.
+  inputAngles = np.array([[v['theta'], v['phi']] for v in inputValues])
+  inputStates = statesForInputs(inputAngles[:, 0], inputAngles[:, 1])
+  allErrorIdxs = []
+  for nrOfErrors in range(2):
+    allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
+  # iterate over all possible combinations of errors
+  for errorIdxs in allErrorIdxs:
+    print("Introducing errors, indices " + str(errorIdxs))
+    amps = dataQubitAmplitudesBatch(runProgramBatch(inputAngles, errorIdxs, nbqubits))
+    fidelity, globalPhase, passed = compareStates(inputStates, amps)
+    for inputValue, inputStateComplex, (amp0, amp1), ok in zip(inputValues, inputStates, amps, passed):
+      print("    Using input value " + str(inputValue))
+      if ok:
+        print("    Error correction worked. Test succesful.")
+      else:
+        failures += 1
+        print("    Error correction wrong.\n"
+            + "    Expected amp(0) = " + str(inputStateComplex[0]) + ", got " + str(amp0) + "\n"
+            + "    Expected amp(1) = " + str(inputStateComplex[1]) + ", got " + str(amp1))
+  if failures > 0:
+    print("Error: test failed!")
+  else:
+    print("Success: all tests passed!")
+
+def reportWeightDistribution(maxWeight=3):
+  # Logical failures per error weight, for independent X, Y and Z errors on every qubit.
+  distribution, firstFailures = sweepErrorWeights(isCorrected, nbqubits, maxWeight)
+  for weight, (checked, failed) in sorted(distribution.items()):
+    print("Weight " + str(weight) + ": " + str(failed) + " of " + str(checked) + " patterns uncorrectable"
+        + (", e.g. " + str(firstFailures[weight]) if weight in firstFailures else ""))
+
+def reportLogicalErrorRates(channel='depolarizing', nbTrajectories=100000):
+  # Stochastic noise on every qubit between encoding and decoding.
+  inputValue = {'theta': math.pi * 2 / 3, 'phi': 4}
+  print("Mean logical infidelity for " + channel + " noise, " + str(nbTrajectories) + " trajectories per p:")
+  for p, infidelity, low, high in sweepErrorProbabilities(inputValue, channel, errorProbabilities, nbTrajectories):
+    exact = 1 - logicalFidelity(inputValue, channel, p)
+    print("    p = " + str(p) + ": " + "%.3g [%.3g, %.3g], exact %.3g" % (infidelity, low, high, exact))
+
+testErrorCorrection()
+reportWeightDistribution()
+reportLogicalErrorRates()
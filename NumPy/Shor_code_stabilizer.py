@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+
+# Syndrome-measurement Shor code on the stabilizer simulators
+
+import itertools
+
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from shor_common.shor_syndrome_code import prepareOps, runSyndromeCode, logicalFailures
+from shor_common.lookup_decoder import shorDecoder, errorMasks
+
+nbqubits = 9
+
+def testErrorCorrection():
+  # Only stabilizer states can be simulated: the six cardinal points of the Bloch sphere.
+  inputLabels = list(prepareOps.keys())
+  failures = 0
+  allErrorIdxs = []
+  for nrOfErrors in range(2):
+    allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
+  for inputLabel in inputLabels:
+    print("Using input state |" + inputLabel + ">")
+    # iterate over all possible combinations of errors
+    for errorIdxs in allErrorIdxs:
+      syndrome, corrected = runSyndromeCode(inputLabel, errorIdxs)
+      print("    Introducing errors, indices " + str(errorIdxs) + ", syndrome " + str(syndrome))
+      if corrected:
+        print("    Error correction worked. Test succesful.")
+      else:
+        failures += 1
+        print("    Error correction wrong.")
+  # The Pauli-frame sweep checks all patterns at once, independent of the input state.
+  frameFailures = logicalFailures(allErrorIdxs)
+  if frameFailures.any():
+    failures += int(frameFailures.sum())
+    print("Pauli-frame sweep found logical errors for " + str(frameFailures.sum()) + " patterns.")
+  # The lookup-table decoder classifies the same patterns without any simulation.
+  errors = errorMasks(allErrorIdxs, nbqubits)
+  tableFailures = shorDecoder().failures(errors, errors)
+  if (tableFailures != frameFailures).any():
+    failures += int((tableFailures != frameFailures).sum())
+    print("Lookup-table decoder disagrees with the Pauli-frame sweep for " + str((tableFailures != frameFailures).sum())
+          + " patterns.")
+  if failures > 0:
+    print("Error: test failed!")
+  else:
+    print("Success: all tests passed!")
+
+testErrorCorrection()
@@ -7,57 +7,37 @@ from projectq import ops
 import itertools
 import numpy as np 
 
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from shor_common import circuit_ir
+from shor_common.sampling import ShotSampler
+from shor_common.verification import sequentialTest
+
 nbqubits = 9
 errorProbability = 1
 errorAngle = 2*np.arcsin(np.sqrt(errorProbability))
 
-def PrepareState(qubits, inputValue):
-  ops.Rx(inputValue['theta']) | qubits[0]
-  ops.Rz(inputValue['phi']) | qubits[0]
-
-def BitFlipEncode(qubits, indices):
-  ops.CNOT | (qubits[indices[0]], qubits[indices[1]])
-  ops.CNOT | (qubits[indices[0]], qubits[indices[2]])
-
-def PhaseFlipEncode(qubits, indices):
-  BitFlipEncode(qubits, indices)
-  for idx in indices:
-      ops.H | qubits[idx]
-
-def ErrorIntroduction(qubits, bitErrors):
-  for err in bitErrors:
-      ops.X | qubits[err]
-      ops.Z | qubits[err]
-  
-def BitFlipDecode(qubits, indices):
-  ops.CNOT | (qubits[indices[0]], qubits[indices[1]])
-  ops.CNOT | (qubits[indices[0]], qubits[indices[2]])
-  ops.Toffoli | (qubits[indices[2]], qubits[indices[1]], qubits[indices[0]])
- 
-def PhaseFlipDecode(qubits, indices):
-  for idx in indices:
-      ops.H | qubits[idx]
-  BitFlipDecode(qubits, indices)
-  
 def createProgram(qubits, inputValue, errorIdxs):
-  PrepareState(qubits, inputValue)
-  
-  PhaseFlipEncode(qubits, [0,3,6])
-  BitFlipEncode(qubits, [0,1,2])
-  BitFlipEncode(qubits, [3,4,5])
-  BitFlipEncode(qubits, [6,7,8])
-  
-  ErrorIntroduction(qubits, errorIdxs)
-  
-  BitFlipDecode(qubits, [0,1,2])
-  BitFlipDecode(qubits, [3,4,5])
-  BitFlipDecode(qubits, [6,7,8])
-  PhaseFlipDecode(qubits, [0,3,6])
-  
-  ops.Measure | qubits[0] # Only the first bit is of importance. All others are to encode the state
-  ops.All(ops.Measure) | qubits[1:] # All other qubits should be zero
-  
-  return qubits
+  # The circuit is built once, in circuit_ir, and sent to the engine of qubits.
+  return circuit_ir.toProjectQ(circuit_ir.createProgram(inputValue, errorIdxs), qubits)
+
+def simulate(inputValue, errorIdxs):
+  # Simulate once and keep the final state: the shots are sampled from it
+  # instead of re-running the circuit per shot.
+  eng = MainEngine()
+  qubits = eng.allocate_qureg(nbqubits)
+  createProgram(qubits, inputValue, errorIdxs)
+  eng.flush()
+  # Qubits are allocated in order, so qubit 0 is the least significant bit.
+  _, state = eng.backend.cheat()
+  state = np.array(state)
+  ops.All(ops.Measure) | qubits # ProjectQ needs qubits measured before they are deallocated
+  eng.flush()
+  return state
 
 def _stateForInput(th, ph):
   ampl0 = complex(np.cos(ph/2) * np.cos(th/2), np.sin(ph/2) * np.cos(th/2) * -1)
@@ -65,7 +45,6 @@ def _stateForInput(th, ph):
   return [ampl0, ampl1]
 
 def testErrorCorrection():
-  num_shots = 20
   inputValues = [{'theta': 0, 'phi': 0}, #|0>
                  {'theta': np.pi, 'phi': np.pi}, #|1>
                  {'theta': np.pi/2, 'phi': np.pi/2} #|+>  
@@ -81,28 +60,17 @@ def testErrorCorrection():
     for errorIdxs in allErrorIdxs:
       inputStateComplex = _stateForInput(inputValue['theta'], inputValue['phi'])
       
-      prob_0 = 0
-      prob_1 = 0
-      
-      #Note multiple shots are not possible
-      for _ in range(num_shots):
-          eng = MainEngine()
-          qubits = eng.allocate_qureg(nbqubits)
-      
-          qubits = createProgram(qubits, inputValue, errorIdxs)
-          print(int(qubits[0]))
-          if (int(qubits[0]) == 0):
-              prob_0 += 1
-          else:
-              prob_1 += 1
-      prob_0 /= num_shots
-      prob_1 /= num_shots
-      if abs(prob_0 - abs(inputStateComplex[0])**2) < 0.0001 and abs(prob_1 - abs(inputStateComplex[1])**2) < 0.0001:
+      sampler = ShotSampler.fromState(simulate(inputValue, errorIdxs), nbqubits, littleEndian=True)
+      # Only the first bit is of importance. All others are to encode the state
+      passed, shots, (low, high) = sequentialTest(lambda shots: sampler.qubitCounts(shots, 0)[1],
+                                                  abs(inputStateComplex[1])**2)
+      if passed:
         print("Error correction works")
       else: 
         print("Error correction failed")
-        print("This might be due to simulation results compared to theoretical results")
+        print("Probability of 1 is between", low, "and", high, "after", shots, "shots")
       
         
-testErrorCorrection()
+if __name__ == '__main__':
+  testErrorCorrection()
 
@@ -1,124 +1,114 @@
 # Shor-code implementation for Qiskit
 
-from quantuminspire.api import QuantumInspireAPI
 from getpass import getpass
+import argparse
 
 import numpy as np 
 import itertools
+import concurrent.futures
 
-nbqubits = 9
-
-def PrepareState(inputValue):
-  return '''
-    RX q[0], {0}
-    RZ q[0], {1}
-    '''.format(inputValue['theta'], inputValue['phi'])
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
 
-def BitFlipEncode(indices):
-  return '''CNOT q[{0}], q[{1}]
-  CNOT q[{0}], q[{2}]
-  '''.format(*indices)
+from shor_common import circuit_ir
+from shor_common.quantum_inspire import LocalQuantumInspire, executeAll
+from shor_common.result_cache import ResultCache, CachedQuantumInspire
+from shor_common.verification import sequentialTest
 
-def PhaseFlipEncode(indices):
-  return BitFlipEncode(indices) + '''H q[{0}]
-  H q[{1}]
-  H q[{2}]
-  '''.format(*indices)
+nbqubits = 9
 
-def ErrorIntroduction(bitErrors):
-  state = ''''''
-  for err in bitErrors:
-    state += '''X q[{0}]
-    Z q[{0}]
-    '''.format(err)
-  return state
-  
-def BitFlipDecode(indices):
-  return '''CNOT q[{0}], q[{1}]
-  CNOT q[{0}], q[{2}]
-  Toffoli q[{2}], q[{1}], q[{0}]
-  '''.format(*indices)
-  
-def PhaseFlipDecode(indices):
-  return '''H q[{0}]
-  H q[{1}]
-  H q[{2}]
-  '''.format(*indices) + BitFlipDecode(indices)
-  
 def createProgram(inputValue, errorIdxs):
-  QASM = '''version 1.0\nqubits {0}
-  '''.format(nbqubits)
-    
-  QASM += PrepareState(inputValue)
-  
-  QASM += PhaseFlipEncode([0,3,6])
-  QASM += BitFlipEncode([0,1,2])
-  QASM += BitFlipEncode([3,4,5])
-  QASM += BitFlipEncode([6,7,8])
-  
-  QASM += ErrorIntroduction(errorIdxs)
-  
-  QASM += BitFlipDecode([6,7,8])
-  QASM += BitFlipDecode([3,4,5])
-  QASM += BitFlipDecode([0,1,2])
-  QASM += PhaseFlipDecode([0,3,6])
-  
-  return QASM
- 
+  # The circuit is built once, in circuit_ir, and written as cQASM.
+  return circuit_ir.toCQASM(circuit_ir.createProgram(inputValue, errorIdxs), nbqubits)
+
 def _stateForInput(th, ph):
   ampl0 = complex(np.cos(ph/2) * np.cos(th/2), np.sin(ph/2) * np.cos(th/2) * -1)
   ampl1 = complex(np.sin(ph/2) * np.sin(th/2), np.cos(ph/2) * np.sin(th/2) * -1)
   return [ampl0, ampl1]
  
-def testErrorCorrection():
-  server_url = r'https://api.quantum-inspire.com'
-  #print('Enter mail address')
-  #email = input()
+def connect(local=False, cacheDirectory=None):
+  if local: # Offline stand-in running the NumPy simulator
+    qi = LocalQuantumInspire()
+  else:
+    from quantuminspire.api import QuantumInspireAPI
+    server_url = r'https://api.quantum-inspire.com'
+    # Credentials come from the environment, or are asked for
+    email = os.environ.get('QI_EMAIL') or input('Enter mail address: ')
+    password = os.environ.get('QI_PASSWORD') or getpass()
+    qi = QuantumInspireAPI(server_url, (email, password))
+  if cacheDirectory is not None: # Circuits that ran before are not submitted again
+    qi = CachedQuantumInspire(qi, ResultCache(cacheDirectory))
+  return qi, qi.get_backend_type_by_name('QX single-node simulator')
 
-  #print('Enter password')
-  #password = getpass()
-  #auth = (email, password)
-  auth = ('niels.neumann@tno.nl', 'VakantiereisnaarTokioenKodokan')
-  
-  qi = QuantumInspireAPI(server_url, auth)
-  backend = qi.get_backend_type_by_name('QX single-node simulator')
-  
+def _probabilityOfOne(result):
+  # Histogram keys are basis indices with qubit 0 as the least significant bit.
+  return sum(value for key, value in result['histogram'].items() if int(key) % 2 == 1)
+
+def testErrorCorrection(local=False, cacheDirectory=None):
   inputValues = [{'theta': 0, 'phi': 0}, #|0>
                  {'theta': np.pi, 'phi': np.pi}, #|1>
                  {'theta': np.pi/2, 'phi': np.pi/2} #|+>
                 ]
+  allErrorIdxs = []
+  for nrOfErrors in range(2):
+    allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
+  # iterate over all possible combinations of errors
+  jobs = list(itertools.product(inputValues, allErrorIdxs))
   
-  for inputValue in inputValues:
-    print("Using input value " + str(inputValue))
-    allErrorIdxs = []
-    for nrOfErrors in range(2):
-      allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
-    # iterate over all possible combinations of errors
+  # All programs are built up front and submitted concurrently
+  QASMs = [createProgram(inputValue, errorIdxs) for inputValue, errorIdxs in jobs]
+  if 1: # Wavefunction
+    qi, backend = connect(local, cacheDirectory)
+    results = executeAll(qi, QASMs, backend, 1)
+  else: # Do measurements
+    # Sampled batches are not cached: two batches of the same size would read
+    # back the same counts.
+    qi, backend = connect(local)
     
-    for errorIdxs in allErrorIdxs:
-      inputStateComplex = _stateForInput(inputValue['theta'], inputValue['phi'])
+    def measure(job):
+      (inputValue, errorIdxs), qasm = job
+      def sampleOnes(shots):
+        result = executeAll(qi, [qasm], backend, shots, maxInFlight=1)[0]
+        if isinstance(result, Exception):
+          raise result
+        return round(_probabilityOfOne(result) * shots)
+      # Shots are billed, so batches are submitted only until the frequency is
+      # certainly within (or outside) 0.05 of the expected one
+      try:
+        return sequentialTest(sampleOnes, abs(_stateForInput(inputValue['theta'], inputValue['phi'])[1])**2)
+      except Exception as e:
+        return e
     
-      print("Introducing errors, indices " + str(errorIdxs))
-      QASM = createProgram(inputValue, errorIdxs)
-      
-      prob_0 = 0
-      prob_1 = 0
-      
-      if 1: # Wavefunction
-        result = qi.execute_qasm(QASM, backend_type=backend, number_of_shots=1)
-      else: # Do measurements
-        result = qi.execute_qasm(QASM, backend_type=backend, number_of_shots=10)
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+      results = list(executor.map(measure, zip(jobs, QASMs)))
+  
+  for (inputValue, errorIdxs), result in zip(jobs, results):
+    if errorIdxs == ():
+      print("Using input value " + str(inputValue))
+    inputStateComplex = _stateForInput(inputValue['theta'], inputValue['phi'])
+    
+    print("Introducing errors, indices " + str(errorIdxs))
+    if isinstance(result, Exception):
+      print("Job failed: " + str(result))
+      continue
+    
+    if isinstance(result, dict): # Exact probabilities
+      prob_1 = _probabilityOfOne(result)
+      prob_0 = 1 - prob_1
+      passed = abs(prob_0 - abs(inputStateComplex[0])**2) < 0.0001 and abs(prob_1 - abs(inputStateComplex[1])**2) < 0.0001
+    else: # Sequential test on the measured shots; a run that is not certainly correct fails
+      passed = result[0] is True
+    if passed:
+      print("Error correction works")
+    else:
+      print("Error correction fails")
       
-      result = result['histogram']  
-      for key, value in zip(result.keys(), result.values()):
-        if (int(key) % 2) == 0: #Number is odd
-            prob_0 += value
-        else:
-            prob_1 += value
-            
-      if abs(prob_0 - abs(inputStateComplex[0])**2) < 0.0001 and abs(prob_1 - abs(inputStateComplex[1])**2) < 0.0001:
-        print("Error correction works")
-      else:
-        print("Error correction fails")
-        
-res = testErrorCorrection()
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Run the Shor-code sweep on Quantum Inspire.")
+  parser.add_argument('--local', action='store_true', help="run against the offline stand-in")
+  parser.add_argument('--cache', help="directory of cached results")
+  args = parser.parse_args()
+  res = testErrorCorrection(args.local, args.cache)
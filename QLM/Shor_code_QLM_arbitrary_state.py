@@ -3,91 +3,40 @@ import itertools
 import numpy as np 
 import math
 
-from qat.lang.AQASM import *
-import qat.core.task as task
-import qat.core.qpu.agent as agent
-import qat.core.qpu.stateanalyzer as stateanalyzer
-import qat.core.qpu as qpu
-import qat.linalg
-
-import qat.core.circ as circ
-
 import os
 import sys
 currentdir = os.path.dirname(os.path.realpath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.append(parentdir)
 
+from shor_common import circuit_ir
 from shor_common.statevec_util import *
+from shor_common.qlm_session import QLMSession
 
 nbqubits=9
 
+# Set to True to write each circuit to output.circ, see the README.
+debug = False
+_session = None
+
 errorProbability = 1
 errorAngle = 2*np.arcsin(np.sqrt(errorProbability))
 
-def PrepareState(circuit, qubits, inputValue):
-  circuit.apply(RX(inputValue['theta']), qubits[0])
-  circuit.apply(RZ(inputValue['phi']), qubits[0])
-  circuit.apply(H, qubits[0])
-
-def BitFlipEncode(circuit, qubits, indices):
-  circuit.apply(CNOT, qubits[indices[0]], qubits[indices[1]])
-  circuit.apply(CNOT, qubits[indices[0]], qubits[indices[2]])
-
-def PhaseFlipEncode(circuit, qubits, indices):
-  BitFlipEncode(circuit, qubits, indices)
-  for idx in indices:
-    circuit.apply(H, qubits[idx])
-
-def ErrorIntroduction(circuit, qubits, bitErrors):
-  for err in bitErrors:
-    circuit.apply(X, qubits[err])
-    circuit.apply(Z, qubits[err])
-
-def BitFlipDecode(circuit, qubits, indices):
-  circuit.apply(CNOT, qubits[indices[0]], qubits[indices[1]])
-  circuit.apply(CNOT, qubits[indices[0]], qubits[indices[2]])
-  circuit.apply(CCNOT, qubits[indices[2]], qubits[indices[1]], qubits[indices[0]])
-
-def PhaseFlipDecode(circuit, qubits, indices):
-  for idx in indices:
-    circuit.apply(H, qubits[idx])
-  BitFlipDecode(circuit, qubits, indices)
-
 def createProgram(inputValue, errorIdxs):
-  circuit = Program()
-  qubits=circuit.qalloc(nbqubits)
-  PrepareState(circuit, qubits, inputValue)
-  PhaseFlipEncode(circuit, qubits, [0, 3, 6])
-  BitFlipEncode(circuit, qubits, [0, 1, 2])
-  BitFlipEncode(circuit, qubits, [3, 4, 5])
-  BitFlipEncode(circuit, qubits, [6, 7, 8])
-
-  ErrorIntroduction(circuit, qubits, errorIdxs)
-
-  BitFlipDecode(circuit, qubits, [6, 7, 8])
-  BitFlipDecode(circuit, qubits, [3, 4, 5])
-  BitFlipDecode(circuit, qubits, [0, 1, 2])
-  PhaseFlipDecode(circuit, qubits, [0, 3, 6])
-
-  circuit.apply(H, qubits[0])
-  # In reality we would measure, but since this is a simulation we can check the quantum state of the output.
-  # circuit.measure(qubits)
-  circ.writecirc(circuit.to_circ(), "output.circ")
-  return circuit
+  # The circuit is built once, in circuit_ir, and lowered to an AQASM Program.
+  # In reality we would measure, but since this is a simulation we can check
+  # the quantum state of the output.
+  return circuit_ir.toQLM(circuit_ir.createProgram(inputValue, errorIdxs), nbqubits)
+
+def session():
+  # The simulator and QPU server are built once and reused for every circuit.
+  global _session
+  if _session is None:
+    _session = QLMSession(nbqubits, debug=debug)
+  return _session
 
 def runCircuit(circuit):
-  circCircuit=circuit.to_circ("error_correction_"+repr(nbqubits))
-  # # Executing the circuit
-  simulator=qat.linalg.LinAlg()
-  # Plugins :
-  handlers = {'agent': agent.GenericAgent, 'state_analyzer': stateanalyzer.StateAnalyzer}
-  qpu_handler = qpu.Server(simulator,handlers=handlers)
-
-  mytask = task.Task(circCircuit)
-  mytask.attach(qpu_handler)
-  rangeset = range(nbqubits)
-  return mytask.states(list(rangeset))
+  return session().run(circuit)
 
 def printResults(results):
   for result in results:
@@ -190,9 +139,9 @@ def testErrorCorrection():
       allErrorIdxs += itertools.combinations(range(nbqubits), nrOfErrors)
     # iterate over all possible combinations of errors
     inputStateComplex = stateForInput(inputValue['theta'], inputValue['phi'])
-    for errorIdxs in allErrorIdxs:
-      circuit = createProgram(inputValue, errorIdxs)
-      results = list(runCircuit(circuit))
+    # All circuits of this input are compiled first and run back to back on the one server.
+    circuits = [createProgram(inputValue, errorIdxs) for errorIdxs in allErrorIdxs]
+    for errorIdxs, results in zip(allErrorIdxs, session().runBatch(circuits)):
       ampl0 = complex()
       ampl1 = complex()
       # Result for each possible 9-qubit eigenstate
@@ -222,4 +171,5 @@ def testErrorCorrection():
   else:
     print("Success: all tests passed!")
 
-testErrorCorrection()
\ No newline at end of file
+if __name__ == '__main__':
+  testErrorCorrection()
\ No newline at end of file
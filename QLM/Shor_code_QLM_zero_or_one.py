@@ -3,16 +3,21 @@ import itertools
 import numpy as np 
 
 from qat.lang.AQASM import *
-import qat.core.task as task
-import qat.core.qpu.agent as agent
-import qat.core.qpu.stateanalyzer as stateanalyzer
-import qat.core.qpu as qpu
-import qat.linalg
 
-import qat.core.circ as circ
+import os
+import sys
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from shor_common.qlm_session import QLMSession
 
 nbqubits=9
 
+# Set to True to write each circuit to output.circ, see the README.
+debug = False
+_session = None
+
 errorProbability = 1
 errorAngle = 2*np.arcsin(np.sqrt(errorProbability))
 
@@ -65,21 +70,17 @@ def createProgram(inputValue, errorIdxs):
 
   circuit.apply(H, qubits[0])
   circuit.measure(qubits)
-  circ.writecirc(circuit.to_circ(), "output.circ")
   return circuit
 
+def session():
+  # The simulator and QPU server are built once and reused for every circuit.
+  global _session
+  if _session is None:
+    _session = QLMSession(nbqubits, debug=debug)
+  return _session
+
 def runCircuit(circuit):
-  circCircuit=circuit.to_circ("error_correction_"+repr(nbqubits))
-  # # Executing the circuit
-  simulator=qat.linalg.LinAlg()
-  # Plugins :
-  handlers = {'agent': agent.GenericAgent, 'state_analyzer': stateanalyzer.StateAnalyzer}
-  qpu_handler = qpu.Server(simulator,handlers=handlers)
-
-  mytask = task.Task(circCircuit)
-  mytask.attach(qpu_handler)
-  rangeset = range(nbqubits)
-  return mytask.states(list(rangeset))
+  return session().run(circuit)
 
 def printResults(results):
   for result in results:
@@ -129,4 +130,5 @@ def testErrorCorrection():
         if not fullAmplitude:
           print("No state with probability 1!")
 
-testErrorCorrection()
\ No newline at end of file
+if __name__ == '__main__':
+  testErrorCorrection()
\ No newline at end of file
@@ -5,75 +5,32 @@ import sys
 import math
 import itertools
 
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.append(parentdir)
 
-# Add the qubiter repository to the PATH to import modules.
-os.chdir('qubiter')
-sys.path.insert(0,os.getcwd())
+# Add the qubiter repository, cloned into this folder, to the PATH to import
+# modules. Circuit files are written to local scratch by the pipeline, so the
+# script runs from any working directory.
+sys.path.insert(0, os.path.join(parentdir, 'Qubiter', 'qubiter'))
 
-from SEO_writer import *
-from SEO_simulator import *
-from StateVec import *
 import numpy as np
+from shor_common import circuit_ir
+from shor_common.qubiter_pipeline import QubiterPipeline
+from shor_common.statevec_util import splitDataQubit
 
 nbqubits=9
 
 errorProbability = 1
 errorAngle = 2*np.arcsin(np.sqrt(errorProbability))
 
-def PrepareState(wr, inputValue):
-  # Use negative half-angles (Qubiter's apparent convention).
-  wr.write_Rx(0, -0.5 * inputValue['theta'])
-  wr.write_Rz(0, -0.5 * inputValue['phi'])
-
-def BitFlipEncode(wr, indices):
-  wr.write_cnot(control_bit=indices[0], target_bit=indices[1])
-  wr.write_cnot(control_bit=indices[0], target_bit=indices[2])
-
-def PhaseFlipEncode(wr, indices):
-  BitFlipEncode(wr, indices)
-  for idx in indices:
-    wr.write_H(idx)
-
-def ErrorIntroduction(wr, bitErrors):
-  for err in bitErrors:
-    wr.write_X(err)
-    wr.write_Z(err)
-
-def BitFlipDecode(wr, indices):
-  wr.write_cnot(indices[0], indices[1])
-  wr.write_cnot(indices[0], indices[2])
-  controls = Controls(nbqubits)
-  controls.bit_pos_to_kind = {indices[1]: True, indices[2]: True}
-  controls.refresh_lists()
-  wr.write_controlled_one_bit_gate(indices[0], controls, OneBitGates.sigx)
-
-def PhaseFlipDecode(wr, indices):
-  for idx in indices:
-    wr.write_H(idx)
-  BitFlipDecode(wr, indices)
-
 def createProgram(inputValue, errorIdxs):
-  emb = CktEmbedder(nbqubits, nbqubits)
-  file_prefix = 'io_folder/repetition_code_qubiter_' + str(inputValue) + '_err_idxs' + '-'.join(map(lambda x: str(x), errorIdxs))
-  wr = SEO_writer(file_prefix, emb)
-  PrepareState(wr, inputValue)
-
-  PhaseFlipEncode(wr, [0, 3, 6])
-  BitFlipEncode(wr, [0, 1, 2])
-  BitFlipEncode(wr, [3, 4, 5])
-  BitFlipEncode(wr, [6, 7, 8])
-
-  ErrorIntroduction(wr, errorIdxs)
-
-  BitFlipDecode(wr, [6, 7, 8])
-  BitFlipDecode(wr, [3, 4, 5])
-  BitFlipDecode(wr, [0, 1, 2])
-  PhaseFlipDecode(wr, [0, 3, 6])
-
-  for idx in range(nbqubits):
-    wr.write_MEAS(idx, kind=2)
-  wr.close_files()
-  return file_prefix
+  # The circuit as segments for the QubiterPipeline: prepare and encode are
+  # shared by all error patterns of an input and decode by all runs, so only
+  # the small error segment differs between patterns.
+  return [circuit_ir.PrepareState(inputValue) + circuit_ir.EncodeOps(),
+          circuit_ir.ErrorIntroduction(errorIdxs),
+          circuit_ir.DecodeOps()]
 
 def approxEqual(x, y, tolerance=0.00001):
     return (np.abs(x) < tolerance and np.abs(y) < tolerance) or np.abs(x-y) <= 0.5 * np.abs(x + y) * tolerance
@@ -161,6 +118,8 @@ def testErrorCorrection():
                    {'theta': math.pi / 2, 'phi': math.pi / 2}, # Uniform superposition
                    {'theta': math.pi / 2, 'phi': 2}, # Abnormal phase
                    {'theta': math.pi * 2 / 3, 'phi': 4}] # Abnormal superposition
+    # Set debug=True to also write the picture files of the circuit segments
+    pipeline = QubiterPipeline(nbqubits, debug=False)
     failures = 0
     for inputValue in inputValues:
         print("Using input value " + str(inputValue))
@@ -170,44 +129,13 @@ def testErrorCorrection():
         # iterate over all possible combinations of errors
         for errorIdxs in allErrorIdxs:
             # print("    Introducing errors, indices " + str(errorIdxs))
-            file_prefix = createProgram(inputValue, errorIdxs)
-            # pic_file = file_prefix + '_' + str(nbqubits) + '_ZLpic.txt'
-            # with open(pic_file) as f:
-            #     print(f.read())
-            init_st_vec = StateVec.get_standard_basis_st_vec([0, 0, 0, 0, 0, 0, 0, 0, 0])
-            sim = SEO_simulator(file_prefix, nbqubits, init_st_vec)
+            stateVec = pipeline.run(createProgram(inputValue, errorIdxs))
 
             inputStateComplex = stateForInput(inputValue['theta'], inputValue['phi'])
             # print("Input state complex = " + str(inputStateComplex))
-            prob_0 = 0.0
-            prob_1 = 0.0
-            ampl0 = complex()
-            ampl1 = complex()
-            for _, stateVec in sim.cur_st_vec_dict.items():
-              # There are 2^nbqubits stateVecs, but most do not have an associated array.
-              # This has to to with doing type 2 (rather than type 0 or type 1) measurements.
-              if stateVec.arr is not None:
-                states = stateVec.get_traditional_st_vec()
-                for stateIdx in range(len(states)):
-                  stateProb = np.absolute(states[stateIdx]) ** 2
-                  # This is one of our final states, check if our original bit has been corrected.
-                  # With successful correction, the final state is identical to the initial state
-                  # except for a global phase difference.
-                  stateBinary = np.binary_repr(stateIdx, width=nbqubits)
-                  if stateProb > 0.0001:
-                  #   print("    " + str(stateBinary) + " with amplitude " + str(states[stateIdx]))
-                    resultQubit = stateBinary[nbqubits - 1]
-                    if resultQubit == '0':
-                      ampl0 = states[stateIdx]
-                      prob_0 = stateProb
-                    elif resultQubit == '1':
-                      ampl1 = states[stateIdx]
-                      prob_1 = stateProb
-                    else:
-                      print("Expected 0 or 1 as last digit of binary state representation.")
-                      exit()
-            # print("prob 0 = " + str(prob_0))
-            # print("prob 1 = " + str(prob_1))
+            # With successful correction, the final state is identical to the initial state
+            # except for a global phase difference. Qubit 0 is the last digit of the index.
+            (ampl0, ampl1), _ = splitDataQubit(stateVec.get_traditional_st_vec(), 0, littleEndian=True)
             inputStateComplex = clampedAmplitudes(inputStateComplex)
             clampedAmpls = clampedAmplitudes([ampl0, ampl1])
             if sameState(inputStateComplex, clampedAmpls):
@@ -223,4 +151,5 @@ def testErrorCorrection():
     else:
       print("Success: all tests passed!")
 
-testErrorCorrection()
\ No newline at end of file
+if __name__ == '__main__':
+  testErrorCorrection()
\ No newline at end of file
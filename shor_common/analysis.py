@@ -0,0 +1,69 @@
+import numpy as np
+
+from shor_common.sampling import qubitShift
+
+# Analysis of measurement results from any backend.
+#
+# Everything is reduced to a histogram over basis indices: raw measurement
+# arrays (shots, qubits) are packed row-wise into integers and counted with
+# np.bincount, and probability or count dicts keyed by bitstrings or integers
+# are scattered into an array. Marginals over a subset of qubits, per-qubit
+# marginals and syndrome histograms are then sums over axes of the histogram
+# seen as a (2,)*n tensor, so no step loops over shots.
+#
+# Histograms are indexed with qubit 0 as the most significant bit unless
+# littleEndian is given, matching sampling.extractBits.
+
+def packBits(bits, littleEndian=False, chunkSize=2 ** 20):
+  # Pack each row of a (shots, k) array of 0/1 values into an integer.
+  bits = np.asarray(bits)
+  if bits.ndim == 1:
+    bits = bits[:, None]
+  nbbits = bits.shape[1]
+  weights = np.array([1 << qubitShift(column, nbbits, littleEndian) for column in range(nbbits)], dtype=np.int64)
+  packed = np.empty(bits.shape[0], dtype=np.int64)
+  # Chunks bound the int64 temporary for very long runs.
+  for start in range(0, bits.shape[0], chunkSize):
+    packed[start:start + chunkSize] = bits[start:start + chunkSize].astype(np.int64) @ weights
+  return packed
+
+def countsFromMeasurements(bits, littleEndian=False):
+  # Histogram over the 2^k outcomes of a (shots, k) measurement array.
+  bits = np.asarray(bits)
+  nbbits = 1 if bits.ndim == 1 else bits.shape[1]
+  return np.bincount(packBits(bits, littleEndian), minlength=2 ** nbbits)
+
+def countsFromDict(mapping, nbqubits, littleEndian=False):
+  # Histogram from a dict of counts or probabilities. Keys are bitstrings
+  # written with the highest qubit first, as PyQuil and Qiskit print them, or
+  # integer basis indices (also as strings) with qubit 0 as the least
+  # significant bit, as Quantum Inspire returns them.
+  counts = np.zeros(2 ** nbqubits)
+  for key, value in mapping.items():
+    index = int(key, 2) if isinstance(key, str) and len(key) == nbqubits and set(key) <= set('01') else int(key)
+    counts[index] += value
+  if not littleEndian:
+    counts = _reverseQubits(counts, nbqubits)
+  return counts
+
+def _reverseQubits(counts, nbqubits):
+  return np.asarray(counts).reshape((2,) * nbqubits).transpose().reshape(-1)
+
+def marginal(counts, qubits, nbqubits, littleEndian=False):
+  # Histogram over the given qubits only, with qubits[0] as the most significant bit.
+  tensor = np.asarray(counts).reshape((2,) * nbqubits)
+  axes = [qubitShift(qubit, nbqubits, not littleEndian) for qubit in qubits]
+  others = tuple(axis for axis in range(nbqubits) if axis not in axes)
+  reduced = np.sum(tensor, axis=others)
+  # np.sum keeps the remaining axes in increasing order.
+  order = np.argsort(np.argsort(axes))
+  return np.transpose(reduced, order).reshape(-1)
+
+def qubitMarginals(counts, nbqubits, littleEndian=False):
+  # (nbqubits, 2) array with the counts of 0 and 1 for every qubit.
+  return np.array([marginal(counts, [qubit], nbqubits, littleEndian) for qubit in range(nbqubits)])
+
+def syndromeHistogram(bits, syndromeColumns):
+  # Histogram of the syndromes measured in the given columns of a (shots, k)
+  # measurement array, with the first column as the most significant bit.
+  return countsFromMeasurements(np.asarray(bits)[:, list(syndromeColumns)])
@@ -0,0 +1,297 @@
+import abc
+import functools
+import importlib.util
+import os
+
+import numpy as np
+
+from shor_common import circuit_ir
+from shor_common.result_cache import ResultCache, cacheKey
+from shor_common.statevec_util import stateForInput, splitDataQubit, compareStates
+from shor_common.sweep import runSweep
+
+# One sweep driver for every framework.
+#
+# A backend turns a circuit_ir op list into a result. warmUp() does the
+# expensive setup (imports, simulator objects) once per sweep worker and
+# returns a context that the other methods reuse. lower(context, ops, nbqubits)
+# builds the framework's own circuit and run(context, circuit, nbqubits)
+# simulates it; simulate() does both. The result is either ('statevector',
+# amplitudes, littleEndian) or ('probabilities', p0, p1) with the
+# probabilities of the data qubit, which is what sampling and remote backends
+# give. verify() turns either into a pass/fail and a fidelity so all backends
+# are checked the same way.
+#
+# With a cache directory, runBackendSweep reads results through a
+# result_cache.ResultCache keyed by the program's cQASM and the backend name,
+# so a re-run only simulates (or submits) the circuits that changed.
+
+class Backend(abc.ABC):
+  name = None
+  module = None
+
+  def available(self):
+    # Checked without importing, which can take seconds for some frameworks.
+    return importlib.util.find_spec(self.module) is not None
+
+  def warmUp(self):
+    return None
+
+  def lower(self, context, ops, nbqubits):
+    return ops
+
+  @abc.abstractmethod
+  def run(self, context, circuit, nbqubits):
+    pass
+
+  def simulate(self, context, ops, nbqubits):
+    return self.run(context, self.lower(context, ops, nbqubits), nbqubits)
+
+
+class NumPyBackend(Backend):
+  # With optimize set, lower runs circuit_opt.optimize on every program. That
+  # pays off for long circuits on large states; for the 9-qubit code the pass
+  # costs several times the simulation, so it is off by default.
+  name = 'numpy'
+  module = 'numpy'
+
+  def __init__(self, optimize=False):
+    self.optimize = optimize
+
+  def lower(self, context, ops, nbqubits):
+    if not self.optimize:
+      return ops
+    from shor_common.circuit_opt import optimize
+    return optimize(ops)
+
+  def run(self, context, circuit, nbqubits):
+    from shor_common.statevec_sim import zeroState, applyOps
+    state = zeroState(nbqubits)
+    applyOps(state, circuit)
+    return 'statevector', state, False
+
+
+class ChunkedNumPyBackend(NumPyBackend):
+  # The NumPy engine on a chunked_statevec.ChunkedState, for states beyond
+  # RAM. Only the data qubit's amplitudes are returned (as a one-qubit state),
+  # so the full state never leaves the scratch file.
+  name = 'numpy-chunked'
+
+  def __init__(self, chunkQubits=20, dtype=np.complex128, directory=None, optimize=False):
+    super().__init__(optimize)
+    self.chunkQubits = chunkQubits
+    self.dtype = dtype
+    self.directory = directory
+
+  def run(self, context, circuit, nbqubits):
+    from shor_common.chunked_statevec import ChunkedState
+    with ChunkedState(nbqubits, self.dtype, self.chunkQubits, self.directory) as state:
+      state.applyOps(circuit)
+      return 'statevector', state.dataQubitAmplitudes(0), False
+
+
+class BlockNumPyBackend(NumPyBackend):
+  # The NumPy engine on a block_sim.BlockState, with the blocks found by
+  # blocksOf, so memory grows with the number of blocks rather than
+  # exponentially. Returns the data qubit's amplitudes, as numpy-chunked.
+  name = 'numpy-blocks'
+
+  def lower(self, context, ops, nbqubits):
+    # The blocks come from the circuit as written, before optimize merges
+    # fans across them.
+    from shor_common.block_sim import blocksOf
+    return blocksOf(ops, nbqubits), super().lower(context, ops, nbqubits)
+
+  def run(self, context, circuit, nbqubits):
+    from shor_common.block_sim import BlockState
+    blockSizes, ops = circuit
+    state = BlockState(blockSizes)
+    state.applyOps(ops)
+    return 'statevector', state.dataQubitAmplitudes(0), False
+
+
+class QiskitBackend(Backend):
+  name = 'qiskit'
+  module = 'qiskit'
+
+  def warmUp(self):
+    import qiskit
+    return qiskit.Aer.get_backend('statevector_simulator')
+
+  def lower(self, context, ops, nbqubits):
+    return circuit_ir.toQiskit(ops, nbqubits)
+
+  def run(self, context, circuit, nbqubits):
+    import qiskit
+    result = qiskit.execute(circuit, context).result()
+    return 'statevector', np.asarray(result.get_statevector(circuit)), True
+
+
+class CirqBackend(Backend):
+  name = 'cirq'
+  module = 'cirq'
+
+  def warmUp(self):
+    import cirq
+    return cirq.Simulator()
+
+  def lower(self, context, ops, nbqubits):
+    return circuit_ir.toCirq(ops, nbqubits)
+
+  def run(self, context, circuit, nbqubits):
+    result = context.simulate(circuit)
+    state = getattr(result, 'final_state_vector', None)
+    if state is None:
+      state = result.final_state
+    return 'statevector', np.asarray(state), False
+
+
+class QLMBackend(Backend):
+  name = 'qlm'
+  module = 'qat'
+
+  # The simulator and server are set up once per worker by a
+  # qlm_session.QLMSession, one per number of qubits.
+  def warmUp(self):
+    return {}
+
+  def _session(self, context, nbqubits):
+    from shor_common.qlm_session import QLMSession
+    if nbqubits not in context:
+      context[nbqubits] = QLMSession(nbqubits)
+    return context[nbqubits]
+
+  def lower(self, context, ops, nbqubits):
+    return self._session(context, nbqubits).compile(circuit_ir.toQLM(ops, nbqubits))
+
+  def run(self, context, circuit, nbqubits):
+    state = np.zeros(2 ** nbqubits, dtype=complex)
+    for result in self._session(context, nbqubits).runCompiled(circuit):
+      stateIdx = sum(int(bool(result.state[qubit])) << (nbqubits - 1 - qubit) for qubit in range(nbqubits))
+      state[stateIdx] += result.amplitude
+    return 'statevector', state, False
+
+
+class PyQuilBackend(Backend):
+  name = 'pyquil'
+  module = 'pyquil'
+
+  def warmUp(self):
+    from pyquil.api import WavefunctionSimulator
+    return WavefunctionSimulator()
+
+  def lower(self, context, ops, nbqubits):
+    return circuit_ir.toPyQuil(ops, nbqubits)
+
+  def run(self, context, circuit, nbqubits):
+    wavefunction = context.wavefunction(circuit)
+    return 'statevector', np.asarray(wavefunction.amplitudes), True
+
+
+class ProjectQBackend(Backend):
+  name = 'projectq'
+  module = 'projectq'
+
+  # ProjectQ executes gates as they are sent to the engine, so lowering and
+  # simulation cannot be separated.
+  def run(self, context, circuit, nbqubits):
+    from projectq import MainEngine
+    from projectq import ops as pq
+    eng = MainEngine()
+    qubits = eng.allocate_qureg(nbqubits)
+    circuit_ir.toProjectQ(circuit, qubits)
+    eng.flush()
+    # Qubits are allocated in order, so qubit 0 is the least significant bit.
+    _, state = eng.backend.cheat()
+    state = np.array(state)
+    pq.All(pq.Measure) | qubits
+    eng.flush()
+    return 'statevector', state, True
+
+
+class QubiterBackend(Backend):
+  name = 'qubiter'
+  module = 'SEO_writer'
+
+  # The English file of each distinct circuit is written once to local
+  # scratch by a QubiterPipeline, see qubiter_pipeline.py.
+  def warmUp(self):
+    return {}
+
+  def _pipeline(self, context, nbqubits):
+    from shor_common.qubiter_pipeline import QubiterPipeline
+    if nbqubits not in context:
+      context[nbqubits] = QubiterPipeline(nbqubits)
+    return context[nbqubits]
+
+  def lower(self, context, ops, nbqubits):
+    return self._pipeline(context, nbqubits).segment(ops)
+
+  def run(self, context, circuit, nbqubits):
+    from SEO_simulator import SEO_simulator
+    from StateVec import StateVec
+    sim = SEO_simulator(circuit, nbqubits, StateVec.get_standard_basis_st_vec([0] * nbqubits))
+    state = sim.cur_st_vec_dict['pure'].get_traditional_st_vec()
+    return 'statevector', np.asarray(state).reshape(-1), True
+
+
+class QuantumInspireBackend(Backend):
+  name = 'quantuminspire'
+  module = 'quantuminspire'
+
+  def warmUp(self):
+    # Credentials come from the environment instead of the source.
+    from quantuminspire.api import QuantumInspireAPI
+    auth = (os.environ['QI_EMAIL'], os.environ['QI_PASSWORD'])
+    qi = QuantumInspireAPI(r'https://api.quantum-inspire.com', auth)
+    return qi, qi.get_backend_type_by_name('QX single-node simulator')
+
+  def lower(self, context, ops, nbqubits):
+    return circuit_ir.toCQASM(ops, nbqubits)
+
+  def run(self, context, circuit, nbqubits):
+    qi, backendType = context
+    result = qi.execute_qasm(circuit, backend_type=backendType, number_of_shots=1)
+    # Histogram keys are basis indices with qubit 0 as the least significant bit.
+    prob1 = sum(value for key, value in result['histogram'].items() if int(key) % 2 == 1)
+    return 'probabilities', 1 - prob1, prob1
+
+
+BACKENDS = {backend.name: backend for backend in [NumPyBackend(), ChunkedNumPyBackend(), BlockNumPyBackend(),
+                                                   QiskitBackend(), CirqBackend(), QLMBackend(), PyQuilBackend(),
+                                                   ProjectQBackend(), QubiterBackend(), QuantumInspireBackend()]}
+
+def availableBackends():
+  return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def verify(inputValue, result, tolerance=0.0001):
+  # Returns (passed, fidelity) for a simulate() result.
+  expected = stateForInput(inputValue['theta'], inputValue['phi'])
+  if result[0] == 'statevector':
+    amplitudes, _ = splitDataQubit(result[1], 0, littleEndian=result[2])
+    fidelity, _, passed = compareStates([expected], [amplitudes], tolerance)
+    return bool(passed[0]), float(fidelity[0])
+  prob0, prob1 = result[1], result[2]
+  passed = abs(prob0 - abs(expected[0]) ** 2) < tolerance and abs(prob1 - abs(expected[1]) ** 2) < tolerance
+  # Only the populations are known, so this is the classical fidelity of the two distributions.
+  fidelity = (np.sqrt(prob0) * abs(expected[0]) + np.sqrt(prob1) * abs(expected[1])) ** 2
+  return bool(passed), float(fidelity)
+
+def _warmUp(backendName, cacheDirectory=None):
+  cache = ResultCache(cacheDirectory) if cacheDirectory is not None else None
+  return backendName, BACKENDS[backendName].warmUp(), cache
+
+def _simulateJob(context, inputValue, errorIdxs):
+  backendName, backendContext, cache = context
+  ops = circuit_ir.createProgram(inputValue, errorIdxs)
+  nbqubits = circuit_ir.nbqubitsOf(ops)
+  simulate = lambda: BACKENDS[backendName].simulate(backendContext, ops, nbqubits)
+  result = simulate() if cache is None else cache.fetch(cacheKey(circuit_ir.toCQASM(ops, nbqubits), backendName),
+                                                        simulate)
+  return verify(inputValue, result)
+
+def runBackendSweep(backendName, inputValues, allErrorIdxs, maxWorkers=1, cacheDirectory=None):
+  # Returns a list of (inputValue, errorIdxs, passed, fidelity) in sweep order.
+  results = runSweep(_simulateJob, inputValues, allErrorIdxs,
+                     warmUp=functools.partial(_warmUp, backendName, cacheDirectory), maxWorkers=maxWorkers)
+  return [(inputValue, errorIdxs, passed, fidelity) for inputValue, errorIdxs, (passed, fidelity) in results]
@@ -0,0 +1,171 @@
+import concurrent.futures
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from shor_common import circuit_ir
+from shor_common import concatenated
+from shor_common.backends import BACKENDS, verify
+
+# Cross-framework benchmark of the Shor-code sweep.
+#
+# Every backend runs in its own freshly spawned process, so the import time
+# and peak memory of one framework do not leak into another. Within that
+# process the time of each stage is summed over all jobs of the sweep:
+# import, warm-up (simulator setup), construction of the circuit_ir program,
+# lowering to the framework's circuit (transpilation), simulation and
+# verification.
+#
+# The scaling mode runs the concatenated Shor code (see concatenated.py) at
+# increasing levels, 9, 81, 729, ... qubits, on the statevector engine, the
+# two stabilizer simulators, the block-factorised engine and the framework
+# backends, and records time, peak memory and failed patterns per engine and
+# level. Statevector engines must correct every error; the stabilizer engines
+# do not correct, so they must detect it with a nonzero syndrome. Engines that
+# hold the full state are reported as infeasible once it would exceed
+# maxBytes, and an engine is not tried at higher levels once it has failed.
+
+STAGES = ['import', 'warmUp', 'construct', 'lower', 'simulate', 'verify']
+FIELDS = ['backend', 'status', 'jobs', 'failures'] + [stage + 'Seconds' for stage in STAGES] + \
+         ['totalSeconds', 'peakRssKb']
+
+def _peakRssKb():
+  import resource
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+  return peak // 1024 if sys.platform == 'darwin' else peak
+
+def benchmarkBackend(backendName, inputValues, allErrorIdxs):
+  # Runs in the current process; runBenchmarks calls it in a fresh one.
+  backend = BACKENDS[backendName]
+  seconds = dict.fromkeys(STAGES, 0.0)
+  start = time.perf_counter()
+  __import__(backend.module)
+  seconds['import'] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  context = backend.warmUp()
+  seconds['warmUp'] = time.perf_counter() - start
+
+  failures = 0
+  jobs = list(itertools.product(inputValues, allErrorIdxs))
+  for inputValue, errorIdxs in jobs:
+    t0 = time.perf_counter()
+    ops = circuit_ir.createProgram(inputValue, errorIdxs)
+    nbqubits = circuit_ir.nbqubitsOf(ops)
+    t1 = time.perf_counter()
+    circuit = backend.lower(context, ops, nbqubits)
+    t2 = time.perf_counter()
+    result = backend.run(context, circuit, nbqubits)
+    t3 = time.perf_counter()
+    passed, _ = verify(inputValue, result)
+    t4 = time.perf_counter()
+    seconds['construct'] += t1 - t0
+    seconds['lower'] += t2 - t1
+    seconds['simulate'] += t3 - t2
+    seconds['verify'] += t4 - t3
+    failures += not passed
+
+  record = {'backend': backendName, 'status': 'ok', 'jobs': len(jobs), 'failures': failures}
+  for stage in STAGES:
+    record[stage + 'Seconds'] = seconds[stage]
+  record['totalSeconds'] = sum(seconds.values())
+  record['peakRssKb'] = _peakRssKb()
+  return record
+
+def runBenchmarks(backendNames, inputValues, allErrorIdxs):
+  # One record per backend; unavailable backends are reported as skipped and
+  # a backend that raises is reported with its error instead of stopping the run.
+  records = []
+  spawn = multiprocessing.get_context('spawn')
+  for backendName in backendNames:
+    if backendName not in BACKENDS or not BACKENDS[backendName].available():
+      records.append({'backend': backendName, 'status': 'skipped'})
+      continue
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=spawn) as pool:
+      try:
+        records.append(pool.submit(benchmarkBackend, backendName, inputValues, allErrorIdxs).result())
+      except Exception as e:
+        records.append({'backend': backendName, 'status': 'error: ' + str(e)})
+  return records
+
+SCALING_ENGINES = ['statevector', 'stabilizer', 'pauliframe'] + [name for name in BACKENDS if name != 'numpy']
+SCALING_FIELDS = ['engine', 'level', 'nbqubits', 'status', 'patterns', 'failures', 'constructSeconds',
+                  'simulateSeconds', 'peakRssKb']
+
+def _holdsState(engine):
+  return engine not in ('stabilizer', 'pauliframe', 'numpy-blocks')
+
+def benchmarkLevel(engine, level, nbPatterns=16, seed=1234):
+  # One record for a level-L concatenated code on one engine, in the current
+  # process. Every pattern is a single X+Z error on a random qubit.
+  nbqubits = concatenated.nbqubitsForLevel(level)
+  rng = np.random.default_rng(seed)
+  allErrorIdxs = [(int(qubit),) for qubit in rng.integers(nbqubits, size=nbPatterns)]
+  inputValue = {'theta': 0, 'phi': 0}
+  # The stabilizer engines build their op lists inside the round.
+  constructSeconds = 0.0
+  failures = 0
+  start = time.perf_counter()
+  if engine == 'pauliframe':
+    syndromes, _, _ = concatenated.runPauliFrameRound(level, allErrorIdxs)
+    failures = int(np.sum(~syndromes.any(axis=1)))
+  elif engine == 'stabilizer':
+    for errorIdxs in allErrorIdxs:
+      syndrome, _ = concatenated.runStabilizerRound(level, errorIdxs, rng)
+      failures += not syndrome.any()
+  else:
+    backend = BACKENDS['numpy' if engine == 'statevector' else engine]
+    context = backend.warmUp()
+    for errorIdxs in allErrorIdxs:
+      t0 = time.perf_counter()
+      ops = concatenated.createProgram(inputValue, errorIdxs, level)
+      constructSeconds += time.perf_counter() - t0
+      passed, _ = verify(inputValue, backend.simulate(context, ops, nbqubits))
+      failures += not passed
+  seconds = time.perf_counter() - start
+  return {'engine': engine, 'level': level, 'nbqubits': nbqubits, 'status': 'ok', 'patterns': nbPatterns,
+          'failures': failures,
+          'constructSeconds': constructSeconds, 'simulateSeconds': seconds - constructSeconds,
+          'peakRssKb': _peakRssKb()}
+
+def runScalingBenchmarks(engines, levels, maxBytes=2 ** 30, nbPatterns=16):
+  records = []
+  spawn = multiprocessing.get_context('spawn')
+  for engine in engines:
+    backendName = 'numpy' if engine == 'statevector' else engine
+    failed = None
+    for level in levels:
+      record = {'engine': engine, 'level': level, 'nbqubits': concatenated.nbqubitsForLevel(level)}
+      if _holdsState(engine) and (backendName not in BACKENDS or not BACKENDS[backendName].available()):
+        failed = 'skipped'
+      elif failed is None and _holdsState(engine) and 16 * 2 ** record['nbqubits'] > maxBytes:
+        failed = 'infeasible'
+      if failed is not None:
+        record['status'] = failed
+        records.append(record)
+        continue
+      with concurrent.futures.ProcessPoolExecutor(1, mp_context=spawn) as pool:
+        try:
+          records.append(pool.submit(benchmarkLevel, engine, level, nbPatterns).result())
+        except Exception as e:
+          failed = 'error: ' + str(e)
+          record['status'] = failed
+          records.append(record)
+  return records
+
+def writeJson(records, fileName):
+  with open(fileName, 'w') as f:
+    json.dump(records, f, indent=2)
+
+def writeCsv(records, fileName, fields=FIELDS):
+  with open(fileName, 'w', newline='') as f:
+    writer = csv.DictWriter(f, fieldnames=fields)
+    writer.writeheader()
+    for record in records:
+      writer.writerow(record)
@@ -0,0 +1,214 @@
+import numpy as np
+
+from shor_common import circuit_ir, statevec_sim
+
+# Block-factorised statevectors.
+#
+# In the Shor code the bit-flip layer acts on disjoint blocks of three qubits
+# and only the phase-flip layer couples the blocks. A BlockState stores the
+# state as a matrix-product state with one site per block of consecutive
+# qubits: site b is a tensor (left bond, 2^k amplitudes of its k qubits, right
+# bond). Ops inside a block only touch its site, through statevec_sim.applyOps
+# with the bonds as batch axes. An op across blocks is split by SVD into one
+# factor per block (a matrix-product operator) and applied site by site, and
+# the bonds it widened are compressed again. Only numerically zero singular
+# values are dropped, so the result is exact, and memory is the sum of
+# bond^2 * 2^k over the blocks: linear in the number of blocks while the bonds
+# stay small, as they do in the code (2 after the phase-flip encoder).
+#
+# blocksOf picks the blocks for a circuit by cutting the qubit line where
+# fewest ops cross.
+
+def _crossings(ops, nbqubits):
+  # crossings[q]: the number of ops spanning the cut between qubits q and q + 1.
+  crossings = np.zeros(max(nbqubits - 1, 0), dtype=int)
+  for op in ops:
+    qubits = circuit_ir.qubitsOf(op)
+    crossings[min(qubits):max(qubits)] += 1
+  return crossings
+
+def _splitBlock(start, stop, crossings, maxBlockQubits):
+  if stop - start <= maxBlockQubits:
+    return [stop - start]
+  cut = start + 1 + int(np.argmin(crossings[start:stop - 1]))
+  return _splitBlock(start, cut, crossings, maxBlockQubits) + _splitBlock(cut, stop, crossings, maxBlockQubits)
+
+def blocksOf(ops, nbqubits, maxBlockQubits=10):
+  # Block sizes, in qubit order. The line is cut where no op crosses and at
+  # every local minimum of the crossings, and blocks longer than
+  # maxBlockQubits are split where fewest ops cross. For the Shor code from
+  # circuit_ir this gives [3, 3, 3]. Run it on the circuit before
+  # circuit_opt.optimize, whose merged CNOT fans span blocks.
+  crossings = _crossings([op for op in ops if op[0] != 'MEASURE'], nbqubits)
+  # The end cuts of the line are only taken when nothing crosses them.
+  cuts = [0]
+  for q, crossing in enumerate(crossings):
+    left = crossings[q - 1] if q > 0 else -1
+    right = crossings[q + 1] if q + 1 < len(crossings) else -1
+    if crossing == 0 or (crossing < left and crossing <= right):
+      cuts.append(q + 1)
+  cuts.append(nbqubits)
+  return [size for start, stop in zip(cuts, cuts[1:]) for size in _splitBlock(start, stop, crossings, maxBlockQubits)]
+
+def _renamed(op, mapping):
+  if op[0] in ('RX', 'RZ', 'U'):
+    return (op[0], mapping[op[1]]) + op[2:]
+  if op[0] == 'PERM':
+    return (op[0], tuple(mapping[qubit] for qubit in op[1]), op[2])
+  return (op[0],) + tuple(mapping[qubit] for qubit in op[1:])
+
+def opMatrix(op, qubits):
+  # The matrix of op on qubits, the first one most significant.
+  basis = np.eye(2 ** len(qubits), dtype=complex)
+  statevec_sim.applyOps(basis, [_renamed(op, {qubit: k for k, qubit in enumerate(qubits)})])
+  return basis.T
+
+class BlockState:
+  def __init__(self, blockSizes, tolerance=1e-12):
+    # Starts in |0...0>. blockSizes: the number of qubits of each block, in
+    # qubit order, as returned by blocksOf.
+    self.blockSizes = list(blockSizes)
+    self.nbqubits = sum(self.blockSizes)
+    self.tolerance = tolerance
+    self.firsts = list(np.cumsum([0] + self.blockSizes[:-1]))
+    self.siteOf = [site for site, size in enumerate(self.blockSizes) for _ in range(size)]
+    self.sites = []
+    for size in self.blockSizes:
+      site = np.zeros((1, 2 ** size, 1), dtype=complex)
+      site[0, 0, 0] = 1
+      self.sites.append(site)
+
+  def bondDimensions(self):
+    return [site.shape[2] for site in self.sites[:-1]]
+
+  def nbytes(self):
+    return sum(site.nbytes for site in self.sites)
+
+  def _localOp(self, op, site):
+    first = self.firsts[site]
+    return _renamed(op, {qubit: qubit - first for qubit in circuit_ir.qubitsOf(op)})
+
+  def _applySite(self, site, ops):
+    # The bonds are the batch axes of statevec_sim.applyOps.
+    left, dim, right = self.sites[site].shape
+    batch = np.ascontiguousarray(np.moveaxis(self.sites[site], 1, 2)).reshape(left * right, dim)
+    statevec_sim.applyOps(batch, ops)
+    self.sites[site] = np.moveaxis(batch.reshape(left, right, dim), 2, 1)
+
+  def _operatorCores(self, matrix, groups):
+    # Split matrix (on the qubits of groups, in order) into one core
+    # (bondIn, 2^k out, 2^k in, bondOut) per group of k qubits.
+    nbqubits = sum(len(qubits) for _, qubits in groups)
+    tensor = matrix.reshape((2,) * 2 * nbqubits)
+    axes, first = [], 0
+    for _, qubits in groups:
+      axes += list(range(first, first + len(qubits))) + list(range(nbqubits + first, nbqubits + first + len(qubits)))
+      first += len(qubits)
+    rest = tensor.transpose(axes).reshape(1, -1)
+    cores = []
+    for _, qubits in groups[:-1]:
+      bond, dim = rest.shape[0], 4 ** len(qubits)
+      u, s, vh = np.linalg.svd(rest.reshape(bond * dim, -1), full_matrices=False)
+      keep = s > self.tolerance * s[0]
+      cores.append(u[:, keep].reshape(bond, 2 ** len(qubits), 2 ** len(qubits), -1))
+      rest = s[keep, None] * vh[keep]
+    size = 2 ** len(groups[-1][1])
+    cores.append(rest.reshape(rest.shape[0], size, size, 1))
+    return cores
+
+  def _applyCore(self, site, core, positions):
+    # Contract core over the qubits at positions (within the site); the core's
+    # bonds join the site's.
+    left, dim, right = self.sites[site].shape
+    k = self.blockSizes[site]
+    bondIn, bondOut = core.shape[0], core.shape[-1]
+    coreLabels = [k + 2] + list(range(k + 4, k + 4 + len(positions))) + [1 + p for p in positions] + [k + 3]
+    physical = list(range(1, k + 1))
+    for n, p in enumerate(positions):
+      physical[p] = k + 4 + n
+    tensor = np.einsum(self.sites[site].reshape((left,) + (2,) * k + (right,)), [0] + list(range(1, k + 2)),
+                       core.reshape((bondIn,) + (2,) * 2 * len(positions) + (bondOut,)), coreLabels,
+                       [0, k + 2] + physical + [k + 1, k + 3])
+    self.sites[site] = tensor.reshape(left * bondIn, dim, right * bondOut)
+
+  def _compress(self, start, stop):
+    # Drop the zero singular values of the bonds between sites start..stop.
+    for site in range(start, stop):
+      left, dim1, _ = self.sites[site].shape
+      _, dim2, right = self.sites[site + 1].shape
+      theta = np.tensordot(self.sites[site], self.sites[site + 1], axes=1).reshape(left * dim1, dim2 * right)
+      u, s, vh = np.linalg.svd(theta, full_matrices=False)
+      keep = s > self.tolerance * s[0]
+      self.sites[site] = u[:, keep].reshape(left, dim1, -1)
+      self.sites[site + 1] = (s[keep, None] * vh[keep]).reshape(-1, dim2, right)
+
+  def _applyAcross(self, op):
+    qubits = sorted(circuit_ir.qubitsOf(op))
+    groups = []
+    for qubit in qubits:
+      if groups and groups[-1][0] == self.siteOf[qubit]:
+        groups[-1][1].append(qubit)
+      else:
+        groups.append((self.siteOf[qubit], [qubit]))
+    cores = iter(self._operatorCores(opMatrix(op, qubits), groups))
+    bond = 1
+    members = dict(groups)
+    for site in range(groups[0][0], groups[-1][0] + 1):
+      if site in members:
+        core = next(cores)
+        self._applyCore(site, core, [qubit - self.firsts[site] for qubit in members[site]])
+        bond = core.shape[-1]
+      else:
+        # The bond passes through untouched.
+        left, dim, right = self.sites[site].shape
+        tensor = np.einsum('lpr,ab->laprb', self.sites[site], np.eye(bond))
+        self.sites[site] = tensor.reshape(left * bond, dim, right * bond)
+    self._compress(groups[0][0], groups[-1][0])
+
+  def applyOps(self, ops):
+    # As statevec_sim.applyOps; measurements are skipped. Consecutive ops on
+    # one block are applied together.
+    pending, pendingSite = [], None
+    for op in ops:
+      if op[0] == 'MEASURE':
+        continue
+      sites = {self.siteOf[qubit] for qubit in circuit_ir.qubitsOf(op)}
+      if len(sites) == 1 and (pendingSite is None or sites == {pendingSite}):
+        pendingSite = sites.pop()
+        pending.append(self._localOp(op, pendingSite))
+        continue
+      if pending:
+        self._applySite(pendingSite, pending)
+      pending, pendingSite = [], None
+      if len(sites) == 1:
+        pendingSite = sites.pop()
+        pending.append(self._localOp(op, pendingSite))
+      else:
+        self._applyAcross(op)
+    if pending:
+      self._applySite(pendingSite, pending)
+
+  def toArray(self):
+    # The whole state, qubit 0 most significant, for states that fit.
+    state = np.ones((1, 1), dtype=complex)
+    for site in self.sites:
+      state = np.tensordot(state, site, axes=1).reshape(-1, site.shape[2])
+    return state.reshape(-1)
+
+  def dataQubitAmplitudes(self, qubit=0):
+    # The amplitudes of qubit, assuming the state is (close to) a product of
+    # it and the rest, as statevec_util.splitDataQubit, from its reduced
+    # density matrix.
+    target = self.siteOf[qubit]
+    leftEnv = np.ones((1, 1), dtype=complex)
+    for site in self.sites[:target]:
+      leftEnv = np.einsum('xy,xpr,yps->rs', leftEnv, site, site.conj())
+    rightEnv = np.ones((1, 1), dtype=complex)
+    for site in reversed(self.sites[target + 1:]):
+      rightEnv = np.einsum('xpr,yps,rs->xy', site, site.conj(), rightEnv)
+    site = self.sites[target]
+    position = qubit - self.firsts[target]
+    site = site.reshape(site.shape[0], 2 ** position, 2, -1, site.shape[2])
+    rho = np.einsum('xy,xajbr,yakbs,rs->jk', leftEnv, site, site.conj(), rightEnv)
+    values, vectors = np.linalg.eigh(rho)
+    return vectors[:, -1] * np.sqrt(max(values[-1], 0.0))
@@ -0,0 +1,146 @@
+import os
+import tempfile
+
+import numpy as np
+
+from shor_common import statevec_sim
+from shor_common.circuit_opt import gateRoles
+
+# Statevectors larger than RAM, for the NumPy engine.
+#
+# A ChunkedState keeps its 2^n amplitudes in an np.memmap over a scratch file,
+# as 2^(n-c) chunks of 2^c contiguous amplitudes (c = chunkQubits). With qubit
+# 0 as the most significant bit, the first n-c qubits ("global") select the
+# chunk and the other c ("local") index inside it.
+#
+# applyOps splits the ops into passes and streams each pass once over the
+# file, in file order. A pass mixes at most maxGroupQubits global qubits (the
+# targets of non-diagonal gates), so it loads groups of chunks that differ only
+# in those, runs all of its ops on each group with statevec_sim.applyOps and
+# writes it back. Every other global qubit is fixed within a group: controls on
+# it either drop out or disable the gate, and diagonal gates on it become a
+# scalar, so a group with nothing left to do is not read at all.
+#
+# complex64 halves the file and the traffic, at ~1e-7 relative precision.
+
+class ChunkedState:
+  def __init__(self, nbqubits, dtype=np.complex128, chunkQubits=20, directory=None, maxGroupQubits=2):
+    # Starts in |0...0>. The scratch file is created in directory (the system
+    # temporary directory by default) and removed by close().
+    self.nbqubits = nbqubits
+    self.chunkQubits = min(chunkQubits, nbqubits)
+    self.globalQubits = nbqubits - self.chunkQubits
+    self.maxGroupQubits = maxGroupQubits
+    fd, self.path = tempfile.mkstemp(prefix='statevec_', suffix='.dat', dir=directory)
+    os.close(fd)
+    self.amplitudes = np.memmap(self.path, dtype=dtype, mode='w+',
+                                shape=(2 ** self.globalQubits, 2 ** self.chunkQubits))
+    self.amplitudes[0, 0] = 1
+
+  def close(self):
+    del self.amplitudes
+    os.remove(self.path)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def toArray(self):
+    # The whole state in memory, for states that fit.
+    return np.array(self.amplitudes).reshape(-1)
+
+  def _groups(self, mixed):
+    # (fixed, rows) per group of chunks differing only in the mixed global
+    # qubits: the values of the other global qubits and the chunk indices, in
+    # increasing order.
+    bits = [self.globalQubits - 1 - qubit for qubit in mixed]
+    mask = sum(1 << bit for bit in bits)
+    offsets = [sum(((i >> (len(bits) - 1 - k)) & 1) << bit for k, bit in enumerate(bits))
+               for i in range(2 ** len(bits))]
+    for base in range(2 ** self.globalQubits):
+      if base & mask:
+        continue
+      fixed = {qubit: (base >> (self.globalQubits - 1 - qubit)) & 1
+               for qubit in range(self.globalQubits) if qubit not in mixed}
+      yield fixed, [base | offset for offset in offsets]
+
+  def _position(self, mixed):
+    # Qubit -> qubit of the group array: the mixed global qubits first.
+    position = {qubit: k for k, qubit in enumerate(mixed)}
+    position.update({qubit: len(mixed) + qubit - self.globalQubits
+                     for qubit in range(self.globalQubits, self.nbqubits)})
+    return position
+
+  def _mixedQubits(self, op):
+    return {qubit for qubit, role in gateRoles(op).items() if qubit < self.globalQubits and role != 'Z'}
+
+  def _passes(self, ops):
+    passes, mixed, current = [], set(), []
+    for op in ops:
+      if op[0] == 'MEASURE':
+        continue
+      opMixed = self._mixedQubits(op)
+      if current and len(mixed | opMixed) > self.maxGroupQubits:
+        passes.append((sorted(mixed), current))
+        mixed, current = set(), []
+      mixed |= opMixed
+      current.append(op)
+    if current:
+      passes.append((sorted(mixed), current))
+    return passes
+
+  def _groupOp(self, op, fixed, position):
+    # (op, factor): op on the group array, or None when the fixed qubits
+    # disable it or turn it into the scalar factor.
+    name = op[0]
+    if name in ('CNOT', 'CCNOT'):
+      if any(fixed[control] == 0 for control in op[1:-1] if control in fixed):
+        return None, 1
+      controls = [position[control] for control in op[1:-1] if control not in fixed]
+      target = position[op[-1]]
+      if not controls:
+        return ('X', target), 1
+      return (('CNOT', controls[0], target) if len(controls) == 1 else ('CCNOT', controls[0], controls[1], target)), 1
+    if name in ('Z', 'S', 'RZ') and op[1] in fixed:
+      matrix = statevec_sim.rz(op[2]) if name == 'RZ' else statevec_sim._singleQubitGates[name]
+      return None, matrix[fixed[op[1]], fixed[op[1]]]
+    if name == 'PERM':
+      return (name, tuple(position[qubit] for qubit in op[1]), op[2]), 1
+    return (name, position[op[1]]) + op[2:], 1
+
+  def applyOps(self, ops):
+    # As statevec_sim.applyOps; measurements are skipped.
+    for mixed, passOps in self._passes(ops):
+      position = self._position(mixed)
+      for fixed, rows in self._groups(mixed):
+        groupOps, factor = [], 1
+        for op in passOps:
+          op, opFactor = self._groupOp(op, fixed, position)
+          factor *= opFactor
+          if op is not None:
+            groupOps.append(op)
+        if not groupOps and factor == 1:
+          continue
+        # A single chunk is updated in place; a group is copied out and back.
+        group = self.amplitudes[rows[0]] if len(rows) == 1 else self.amplitudes[rows].reshape(-1)
+        statevec_sim.applyOps(group, groupOps)
+        if factor != 1:
+          group *= factor
+        if len(rows) > 1:
+          self.amplitudes[rows] = group.reshape(len(rows), -1)
+    self.amplitudes.flush()
+
+  def dataQubitAmplitudes(self, qubit=0):
+    # The amplitudes of qubit, assuming the state is (close to) a product of
+    # it and the rest, as statevec_util.splitDataQubit but from the qubit's
+    # 2x2 Gram matrix, accumulated in one pass over the file.
+    mixed = [qubit] if qubit < self.globalQubits else []
+    right = 2 ** (len(mixed) + self.chunkQubits - self._position(mixed)[qubit] - 1)
+    gram = np.zeros((2, 2), dtype=complex)
+    for _, rows in self._groups(mixed):
+      view = np.asarray(self.amplitudes[rows], dtype=complex).reshape(-1, 2, right)
+      gram += np.einsum('ajb,akb->jk', view, view.conj())
+    values, vectors = np.linalg.eigh(gram)
+    return vectors[:, -1] * np.sqrt(max(values[-1], 0.0))
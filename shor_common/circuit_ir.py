@@ -0,0 +1,219 @@
+import math
+
+# Framework-neutral circuit representation of the Shor code.
+#
+# A circuit is a list of op tuples, a gate name followed by its qubit indices
+# and, for rotations, the angle: ('H', q), ('X', q), ('Y', q), ('Z', q),
+# ('S', q), ('RX', q, theta), ('RZ', q, phi), ('CNOT', control, target),
+# ('CCNOT', control1, control2, target) and ('MEASURE', q). This is the same
+# format the NumPy and stabilizer simulators run. The builders below mirror
+# the per-framework scripts; the to* functions lower a circuit to each
+# framework. Framework modules are only imported when their lowering is used.
+#
+# EncodeOps and DecodeOps are the one definition of the Shor encoder and
+# decoder: the simulators, the syndrome-measurement variant and the
+# concatenated codes all build on them.
+
+# Outer phase-flip indices and the three bit-flip blocks of the Shor code.
+SHOR_LAYOUT = ((0, 3, 6), ((0, 1, 2), (3, 4, 5), (6, 7, 8)))
+
+def PrepareState(inputValue):
+  return [('RX', 0, inputValue['theta']), ('RZ', 0, inputValue['phi'])]
+
+def BitFlipEncode(indices):
+  return [('CNOT', indices[0], indices[1]),
+          ('CNOT', indices[0], indices[2])]
+
+def PhaseFlipEncode(indices):
+  return BitFlipEncode(indices) + [('H', idx) for idx in indices]
+
+def ErrorIntroduction(errorIdxs):
+  ops = []
+  for err in errorIdxs:
+    ops += [('X', err), ('Z', err)]
+  return ops
+
+def BitFlipDecode(indices):
+  return [('CNOT', indices[0], indices[1]),
+          ('CNOT', indices[0], indices[2]),
+          ('CCNOT', indices[2], indices[1], indices[0])]
+
+def PhaseFlipDecode(indices):
+  return [('H', idx) for idx in indices] + BitFlipDecode(indices)
+
+def EncodeOps(layout=SHOR_LAYOUT):
+  outer, blocks = layout
+  ops = PhaseFlipEncode(outer)
+  for block in blocks:
+    ops += BitFlipEncode(block)
+  return ops
+
+def DecodeOps(layout=SHOR_LAYOUT):
+  # Decoding with the coherent (Toffoli) correction.
+  outer, blocks = layout
+  ops = []
+  for block in reversed(blocks):
+    ops += BitFlipDecode(block)
+  return ops + PhaseFlipDecode(outer)
+
+def CliffordDecodeOps(layout=SHOR_LAYOUT):
+  # The inverse of EncodeOps, without correction; every gate in it is
+  # self-inverse. For the stabilizer simulators, which correct classically.
+  return list(reversed(EncodeOps(layout)))
+
+def createProgram(inputValue, errorIdxs, measure=False):
+  ops = PrepareState(inputValue)
+  ops += EncodeOps()
+  ops += ErrorIntroduction(errorIdxs)
+  ops += DecodeOps()
+
+  if measure:
+    ops += [('MEASURE', idx) for idx in range(nbqubitsOf(ops))]
+  return ops
+
+def nbqubitsOf(ops):
+  return 1 + max(qubit for op in ops for qubit in qubitsOf(op))
+
+def qubitsOf(op):
+  if op[0] in ('RX', 'RZ', 'U'):
+    return op[1:2]
+  if op[0] == 'PERM':
+    return tuple(op[1])
+  return op[1:]
+
+def toQiskit(ops, nbqubits):
+  import qiskit
+  qubits = qiskit.QuantumRegister(nbqubits, 'q')
+  binary = qiskit.ClassicalRegister(nbqubits, 'b')
+  circuit = qiskit.QuantumCircuit(qubits, binary, name='Shor-code')
+  gates = {'H': circuit.h, 'X': circuit.x, 'Y': circuit.y, 'Z': circuit.z, 'S': circuit.s,
+           'CNOT': circuit.cx, 'CCNOT': circuit.ccx}
+  for op in ops:
+    if op[0] in ('RX', 'RZ'):
+      (circuit.rx if op[0] == 'RX' else circuit.rz)(op[2], qubits[op[1]])
+    elif op[0] == 'MEASURE':
+      circuit.measure(qubits[op[1]], binary[op[1]])
+    else:
+      gates[op[0]](*[qubits[idx] for idx in op[1:]])
+  return circuit
+
+def toCirq(ops, nbqubits):
+  import cirq
+  qubits = [cirq.GridQubit(0, i) for i in range(nbqubits)]
+  gates = {'H': cirq.H, 'X': cirq.X, 'Y': cirq.Y, 'Z': cirq.Z, 'S': cirq.S,
+           'CNOT': cirq.CNOT, 'CCNOT': cirq.TOFFOLI}
+  circuit = cirq.Circuit()
+  for op in ops:
+    if op[0] in ('RX', 'RZ'):
+      rotation = cirq.rx if op[0] == 'RX' else cirq.rz
+      circuit.append(rotation(op[2])(qubits[op[1]]))
+    elif op[0] == 'MEASURE':
+      circuit.append(cirq.measure(qubits[op[1]], key='q' + str(op[1])))
+    else:
+      circuit.append(gates[op[0]](*[qubits[idx] for idx in op[1:]]))
+  return circuit
+
+def toQLM(ops, nbqubits):
+  from qat.lang.AQASM import Program, H, X, Y, Z, S, RX, RZ, CNOT, CCNOT
+  circuit = Program()
+  qubits = circuit.qalloc(nbqubits)
+  gates = {'H': H, 'X': X, 'Y': Y, 'Z': Z, 'S': S, 'CNOT': CNOT, 'CCNOT': CCNOT}
+  for op in ops:
+    if op[0] in ('RX', 'RZ'):
+      circuit.apply((RX if op[0] == 'RX' else RZ)(op[2]), qubits[op[1]])
+    elif op[0] == 'MEASURE':
+      circuit.measure(qubits[op[1]])
+    else:
+      circuit.apply(gates[op[0]], *[qubits[idx] for idx in op[1:]])
+  return circuit
+
+def toPyQuil(ops, nbqubits):
+  from pyquil.quil import Program
+  import pyquil.gates as gates
+  program = Program()
+  ro = None
+  for op in ops:
+    if op[0] in ('RX', 'RZ'):
+      program += (gates.RX if op[0] == 'RX' else gates.RZ)(op[2], op[1])
+    elif op[0] == 'MEASURE':
+      if ro is None:
+        ro = program.declare('ro', memory_type='BIT', memory_size=nbqubits)
+      program += gates.MEASURE(op[1], ro[op[1]])
+    else:
+      program += getattr(gates, op[0])(*op[1:])
+  return program
+
+def toProjectQ(ops, qubits):
+  # ProjectQ has no circuit object: the ops are sent to the engine that owns qubits.
+  from projectq import ops as pq
+  gates = {'H': pq.H, 'X': pq.X, 'Y': pq.Y, 'Z': pq.Z, 'S': pq.S, 'CNOT': pq.CNOT, 'CCNOT': pq.Toffoli}
+  for op in ops:
+    if op[0] in ('RX', 'RZ'):
+      (pq.Rx if op[0] == 'RX' else pq.Rz)(op[2]) | qubits[op[1]]
+    elif op[0] == 'MEASURE':
+      pq.Measure | qubits[op[1]]
+    elif len(op) == 2:
+      gates[op[0]] | qubits[op[1]]
+    else:
+      gates[op[0]] | tuple(qubits[idx] for idx in op[1:])
+  return qubits
+
+def toQubiter(ops, wr, nbqubits):
+  # Writes the ops with a Qubiter SEO_writer. Qubiter rotations take negative
+  # half-angles, as in Shor_code_Qubiter_arbitrary_state.
+  from Controls import Controls
+  from OneBitGates import OneBitGates
+  simple = {'H': wr.write_H, 'X': wr.write_X, 'Y': wr.write_Y, 'Z': wr.write_Z}
+  for op in ops:
+    if op[0] in ('RX', 'RZ'):
+      (wr.write_Rx if op[0] == 'RX' else wr.write_Rz)(op[1], -0.5 * op[2])
+    elif op[0] == 'S':
+      wr.write_one_bit_gate(op[1], OneBitGates.P_1_phase_fac, [math.pi / 2])
+    elif op[0] == 'CNOT':
+      wr.write_cnot(control_bit=op[1], target_bit=op[2])
+    elif op[0] == 'CCNOT':
+      controls = Controls(nbqubits)
+      controls.bit_pos_to_kind = {op[1]: True, op[2]: True}
+      controls.refresh_lists()
+      wr.write_controlled_one_bit_gate(op[3], controls, OneBitGates.sigx)
+    elif op[0] == 'MEASURE':
+      wr.write_MEAS(op[1], kind=2)
+    else:
+      simple[op[0]](op[1])
+  return wr
+
+_cqasmNames = {'H': 'H', 'X': 'X', 'Y': 'Y', 'Z': 'Z', 'S': 'S', 'RX': 'RX', 'RZ': 'RZ',
+               'CNOT': 'CNOT', 'CCNOT': 'Toffoli', 'MEASURE': 'measure'}
+
+def toCQASM(ops, nbqubits):
+  lines = ['version 1.0', 'qubits ' + str(nbqubits)]
+  for op in ops:
+    qubits = ', '.join('q[' + str(idx) + ']' for idx in qubitsOf(op))
+    if op[0] in ('RX', 'RZ'):
+      lines.append(_cqasmNames[op[0]] + ' ' + qubits + ', ' + repr(float(op[2])))
+    else:
+      lines.append(_cqasmNames[op[0]] + ' ' + qubits)
+  return '\n'.join(lines) + '\n'
+
+def fromCQASM(text):
+  # Parse cQASM as written by toCQASM (or by hand, one gate per line) back
+  # into (ops, nbqubits).
+  names = {name.lower(): op for op, name in _cqasmNames.items()}
+  ops = []
+  nbqubits = None
+  for line in text.splitlines():
+    line = line.split('#')[0].strip()
+    if not line or line.startswith('version'):
+      continue
+    name, _, arguments = line.partition(' ')
+    if name == 'qubits':
+      nbqubits = int(arguments)
+      continue
+    arguments = [argument.strip() for argument in arguments.split(',')]
+    qubits = tuple(int(argument[2:-1]) for argument in arguments if argument.startswith('q['))
+    op = names[name.lower()]
+    if op in ('RX', 'RZ'):
+      ops.append((op,) + qubits + (float(arguments[-1]),))
+    else:
+      ops.append((op,) + qubits)
+  return ops, nbqubits
@@ -0,0 +1,171 @@
+import numpy as np
+
+from shor_common.statevec_sim import _singleQubitGates, rx, rz
+
+# Optimisation pass over circuit_ir op lists, for the NumPy engine.
+#
+# Gates are moved past each other only when they commute. Every gate used
+# here is diagonal (Z-type) or a function of X (X-type) on each qubit it
+# touches: controls, Z, S and RZ are Z-type, CNOT/CCNOT targets, X and RX are
+# X-type, H and Y are neither. Two gates commute when every qubit they share
+# has the same type in both.
+#
+# The passes:
+#  - cancelInverses removes pairs of equal self-inverse gates (H, X, Y, Z,
+#    CNOT, CCNOT) with only commuting gates in between.
+#  - dropZeroControlled removes CNOT/CCNOT gates with a control still in |0>,
+#    for circuits that start from |0...0>.
+#  - fuseSingleQubit turns each run of single-qubit gates on one qubit into
+#    one ('U', qubit, matrix) op, or drops it when the product is the identity
+#    up to a global phase.
+#  - mergeFans turns consecutive CNOTs from one control into one
+#    ('PERM', qubits, table) op: basis state i of the qubits (the first one
+#    most significant) goes to table[i].
+#
+# The first two are repeated until nothing changes, so for the zero-error
+# pattern encoding and decoding cancel and only the state preparation is left.
+# 'U' and 'PERM' ops only run on statevec_sim.applyOps, and measurements are
+# dropped since applyOps skips them anyway.
+
+_selfInverse = ('H', 'X', 'Y', 'Z', 'CNOT', 'CCNOT')
+
+def gateRoles(op):
+  # Qubit -> 'Z' where op is diagonal on it, 'X' where it only flips it, or
+  # None (neither). Ops commute when they agree on every shared qubit.
+  name = op[0]
+  if name in ('CNOT', 'CCNOT'):
+    roles = {control: 'Z' for control in op[1:-1]}
+    roles[op[-1]] = 'X'
+    return roles
+  if name in ('Z', 'S', 'RZ'):
+    return {op[1]: 'Z'}
+  if name in ('X', 'RX'):
+    return {op[1]: 'X'}
+  if name == 'PERM':
+    return dict.fromkeys(op[1])
+  return {op[1]: None}
+
+def commute(op1, op2):
+  roles1, roles2 = gateRoles(op1), gateRoles(op2)
+  return all(roles1[qubit] is not None and roles1[qubit] == roles2[qubit] for qubit in roles1 if qubit in roles2)
+
+def _sameGate(op1, op2):
+  if op1[0] != op2[0]:
+    return False
+  if op1[0] == 'CCNOT':
+    return set(op1[1:3]) == set(op2[1:3]) and op1[3] == op2[3]
+  return op1 == op2
+
+def cancelInverses(ops):
+  kept = []
+  for op in ops:
+    if op[0] in _selfInverse:
+      qubits = set(gateRoles(op))
+      for k in range(len(kept) - 1, -1, -1):
+        other = kept[k]
+        if other is None or not qubits & set(gateRoles(other)):
+          continue
+        if _sameGate(op, other):
+          kept[k] = op = None
+          break
+        if not commute(op, other):
+          break
+    if op is not None:
+      kept.append(op)
+  return [op for op in kept if op is not None]
+
+def dropZeroControlled(ops, zeroQubits):
+  # zeroQubits: the qubits that are |0> at the start.
+  zero = set(zeroQubits)
+  kept = []
+  for op in ops:
+    if op[0] in ('CNOT', 'CCNOT') and zero & set(op[1:-1]):
+      continue
+    zero -= {qubit for qubit, role in gateRoles(op).items() if role != 'Z'}
+    kept.append(op)
+  return kept
+
+def _matrix(op):
+  if op[0] == 'U':
+    return op[2]
+  if op[0] == 'RX':
+    return rx(op[2])
+  if op[0] == 'RZ':
+    return rz(op[2])
+  return _singleQubitGates[op[0]]
+
+def fuseSingleQubit(ops):
+  fused = []
+  runs = {}
+
+  def flush(qubit):
+    run = runs.pop(qubit, [])
+    if len(run) == 1:
+      fused.append(run[0])
+    elif run:
+      matrix = np.eye(2, dtype=complex)
+      for op in run:
+        matrix = _matrix(op) @ matrix
+      # A multiple of the identity is only a global phase.
+      if not np.allclose(matrix, matrix[0, 0] * np.eye(2)):
+        fused.append(('U', qubit, matrix))
+
+  for op in ops:
+    if op[0] in ('H', 'X', 'Y', 'Z', 'S', 'RX', 'RZ', 'U'):
+      runs.setdefault(op[1], []).append(op)
+      continue
+    for qubit in gateRoles(op):
+      flush(qubit)
+    fused.append(op)
+  for qubit in list(runs):
+    flush(qubit)
+  return fused
+
+def permutationTable(qubits, ops):
+  # Where each basis state of qubits goes under X/CNOT/CCNOT ops on those qubits.
+  nbqubits = len(qubits)
+  position = {qubit: nbqubits - 1 - k for k, qubit in enumerate(qubits)}
+  table = np.arange(2 ** nbqubits)
+  for op in ops:
+    active = np.ones(len(table), dtype=bool)
+    for control in op[1:-1]:
+      active &= (table >> position[control]) & 1 == 1
+    table = np.where(active, table ^ (1 << position[op[-1]]), table)
+  return table
+
+def mergeFans(ops):
+  merged = []
+  run = []
+
+  def flush():
+    if len(run) == 1:
+      merged.append(run[0])
+    elif run:
+      qubits = (run[0][1],) + tuple(op[2] for op in run)
+      merged.append(('PERM', qubits, permutationTable(qubits, run)))
+    run.clear()
+
+  for op in ops:
+    if op[0] == 'CNOT' and (not run or (run[0][1] == op[1] and op[2] not in [other[2] for other in run])):
+      run.append(op)
+      continue
+    flush()
+    if op[0] == 'CNOT':
+      run.append(op)
+    else:
+      merged.append(op)
+  flush()
+  return merged
+
+def optimize(ops, zeroQubits=None):
+  # zeroQubits defaults to every qubit, for circuits that start from |0...0>;
+  # pass () when the initial state is arbitrary.
+  ops = [op for op in ops if op[0] != 'MEASURE']
+  if zeroQubits is None:
+    zeroQubits = {qubit for op in ops for qubit in gateRoles(op)}
+  while True:
+    before = len(ops)
+    ops = dropZeroControlled(cancelInverses(ops), zeroQubits)
+    if len(ops) == before:
+      break
+  return mergeFans(fuseSingleQubit(ops))
@@ -0,0 +1,115 @@
+import numpy as np
+
+from shor_common import circuit_ir
+from shor_common.stabilizer_sim import Tableau, PauliFrame, runOps
+
+# Concatenated Shor codes. At level L the data qubit is spread over 9^L
+# physical qubits: the level-1 code is applied to qubits 0, s, ..., 8s with
+# stride s = 9^(L-1), then each of those is encoded again with stride s/9,
+# down to stride 1. Level 1 is the ordinary code with SHOR_LAYOUT.
+#
+# Encoding runs outermost level first; decoding runs the innermost level
+# first. Both are built from circuit_ir.EncodeOps/DecodeOps on each level's
+# layouts, so they run on the NumPy engine, the stabilizer simulators and,
+# through circuit_ir, on every framework.
+
+def shorLayoutOn(qubits):
+  # SHOR_LAYOUT on nine arbitrary qubit indices.
+  q = list(qubits)
+  return ((q[0], q[3], q[6]), ((q[0], q[1], q[2]), (q[3], q[4], q[5]), (q[6], q[7], q[8])))
+
+def nbqubitsForLevel(level):
+  return 9 ** level
+
+def concatenatedLayouts(level):
+  # Layouts per level, outermost first.
+  layouts = []
+  heads = [0]
+  for depth in range(level):
+    stride = 9 ** (level - depth - 1)
+    layouts.append([shorLayoutOn([head + k * stride for k in range(9)]) for head in heads])
+    heads = [head + k * stride for head in heads for k in range(9)]
+  return layouts
+
+def EncodeOps(level):
+  ops = []
+  for layouts in concatenatedLayouts(level):
+    for layout in layouts:
+      ops += circuit_ir.EncodeOps(layout)
+  return ops
+
+def DecodeOps(level):
+  # Coherent (Toffoli) decode, innermost level first.
+  ops = []
+  for layouts in reversed(concatenatedLayouts(level)):
+    for layout in layouts:
+      ops += circuit_ir.DecodeOps(layout)
+  return ops
+
+def CliffordDecodeOps(level):
+  # Inverse of EncodeOps without any correction, for the stabilizer simulators.
+  return list(reversed(EncodeOps(level)))
+
+def createProgram(inputValue, errorIdxs, level):
+  return circuit_ir.PrepareState(inputValue) + EncodeOps(level) + circuit_ir.ErrorIntroduction(errorIdxs) \
+         + DecodeOps(level)
+
+def stabilizerGenerators(level):
+  # The code space is the image under EncodeOps of |data>|0...0>, so its
+  # stabilizer generators are the images of Z on every qubit but the data
+  # qubit. They are found by pushing those Z's through the encoder as Pauli
+  # frames. Returns boolean (x, z) arrays of shape (n - 1, n); signs are
+  # dropped, syndromes are read relative to an error-free run.
+  nbqubits = nbqubitsForLevel(level)
+  frame = PauliFrame(nbqubits, nbqubits - 1)
+  frame.z[np.arange(nbqubits - 1), np.arange(1, nbqubits)] = True
+  runOps(frame, EncodeOps(level))
+  return frame.x, frame.z
+
+def generatorMeasurementOps(generatorsX, generatorsZ, firstAncilla):
+  # Measure each generator on its own fresh ancilla: H, controlled Paulis from
+  # the ancilla, H, measure. Controlled-Z and controlled-Y are built from
+  # CNOT with H and S basis changes on the target.
+  ops = []
+  for ancilla, (xs, zs) in enumerate(zip(generatorsX, generatorsZ), firstAncilla):
+    ops += [('H', ancilla)]
+    for qubit in np.flatnonzero(xs | zs):
+      qubit = int(qubit)
+      if xs[qubit] and zs[qubit]:
+        ops += [('S', qubit)] * 3 + [('CNOT', ancilla, qubit), ('S', qubit)]
+      elif zs[qubit]:
+        ops += [('H', qubit), ('CNOT', ancilla, qubit), ('H', qubit)]
+      else:
+        ops += [('CNOT', ancilla, qubit)]
+    ops += [('H', ancilla), ('MEASURE', ancilla)]
+  return ops
+
+def runStabilizerRound(level, errorIdxs, rng=None):
+  # One round on the tableau: encode |0>, apply the errors, measure every
+  # stabilizer generator and undo the encoding. Returns the syndrome
+  # (relative to an error-free run) and the final data-qubit outcome.
+  nbqubits = nbqubitsForLevel(level)
+  generatorsX, generatorsZ = stabilizerGenerators(level)
+  measureOps = generatorMeasurementOps(generatorsX, generatorsZ, nbqubits)
+  reference = Tableau(2 * nbqubits - 1, rng)
+  runOps(reference, EncodeOps(level))
+  referenceSyndrome = np.array([outcome for outcome, _ in runOps(reference, measureOps)])
+  tableau = Tableau(2 * nbqubits - 1, rng)
+  runOps(tableau, EncodeOps(level) + circuit_ir.ErrorIntroduction(errorIdxs))
+  syndrome = np.array([outcome for outcome, _ in runOps(tableau, measureOps)]) ^ referenceSyndrome
+  runOps(tableau, CliffordDecodeOps(level))
+  outcome, _ = tableau.measure(0)
+  return syndrome, outcome
+
+def runPauliFrameRound(level, allErrorIdxs):
+  # The same round for a batch of error patterns as Pauli frames. Returns the
+  # syndromes (P, n - 1) and the residual X/Z on the data qubit.
+  nbqubits = nbqubitsForLevel(level)
+  generatorsX, generatorsZ = stabilizerGenerators(level)
+  frame = PauliFrame(2 * nbqubits - 1, len(allErrorIdxs))
+  for patternIdx, errorIdxs in enumerate(allErrorIdxs):
+    frame.x[patternIdx, list(errorIdxs)] ^= True
+    frame.z[patternIdx, list(errorIdxs)] ^= True
+  syndrome = np.array(runOps(frame, generatorMeasurementOps(generatorsX, generatorsZ, nbqubits))).T
+  runOps(frame, CliffordDecodeOps(level))
+  return syndrome, frame.x[:, 0], frame.z[:, 0]
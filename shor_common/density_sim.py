@@ -0,0 +1,131 @@
+import math
+import numpy as np
+
+from shor_common.statevec_sim import (SHOR_LAYOUT, H, applyGate, BitFlipEncode, BitFlipDecode, PhaseFlipDecode,
+                                      DecodeCircuit, compiledCode)
+from shor_common.statevec_util import statesForInputs
+
+# Exact density-matrix evaluation of the Shor code under noise.
+#
+# A Kraus channel acts on every qubit between encoding and decoding (where
+# ErrorIntroduction sits) and the result is the fidelity of the decoded data
+# qubit with the input state.
+#
+# The block method never builds the 2^n x 2^n matrix. After the outer
+# PhaseFlipEncode the logical states are products over the bit-flip blocks,
+# |i_L> = |s_i>|s_i>|s_i>, so the encoded density matrix is a sum of four
+# products of per-block operators |s_i><s_j|. Channel and BitFlipDecode act
+# blockwise on those 2^k x 2^k operators. Only the block heads take part in
+# the outer PhaseFlipDecode, so the other block qubits are traced out first and
+# the outer decode works on a 2^b x 2^b matrix, b being the number of blocks.
+#
+# The dense method applies the channel to the full matrix and is limited by
+# maxBytes.
+
+DEFAULT_MAX_BYTES = 2 ** 30
+
+def krausOperators(channel, p):
+  identity = np.eye(2, dtype=complex)
+  if channel == 'bitflip':
+    return [math.sqrt(1 - p) * identity, math.sqrt(p) * np.array([[0, 1], [1, 0]], dtype=complex)]
+  if channel == 'phaseflip':
+    return [math.sqrt(1 - p) * identity, math.sqrt(p) * np.array([[1, 0], [0, -1]], dtype=complex)]
+  if channel == 'depolarizing':
+    paulis = [np.array([[0, 1], [1, 0]]), np.array([[0, -1j], [1j, 0]]), np.array([[1, 0], [0, -1]])]
+    return [math.sqrt(1 - p) * identity] + [math.sqrt(p / 3) * np.asarray(pauli, dtype=complex) for pauli in paulis]
+  if channel == 'amplitudedamping':
+    return [np.array([[1, 0], [0, math.sqrt(1 - p)]], dtype=complex),
+            np.array([[0, math.sqrt(p)], [0, 0]], dtype=complex)]
+  raise ValueError("Unknown channel: " + str(channel))
+
+def _checkMemory(dim, maxBytes):
+  needed = 16 * dim * dim
+  if needed > maxBytes:
+    raise MemoryError("Density matrix of dimension " + str(dim) + " needs " + str(needed)
+                      + " bytes, more than the limit of " + str(maxBytes))
+
+def applyKraus(rho, krausOps, qubit):
+  # Apply a single-qubit channel to a density matrix (qubit 0 = most significant bit).
+  dim = rho.shape[0]
+  right = dim // 2 ** (qubit + 1)
+  view = rho.reshape(-1, 2, right, dim // right // 2, 2, right)
+  out = np.zeros_like(view)
+  for k in krausOps:
+    out += np.einsum('ij,ajbckd,lk->aibcld', k, view, np.conj(k))
+  return out.reshape(dim, dim)
+
+def _unitary(circuit, nbqubits):
+  # Unitary of a statevec_sim circuit on nbqubits, circuit(state) acting in place.
+  columns = np.eye(2 ** nbqubits, dtype=complex)
+  circuit(columns)
+  return columns.T
+
+def _reduceToQubit(rho, qubit):
+  dim = rho.shape[0]
+  right = dim // 2 ** (qubit + 1)
+  view = rho.reshape(-1, 2, right, dim // right // 2, 2, right)
+  return np.einsum('aibajb->ij', view)
+
+def _fidelity(rhoData, inputState):
+  return float(np.real(np.conj(inputState) @ rhoData @ inputState))
+
+def logicalFidelityDense(inputValue, channel, p, layout=SHOR_LAYOUT, maxBytes=DEFAULT_MAX_BYTES):
+  nbqubits = sum(len(block) for block in layout[1])
+  _checkMemory(2 ** nbqubits, maxBytes)
+  inputState = statesForInputs(inputValue['theta'], inputValue['phi'])
+  codewords, _ = compiledCode(layout, nbqubits)
+  encoded = inputState @ codewords
+  rho = np.outer(encoded, np.conj(encoded))
+  krausOps = krausOperators(channel, p)
+  for qubit in range(nbqubits):
+    rho = applyKraus(rho, krausOps, qubit)
+  decode = _unitary(lambda state: DecodeCircuit(state, layout), nbqubits)
+  rho = decode @ rho @ np.conj(decode).T
+  return _fidelity(_reduceToQubit(rho, 0), inputState)
+
+def logicalFidelityBlocks(inputValue, channel, p, layout=SHOR_LAYOUT, maxBytes=DEFAULT_MAX_BYTES):
+  outer, blocks = layout
+  if any(head != block[0] for head, block in zip(outer, blocks)):
+    raise ValueError("Block method needs the outer indices to be the first qubit of each block")
+  blockSize = len(blocks[0])
+  _checkMemory(2 ** max(blockSize, len(blocks)), maxBytes)
+  inputState = statesForInputs(inputValue['theta'], inputValue['phi'])
+  krausOps = krausOperators(channel, p)
+  local = list(range(blockSize))
+
+  # Block states |s_0>, |s_1>: BitFlipEncode of H|0> and H|1> on the head qubit.
+  blockStates = np.zeros((2, 2 ** blockSize), dtype=complex)
+  blockStates[0, 0] = 1
+  blockStates[1, 2 ** (blockSize - 1)] = 1
+  applyGate(blockStates, H, 0)
+  BitFlipEncode(blockStates, local)
+  blockDecode = _unitary(lambda state: BitFlipDecode(state, local), blockSize)
+
+  # Head-qubit operator of each block after noise, BitFlipDecode and tracing
+  # out the other qubits, for all four |s_i><s_j|.
+  heads = np.zeros((2, 2, 2, 2), dtype=complex)
+  for i in range(2):
+    for j in range(2):
+      m = np.outer(blockStates[i], np.conj(blockStates[j]))
+      for qubit in local:
+        m = applyKraus(m, krausOps, qubit)
+      m = blockDecode @ m @ np.conj(blockDecode).T
+      heads[i, j] = _reduceToQubit(m, 0)
+
+  coefficients = np.outer(inputState, np.conj(inputState))
+  nbBlocks = len(blocks)
+  rhoOuter = np.zeros((2 ** nbBlocks, 2 ** nbBlocks), dtype=complex)
+  for i in range(2):
+    for j in range(2):
+      term = np.array([[coefficients[i, j]]])
+      for _ in range(nbBlocks):
+        term = np.kron(term, heads[i, j])
+      rhoOuter += term
+  outerDecode = _unitary(lambda state: PhaseFlipDecode(state, list(range(nbBlocks))), nbBlocks)
+  rhoOuter = outerDecode @ rhoOuter @ np.conj(outerDecode).T
+  return _fidelity(_reduceToQubit(rhoOuter, 0), inputState)
+
+def logicalFidelity(inputValue, channel, p, layout=SHOR_LAYOUT, method='blocks', maxBytes=DEFAULT_MAX_BYTES):
+  if method == 'dense':
+    return logicalFidelityDense(inputValue, channel, p, layout, maxBytes)
+  return logicalFidelityBlocks(inputValue, channel, p, layout, maxBytes)
@@ -0,0 +1,137 @@
+import itertools
+
+import numpy as np
+
+from shor_common.shor_syndrome_code import syndromeChecks
+from shor_common.circuit_ir import SHOR_LAYOUT
+
+# Lookup-table decoding of Pauli errors on CSS codes, without simulation.
+#
+# A CSS code is given by its X-type checks hx and Z-type checks hz (boolean
+# rows over the qubits) and an X-type and a Z-type logical operator. X errors
+# are decoded from the hz syndrome and Z errors from the hx syndrome, each
+# with a table, built once, of a minimum-weight correction per packed
+# syndrome. A pattern fails when the residual (error plus correction)
+# anticommutes with the logical operator of the other type.
+#
+# Syndromes and logical parities are linear in the error bits, so patterns
+# are evaluated packed eight qubits per byte (qubit q is bit q % 8 of byte
+# q // 8): a table per byte position gives each byte's contribution (the
+# syndrome bits, then the logical parity bit), the contributions are XORed,
+# and the parity of the correction is looked up by syndrome. That is a few
+# lookups and XORs per pattern, vectorised over arrays of patterns.
+
+MAX_CHECKS = 24
+
+def packErrors(errors):
+  # (N, n) boolean error patterns -> (N, ceil(n / 8)) bytes.
+  return np.packbits(np.asarray(errors, dtype=bool), axis=-1, bitorder='little')
+
+def errorMasks(allErrorIdxs, nbqubits):
+  # Boolean (N, n) patterns for lists of error indices. As in
+  # ErrorIntroduction, every index gets an X and a Z error, so the same array
+  # serves as X and Z patterns.
+  masks = np.zeros((len(allErrorIdxs), nbqubits), dtype=bool)
+  for patternIdx, errorIdxs in enumerate(allErrorIdxs):
+    masks[patternIdx, list(errorIdxs)] = True
+  return masks
+
+def _byteTables(rows):
+  # (nbytes, 256) tables: bit k of tables[p, b] is the parity of rows[k] on
+  # the qubits of byte position p that are set in b.
+  nbrows, nbqubits = rows.shape
+  nbytes = (nbqubits + 7) // 8
+  padded = np.zeros((nbrows, nbytes * 8), dtype=int)
+  padded[:, :nbqubits] = rows
+  byteBits = (np.arange(256)[:, None] >> np.arange(8)) & 1
+  tables = np.zeros((nbytes, 256), dtype=np.uint64)
+  for k in range(nbrows):
+    parity = (byteBits @ padded[k].reshape(nbytes, 8).T) & 1
+    tables |= parity.T.astype(np.uint64) << np.uint64(k)
+  return tables
+
+def _evaluate(tables, packed):
+  result = tables[0][packed[:, 0]]
+  for position in range(1, len(tables)):
+    result ^= tables[position][packed[:, position]]
+  return result
+
+class _TypeDecoder:
+  # Decoding of one error type: checks detect the errors, logical is the
+  # operator of the other type they must commute with.
+  def __init__(self, checks, logical, maxWeight):
+    nbchecks, nbqubits = checks.shape
+    if nbchecks > MAX_CHECKS:
+      raise ValueError("a lookup table for " + str(nbchecks) + " checks is too large")
+    self.nbchecks = nbchecks
+    self.syndromeMask = np.uint64(2 ** nbchecks - 1)
+    self.tables = _byteTables(np.vstack([checks, logical]))
+    self.corrections = np.zeros((2 ** nbchecks, nbqubits), dtype=bool)
+    self.known = np.zeros(2 ** nbchecks, dtype=bool)
+    self.known[0] = True
+    for weight in range(1, (nbqubits if maxWeight is None else maxWeight) + 1):
+      if self.known.all():
+        break
+      combinations = np.array(list(itertools.combinations(range(nbqubits), weight)))
+      candidates = np.zeros((len(combinations), nbqubits), dtype=bool)
+      candidates[np.arange(len(combinations))[:, None], combinations] = True
+      syndromes = self.syndromes(candidates)
+      syndromes, first = np.unique(syndromes, return_index=True)
+      new = ~self.known[syndromes]
+      self.corrections[syndromes[new]] = candidates[first[new]]
+      self.known[syndromes[new]] = True
+    # The logical parity of each correction.
+    self.flips = _evaluate(self.tables, packErrors(self.corrections)) >> np.uint64(nbchecks)
+
+  def syndromes(self, errors):
+    return (_evaluate(self.tables, packErrors(errors)) & self.syndromeMask).astype(np.int64)
+
+  def failuresPacked(self, packed):
+    combined = _evaluate(self.tables, packed)
+    return ((combined >> np.uint64(self.nbchecks)) ^ self.flips[combined & self.syndromeMask]).astype(bool)
+
+
+class CSSDecoder:
+  def __init__(self, hx, hz, logicalX, logicalZ, maxWeight=None):
+    # hx, hz: boolean (checks, n) supports of the X- and Z-type checks;
+    # logicalX, logicalZ: boolean (n,) supports of the logical operators.
+    # Corrections are searched up to maxWeight (every weight by default).
+    self.hx = np.atleast_2d(np.asarray(hx, dtype=bool))
+    self.hz = np.atleast_2d(np.asarray(hz, dtype=bool))
+    self.nbqubits = self.hx.shape[1]
+    self.xDecoder = _TypeDecoder(self.hz, np.asarray(logicalZ, dtype=bool), maxWeight)
+    self.zDecoder = _TypeDecoder(self.hx, np.asarray(logicalX, dtype=bool), maxWeight)
+
+  def syndromes(self, xErrors, zErrors):
+    # Packed (hz, hx) syndromes of boolean (N, n) X and Z error patterns; the
+    # first check is the least significant bit.
+    return self.xDecoder.syndromes(xErrors), self.zDecoder.syndromes(zErrors)
+
+  def corrections(self, xSyndromes, zSyndromes):
+    # Boolean (N, n) X and Z corrections for packed syndromes.
+    return self.xDecoder.corrections[xSyndromes], self.zDecoder.corrections[zSyndromes]
+
+  def failures(self, xErrors, zErrors):
+    # Boolean (N,): the patterns left with a logical error after correction.
+    # A Y error is an X and a Z error on the same qubit.
+    return self.failuresPacked(packErrors(xErrors), packErrors(zErrors))
+
+  def failuresPacked(self, xPacked, zPacked):
+    # As failures, for patterns already packed by packErrors.
+    return self.xDecoder.failuresPacked(xPacked) | self.zDecoder.failuresPacked(zPacked)
+
+
+_shorDecoders = {}
+
+def shorDecoder(layout=SHOR_LAYOUT):
+  # The decoder for the checks of shor_syndrome_code, built once per layout.
+  # The logical X is X on the first block, the logical Z is Z on the first
+  # qubit of every block.
+  if layout not in _shorDecoders:
+    outer, blocks = layout
+    nbqubits = 1 + max(qubit for block in blocks for qubit in block)
+    zChecks, xChecks = syndromeChecks(layout)
+    support = lambda qubits: np.isin(np.arange(nbqubits), qubits)
+    _shorDecoders[layout] = CSSDecoder([support(check) for check in xChecks], [support(check) for check in zChecks],
+                                       support(blocks[0]), support([block[0] for block in blocks]))
+  return _shorDecoders[layout]
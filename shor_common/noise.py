@@ -0,0 +1,155 @@
+import math
+import numpy as np
+
+from shor_common.circuit_ir import SHOR_LAYOUT, EncodeOps, DecodeOps
+from shor_common.statevec_sim import applyOps, applyStages, compiledCode, applyPauliLayer
+from shor_common.statevec_util import statesForInputs
+from shor_common.verification import wilsonInterval
+
+# Monte-Carlo noise engine for the Shor code.
+#
+# Instead of the deterministic ErrorIntroduction, every qubit goes through a
+# noise channel with physical error probability p: at the 'memory' location
+# (between encoding and decoding, where ErrorIntroduction sits) and optionally
+# after every gate on the qubits it acts on ('gates'). Trajectories are
+# simulated in batches and the logical error is measured as the mean
+# infidelity of the decoded data qubit with the input state.
+#
+# Pauli noise at the memory location only is the common case and is sampled
+# as (X, Z) masks: distinct patterns are simulated once on the compiled code,
+# batchSize at a time, so millions of trajectories cost little more than
+# drawing random numbers.
+# Amplitude damping and gate noise use statevector trajectories instead.
+
+CHANNELS = ('depolarizing', 'bitflip', 'phaseflip', 'amplitudedamping')
+
+def samplePaulis(channel, p, shape, rng):
+  # Boolean (x, z) arrays of the given shape for a Pauli channel.
+  hit = rng.random(shape) < p
+  if channel == 'bitflip':
+    return hit, np.zeros(shape, dtype=bool)
+  if channel == 'phaseflip':
+    return np.zeros(shape, dtype=bool), hit
+  if channel == 'depolarizing':
+    # X, Y and Z with probability p/3 each.
+    pauli = rng.integers(3, size=shape)
+    return hit & (pauli != 2), hit & (pauli != 0)
+  raise ValueError("Not a Pauli channel: " + str(channel))
+
+def applyChannel(states, channel, p, qubit, rng):
+  # Sample the channel on one qubit independently for every row of a batch
+  # of states (N, 2^n), in place.
+  psi = states.reshape(states.shape[0], 2 ** qubit, 2, -1)
+  if channel == 'amplitudedamping':
+    # Quantum-jump unravelling: decay |1> -> |0> with probability p * P(1),
+    # otherwise apply the no-jump Kraus operator diag(1, sqrt(1 - p)).
+    prob1 = np.sum(np.abs(psi[:, :, 1, :]) ** 2, axis=(1, 2))
+    jump = rng.random(states.shape[0]) < p * prob1
+    psi[jump, :, 0, :] = psi[jump, :, 1, :]
+    psi[jump, :, 1, :] = 0
+    psi[~jump, :, 1, :] *= math.sqrt(1 - p)
+    states /= np.linalg.norm(states, axis=-1, keepdims=True)
+    return
+  x, z = samplePaulis(channel, p, states.shape[0], rng)
+  psi[x] = psi[x][:, :, ::-1, :]
+  psi[z, :, 1, :] *= -1
+
+def dataQubitFidelities(states, inputState):
+  # Fidelity of the data qubit (qubit 0) of every row with the input state.
+  rows = states.reshape(states.shape[0], 2, -1)
+  projected = np.einsum('i,nij->nj', np.conj(inputState), rows)
+  return np.sum(np.abs(projected) ** 2, axis=-1)
+
+def _nbqubits(layout):
+  return sum(len(block) for block in layout[1])
+
+def _trajectoryFidelities(inputState, channel, p, nbTrajectories, locations, layout, rng):
+  nbqubits = _nbqubits(layout)
+  states = np.zeros((nbTrajectories, 2 ** nbqubits), dtype=complex)
+  states[:, 0] = inputState[0]
+  states[:, 2 ** (nbqubits - 1)] = inputState[1]
+  for op in EncodeOps(layout):
+    applyOps(states, [op])
+    if 'gates' in locations:
+      for qubit in op[1:]:
+        applyChannel(states, channel, p, qubit, rng)
+  if 'memory' in locations:
+    for qubit in range(nbqubits):
+      applyChannel(states, channel, p, qubit, rng)
+  for op in DecodeOps(layout):
+    applyOps(states, [op])
+    if 'gates' in locations:
+      for qubit in op[1:]:
+        applyChannel(states, channel, p, qubit, rng)
+  return dataQubitFidelities(states, inputState)
+
+def _pauliMemoryFidelities(inputState, channel, p, nbTrajectories, layout, rng, batchSize):
+  nbqubits = _nbqubits(layout)
+  x, z = samplePaulis(channel, p, (nbTrajectories, nbqubits), rng)
+  weights = 1 << np.arange(nbqubits)[::-1]
+  keys = (x.dot(weights) << nbqubits) | z.dot(weights)
+  patterns, inverse = np.unique(keys, return_inverse=True)
+  codewords, decodeStages = compiledCode(layout, nbqubits)
+  encoded = inputState @ codewords
+  patternFidelities = np.empty(len(patterns))
+  for start in range(0, len(patterns), batchSize):
+    errored = np.stack([applyPauliLayer(encoded, int(key) >> nbqubits, int(key) & (2 ** nbqubits - 1))
+                        for key in patterns[start:start + batchSize]])
+    patternFidelities[start:start + batchSize] = dataQubitFidelities(applyStages(errored, decodeStages), inputState)
+  return patternFidelities[inverse.reshape(-1)]
+
+def noisyFidelities(inputValue, channel, p, nbTrajectories, locations=('memory',), layout=SHOR_LAYOUT,
+                    rng=None, batchSize=4096):
+  # Data-qubit fidelity of nbTrajectories sampled runs of the Shor code.
+  rng = rng if rng is not None else np.random.default_rng()
+  inputState = statesForInputs(inputValue['theta'], inputValue['phi'])
+  if channel != 'amplitudedamping' and tuple(locations) == ('memory',):
+    return _pauliMemoryFidelities(inputState, channel, p, nbTrajectories, layout, rng, batchSize)
+  fidelities = []
+  for start in range(0, nbTrajectories, batchSize):
+    size = min(batchSize, nbTrajectories - start)
+    fidelities.append(_trajectoryFidelities(inputState, channel, p, size, locations, layout, rng))
+  return np.concatenate(fidelities)
+
+def meanInterval(samples, z=1.96):
+  # (mean, low, high) for samples in [0, 1]: the Wilson score interval with
+  # the sample variance in place of rate * (1 - rate). For 0/1 samples it is
+  # the Wilson interval of the proportion; unlike a normal-approximation
+  # interval it keeps a width of about z^2 / n when every sample is equal,
+  # e.g. no trajectory failed.
+  trials = len(samples)
+  mean = float(np.mean(samples))
+  variance = float(np.var(samples))
+  denominator = 1 + z ** 2 / trials
+  centre = (mean + z ** 2 / (2 * trials)) / denominator
+  halfWidth = z * math.sqrt(variance / trials + z ** 2 / (4 * trials ** 2)) / denominator
+  return mean, max(0.0, centre - halfWidth), min(1.0, centre + halfWidth)
+
+def logicalInfidelity(inputValue, channel, p, nbTrajectories, locations=('memory',), layout=SHOR_LAYOUT,
+                      rng=None, z=1.96):
+  # Returns (meanInfidelity, low, high): the mean infidelity of the decoded
+  # data qubit over the trajectories, with the meanInterval of the
+  # infidelities. Its expectation is the exact logical infidelity of the channel.
+  fidelities = noisyFidelities(inputValue, channel, p, nbTrajectories, locations, layout, rng)
+  infidelities = np.clip(1 - fidelities, 0, 1)
+  # Drop rounding noise so that perfectly corrected runs count as exactly zero.
+  infidelities[infidelities < 1e-9] = 0
+  return meanInterval(infidelities, z)
+
+def logicalFailureRate(inputValue, channel, p, nbTrajectories, locations=('memory',), layout=SHOR_LAYOUT,
+                       rng=None, z=1.96, threshold=0.5):
+  # Returns (failures, rate, low, high): the trajectories whose data-qubit
+  # infidelity exceeds threshold counted as failures, with the Wilson interval
+  # of that binomial proportion.
+  fidelities = noisyFidelities(inputValue, channel, p, nbTrajectories, locations, layout, rng)
+  failures = int(np.sum(1 - fidelities > threshold))
+  low, high = wilsonInterval(failures, nbTrajectories, z)
+  return failures, failures / nbTrajectories, low, high
+
+def sweepErrorProbabilities(inputValue, channel, errorProbabilities, nbTrajectories, locations=('memory',),
+                            layout=SHOR_LAYOUT, rng=None):
+  # Logical infidelity versus physical error probability, as a list of
+  # (p, meanInfidelity, low, high).
+  rng = rng if rng is not None else np.random.default_rng()
+  return [(p,) + logicalInfidelity(inputValue, channel, p, nbTrajectories, locations, layout, rng)
+          for p in errorProbabilities]
@@ -0,0 +1,42 @@
+# A reusable QLM simulation session.
+#
+# Building the LinAlg simulator, its handlers and the QPU server is the
+# expensive part of a QLM run, so a session does it once and every circuit of
+# a sweep is attached to the same server. Circuits are only written to a
+# .circ file (for qat-circprint) when debug is set. runBatch compiles all
+# programs first and then runs them back to back on the server: the task API
+# takes one circuit per task, so this is as close to a single submission as
+# it offers.
+
+class QLMSession:
+  def __init__(self, nbqubits, debug=False, circFile='output.circ'):
+    import qat.linalg
+    import qat.core.qpu as qpu
+    import qat.core.qpu.agent as agent
+    import qat.core.qpu.stateanalyzer as stateanalyzer
+    self.nbqubits = nbqubits
+    self.debug = debug
+    self.circFile = circFile
+    handlers = {'agent': agent.GenericAgent, 'state_analyzer': stateanalyzer.StateAnalyzer}
+    self.server = qpu.Server(qat.linalg.LinAlg(), handlers=handlers)
+
+  def compile(self, program):
+    circuit = program.to_circ("error_correction_" + repr(self.nbqubits))
+    if self.debug:
+      import qat.core.circ as circ
+      circ.writecirc(circuit, self.circFile)
+    return circuit
+
+  def runCompiled(self, circuit):
+    import qat.core.task as task
+    mytask = task.Task(circuit)
+    mytask.attach(self.server)
+    return list(mytask.states(list(range(self.nbqubits))))
+
+  def run(self, program):
+    # The state results (state, amplitude, probability) of one aqasm Program.
+    return self.runCompiled(self.compile(program))
+
+  def runBatch(self, programs):
+    circuits = [self.compile(program) for program in programs]
+    return [self.runCompiled(circuit) for circuit in circuits]
@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+import random
+import time
+
+import numpy as np
+
+from shor_common import circuit_ir
+from shor_common.sampling import ShotSampler
+from shor_common.statevec_sim import zeroState, applyOps
+
+# Batched submission to Quantum Inspire.
+#
+# QuantumInspireAPI.execute_qasm blocks until the job has run, polling the
+# server internally, so a sweep that calls it once per pattern is a chain of
+# round trips. submitAll sends all programs concurrently from a thread pool,
+# with at most maxInFlight jobs in flight. A job that raises is retried after
+# an exponential backoff with jitter, so a busy queue is not hammered. Results
+# are handed to onResult as they arrive and returned in submission order.
+#
+# LocalQuantumInspire implements the same get_backend_type_by_name /
+# execute_qasm contract on the NumPy simulator, so sweeps can run offline.
+# It can add latency and random failures to exercise the submission layer.
+
+async def _submitOne(api, loop, executor, semaphore, qasm, backendType, shots, retries, backoff, maxBackoff):
+  delay = backoff
+  for attempt in range(retries + 1):
+    try:
+      async with semaphore:
+        return await loop.run_in_executor(executor, lambda: api.execute_qasm(qasm, backend_type=backendType,
+                                                                             number_of_shots=shots))
+    except Exception:
+      if attempt == retries:
+        raise
+    await asyncio.sleep(delay * (0.5 + random.random()))
+    delay = min(2 * delay, maxBackoff)
+
+async def submitAll(api, qasms, backendType, shots=1, maxInFlight=8, retries=3, backoff=0.5, maxBackoff=8.0,
+                    onResult=None):
+  # Returns one result per program, in order. A program that still fails
+  # after all retries gets its exception in place of a result.
+  loop = asyncio.get_running_loop()
+  semaphore = asyncio.Semaphore(maxInFlight)
+  results = [None] * len(qasms)
+  with concurrent.futures.ThreadPoolExecutor(maxInFlight) as executor:
+    async def run(index, qasm):
+      try:
+        results[index] = await _submitOne(api, loop, executor, semaphore, qasm, backendType, shots,
+                                          retries, backoff, maxBackoff)
+      except Exception as e:
+        results[index] = e
+      if onResult is not None:
+        onResult(index, results[index])
+    await asyncio.gather(*[run(index, qasm) for index, qasm in enumerate(qasms)])
+  return results
+
+def executeAll(api, qasms, backendType, shots=1, **options):
+  # Blocking wrapper around submitAll for scripts.
+  return asyncio.run(submitAll(api, qasms, backendType, shots, **options))
+
+
+class LocalQuantumInspire:
+  def __init__(self, latency=0.0, failureRate=0.0, rng=None):
+    self.latency = latency
+    self.failureRate = failureRate
+    self.rng = rng if rng is not None else np.random.default_rng()
+
+  def get_backend_type_by_name(self, name):
+    return {'name': name}
+
+  def execute_qasm(self, qasm, backend_type=None, number_of_shots=1):
+    start = time.perf_counter()
+    if self.latency:
+      time.sleep(self.latency)
+    if self.rng.random() < self.failureRate:
+      raise ConnectionError("Simulated Quantum Inspire failure")
+    ops, nbqubits = circuit_ir.fromCQASM(qasm)
+    state = zeroState(nbqubits)
+    applyOps(state, ops)
+    # Histogram keys are basis indices with qubit 0 as the least significant
+    # bit. A single shot returns the exact probabilities, as the QX simulator does.
+    probabilities = np.abs(state.reshape((2,) * nbqubits).transpose().reshape(-1)) ** 2
+    if number_of_shots > 1:
+      counts = ShotSampler(probabilities, nbqubits, littleEndian=True, rng=self.rng).counts(number_of_shots)
+      probabilities = counts / number_of_shots
+    histogram = {str(index): float(probabilities[index]) for index in np.flatnonzero(probabilities > 1e-12)}
+    return {'histogram': histogram, 'number_of_shots': number_of_shots, 'raw_text': '',
+            'execution_time_in_seconds': time.perf_counter() - start}
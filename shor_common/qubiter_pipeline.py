@@ -0,0 +1,68 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from shor_common import circuit_ir
+
+# Qubiter without per-pattern files.
+#
+# Qubiter's SEO_simulator only reads circuits from English files, so a sweep
+# that writes one file pair per (input, errorIdxs) spends most of its time on
+# file churn. Here a circuit is run as a chain of segments, each an op list:
+# the simulator state after one segment is the initial state of the next.
+# The English text of a segment is generated in memory (SEO_writer with
+# StringIO streams) and written once to a file named after its hash, in a
+# local scratch folder. A sweep then writes prepare+encode once per input,
+# decode once, and one small error segment per pattern, and a re-run writes
+# nothing at all. The picture file is only written with debug.
+
+DEFAULT_FOLDER = os.path.join(tempfile.gettempdir(), 'shor_code_qubiter')
+
+class QubiterPipeline:
+  def __init__(self, nbqubits, folder=DEFAULT_FOLDER, debug=False):
+    self.nbqubits = nbqubits
+    self.folder = folder
+    self.debug = debug
+    self._prefixes = {}
+    os.makedirs(folder, exist_ok=True)
+
+  def english(self, ops):
+    # The SEO English text of ops, and the picture text, without touching the disk.
+    from SEO_writer import SEO_writer, CktEmbedder
+    english, picture = io.StringIO(), io.StringIO()
+    wr = SEO_writer('in_memory', CktEmbedder(self.nbqubits, self.nbqubits), english_out=english, picture_out=picture)
+    circuit_ir.toQubiter(ops, wr, self.nbqubits)
+    return english.getvalue(), picture.getvalue()
+
+  def _write(self, path, text):
+    # Through a unique temporary file, so threads and processes writing the
+    # same segment do not collide.
+    fd, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.folder)
+    with os.fdopen(fd, 'w') as f:
+      f.write(text)
+    os.replace(temporary, path)
+
+  def segment(self, ops):
+    # File prefix of a segment, written the first time it is seen.
+    key = tuple(ops)
+    if key not in self._prefixes:
+      english, picture = self.english(ops)
+      prefix = os.path.join(self.folder, 'segment_' + hashlib.sha256(english.encode()).hexdigest()[:20])
+      englishFile = prefix + '_' + str(self.nbqubits) + '_ZLeng.txt'
+      if not os.path.exists(englishFile):
+        self._write(englishFile, english)
+      if self.debug:
+        self._write(prefix + '_' + str(self.nbqubits) + '_ZLpic.txt', picture)
+      self._prefixes[key] = prefix
+    return self._prefixes[key]
+
+  def run(self, segments, initState=None):
+    # Final Qubiter StateVec after all segments; segments must not measure.
+    from SEO_simulator import SEO_simulator
+    from StateVec import StateVec
+    state = initState if initState is not None else StateVec.get_standard_basis_st_vec([0] * self.nbqubits)
+    for ops in segments:
+      if ops:
+        state = SEO_simulator(self.segment(ops), self.nbqubits, state).cur_st_vec_dict['pure']
+    return state
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+# On-disk cache of simulation results, addressed by circuit content.
+#
+# The key is a SHA-256 over the canonical circuit text (cQASM from
+# circuit_ir.toCQASM, or any QASM with blank lines and indentation removed)
+# together with the backend name, the number of shots and the seed, so an
+# unchanged circuit is never re-submitted while any change to it, or to how
+# it is run, is. Every result is one file named after its key. Reads touch the
+# file, and once the directory grows beyond maxBytes the least recently used
+# files are evicted. Files are written to a unique temporary file first so
+# readers never see a partial result, also with several threads or sweep
+# workers writing the same key. The cache keeps a running total of what it
+# wrote and only rescans the directory when that goes over maxBytes, or every
+# EVICT_INTERVAL writes to catch up with other processes sharing it.
+#
+# Results are pickled, so only point a cache at a directory you trust.
+
+DEFAULT_MAX_BYTES = 2 ** 28
+EVICT_INTERVAL = 256
+KEY_LOCK_STRIPES = 64
+
+def canonicalText(circuitText):
+  return '\n'.join(line.strip() for line in circuitText.splitlines() if line.strip()) + '\n'
+
+def cacheKey(circuitText, backendName, shots=None, seed=None):
+  header = json.dumps({'backend': backendName, 'shots': shots, 'seed': seed}, sort_keys=True)
+  return hashlib.sha256((header + '\n' + canonicalText(circuitText)).encode()).hexdigest()
+
+class ResultCache:
+  def __init__(self, directory, maxBytes=DEFAULT_MAX_BYTES):
+    self.directory = directory
+    self.maxBytes = maxBytes
+    os.makedirs(directory, exist_ok=True)
+    self._lock = threading.Lock()
+    self._size = None
+    self._writes = 0
+
+  def _path(self, key):
+    return os.path.join(self.directory, key + '.pickle')
+
+  def get(self, key, default=None):
+    path = self._path(key)
+    try:
+      with open(path, 'rb') as f:
+        result = pickle.load(f)
+      os.utime(path)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+      return default
+    return result
+
+  def put(self, key, result):
+    path = self._path(key)
+    fd, temporary = tempfile.mkstemp(prefix=key + '.', suffix='.tmp', dir=self.directory)
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        pickle.dump(result, f)
+      size = os.path.getsize(temporary)
+      os.replace(temporary, path)
+    except BaseException:
+      if os.path.exists(temporary):
+        os.remove(temporary)
+      raise
+    with self._lock:
+      self._writes += 1
+      if self._size is not None:
+        self._size += size
+      if self._size is None or self._size > self.maxBytes or self._writes % EVICT_INTERVAL == 0:
+        self.evict()
+
+  def evict(self):
+    # Rescan the directory and remove the least recently used results until
+    # it is within maxBytes.
+    entries = []
+    for entry in os.scandir(self.directory):
+      if entry.name.endswith('.pickle'):
+        try:
+          stat = entry.stat()
+        except FileNotFoundError: # evicted by another process
+          continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+      if total <= self.maxBytes:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total -= size
+    self._size = total
+
+  def fetch(self, key, compute):
+    # Read-through: the cached result, or compute() stored under key.
+    missing = object()
+    result = self.get(key, missing)
+    if result is missing:
+      result = compute()
+      self.put(key, result)
+    return result
+
+
+class CachedQuantumInspire:
+  # Wraps a QuantumInspireAPI (or LocalQuantumInspire) so execute_qasm is
+  # read-through; it plugs into quantum_inspire.submitAll unchanged. Threads
+  # asking for the same program wait for the first one's result instead of
+  # submitting it again. Keys share a fixed pool of locks, picked by the key's
+  # hash, so a long sweep does not keep a lock per program; two programs
+  # that land on the same lock are merely submitted one after the other.
+  def __init__(self, api, cache, seed=None, stripes=KEY_LOCK_STRIPES):
+    self.api = api
+    self.cache = cache
+    self.seed = seed
+    self._keyLocks = [threading.Lock() for _ in range(stripes)]
+
+  def get_backend_type_by_name(self, name):
+    return self.api.get_backend_type_by_name(name)
+
+  def execute_qasm(self, qasm, backend_type=None, number_of_shots=1):
+    backendName = backend_type['name'] if isinstance(backend_type, dict) and 'name' in backend_type else backend_type
+    key = cacheKey(qasm, 'quantuminspire:' + str(backendName), number_of_shots, self.seed)
+    with self._keyLocks[int(key[:8], 16) % len(self._keyLocks)]:
+      return self.cache.fetch(key, lambda: self.api.execute_qasm(qasm, backend_type=backend_type,
+                                                                 number_of_shots=number_of_shots))
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Shot sampling from one simulation.
+#
+# A circuit is simulated once and the shots are drawn from its final
+# probability vector, so N shots cost one simulation plus O(N) random numbers
+# instead of N simulations. ShotSampler keeps the probability vector;
+# counts() draws a histogram over basis states with one multinomial draw and
+# shots() draws individual outcomes when the shot order matters. Basis
+# indices are turned into bits with shifts on whole arrays.
+
+def probabilitiesOf(state):
+  probabilities = np.abs(np.asarray(state).reshape(-1)) ** 2
+  return probabilities / np.sum(probabilities)
+
+def qubitShift(qubit, nbqubits, littleEndian=False):
+  # Position of the qubit's bit in a basis index.
+  return qubit if littleEndian else nbqubits - 1 - qubit
+
+def extractBits(indices, nbqubits, qubits=None, littleEndian=False):
+  # Boolean (shots, len(qubits)) array of the bits of the given basis indices.
+  qubits = range(nbqubits) if qubits is None else qubits
+  shifts = np.array([qubitShift(qubit, nbqubits, littleEndian) for qubit in qubits], dtype=np.int64)
+  return ((np.asarray(indices, dtype=np.int64)[:, None] >> shifts) & 1).astype(bool)
+
+class ShotSampler:
+  def __init__(self, probabilities, nbqubits, littleEndian=False, rng=None):
+    self.probabilities = np.asarray(probabilities, dtype=float)
+    self.nbqubits = nbqubits
+    self.littleEndian = littleEndian
+    self.rng = rng if rng is not None else np.random.default_rng()
+
+  @classmethod
+  def fromState(cls, state, nbqubits, littleEndian=False, rng=None):
+    return cls(probabilitiesOf(state), nbqubits, littleEndian, rng)
+
+  @classmethod
+  def fromResult(cls, result, nbqubits, rng=None):
+    # From a ('statevector', amplitudes, littleEndian) result of backends.Backend.simulate.
+    if result[0] != 'statevector':
+      raise ValueError("Can only sample from a statevector result, got " + repr(result[0]))
+    return cls.fromState(result[1], nbqubits, result[2], rng)
+
+  def counts(self, shots):
+    # Histogram over all 2^n basis states.
+    return self.rng.multinomial(shots, self.probabilities)
+
+  def shots(self, shots):
+    # Basis index of every shot, in order.
+    return self.rng.choice(len(self.probabilities), size=shots, p=self.probabilities)
+
+  def bits(self, shots, qubits=None):
+    return extractBits(self.shots(shots), self.nbqubits, qubits, self.littleEndian)
+
+  def qubitCounts(self, shots, qubit):
+    # (count of 0, count of 1) for one qubit, drawn from its marginal only.
+    view = self.probabilities.reshape(-1, 2, 2 ** qubitShift(qubit, self.nbqubits, self.littleEndian))
+    return self.rng.multinomial(shots, np.sum(view, axis=(0, 2)))
@@ -0,0 +1,129 @@
+import numpy as np
+
+from shor_common.circuit_ir import SHOR_LAYOUT, EncodeOps, CliffordDecodeOps, ErrorIntroduction
+from shor_common.stabilizer_sim import Tableau, PauliFrame, runOps
+
+# Syndrome-measurement variant of the Shor code. Instead of the coherent
+# Toffoli correction in BitFlipDecode, the stabilizers are measured on
+# ancillas and the correction is looked up classically, so the whole circuit
+# is Clifford and runs on the stabilizer simulators.
+#
+# Z-type checks compare neighbouring qubits within each bit-flip block, X-type
+# checks compare neighbouring blocks. Qubits 0..8 hold the code, the ancillas
+# follow in the order of syndromeChecks.
+
+# Clifford preparations of the six stabilizer inputs on qubit 0, with their inverses.
+prepareOps = {'0': ([], []),
+              '1': (['X'], ['X']),
+              '+': (['H'], ['H']),
+              '-': (['X', 'H'], ['H', 'X']),
+              '+i': (['H', 'S'], ['S', 'S', 'S', 'H']),
+              '-i': (['H', 'S', 'S', 'S'], ['S', 'H'])}
+
+def syndromeChecks(layout=SHOR_LAYOUT):
+  outer, blocks = layout
+  zChecks = []
+  for block in blocks:
+    zChecks += [(block[i], block[i + 1]) for i in range(len(block) - 1)]
+  xChecks = [tuple(blocks[i]) + tuple(blocks[i + 1]) for i in range(len(blocks) - 1)]
+  return zChecks, xChecks
+
+def nbqubitsFor(layout=SHOR_LAYOUT):
+  outer, blocks = layout
+  zChecks, xChecks = syndromeChecks(layout)
+  return sum(len(block) for block in blocks) + len(zChecks) + len(xChecks)
+
+def _repetitionLookup(length):
+  # For a chain of `length` elements with parity checks between neighbours,
+  # map each single-flip syndrome to the flipped element.
+  lookup = {}
+  for element in range(length):
+    syndrome = [0] * (length - 1)
+    if element > 0:
+      syndrome[element - 1] = 1
+    if element < length - 1:
+      syndrome[element] = 1
+    lookup[tuple(syndrome)] = element
+  return lookup
+
+def PrepareStateOps(inputLabel):
+  return [(gate, 0) for gate in prepareOps[inputLabel][0]]
+
+def SyndromeOps(layout=SHOR_LAYOUT):
+  outer, blocks = layout
+  zChecks, xChecks = syndromeChecks(layout)
+  ancilla = sum(len(block) for block in blocks)
+  ops = []
+  for check in zChecks:
+    ops += [('CNOT', idx, ancilla) for idx in check]
+    ops += [('MEASURE', ancilla)]
+    ancilla += 1
+  for check in xChecks:
+    ops += [('H', ancilla)]
+    ops += [('CNOT', ancilla, idx) for idx in check]
+    ops += [('H', ancilla), ('MEASURE', ancilla)]
+    ancilla += 1
+  return ops
+
+def correctionFor(syndrome, layout=SHOR_LAYOUT):
+  # Classical lookup of the Pauli correction for a measured syndrome, as a list
+  # of ops. Unknown syndromes (more than one error per block) are left alone.
+  outer, blocks = layout
+  ops = []
+  pos = 0
+  for block in blocks:
+    checkBits = tuple(int(bit) for bit in syndrome[pos:pos + len(block) - 1])
+    pos += len(block) - 1
+    element = _repetitionLookup(len(block)).get(checkBits)
+    if any(checkBits) and element is not None:
+      ops += [('X', block[element])]
+  checkBits = tuple(int(bit) for bit in syndrome[pos:pos + len(blocks) - 1])
+  element = _repetitionLookup(len(blocks)).get(checkBits)
+  if any(checkBits) and element is not None:
+    ops += [('Z', blocks[element][0])]
+  return ops
+
+def runSyndromeCode(inputLabel, errorIdxs, layout=SHOR_LAYOUT, rng=None):
+  # Runs the full code on a tableau. Returns the syndrome and whether the data
+  # qubit deterministically came back in the input state.
+  tableau = Tableau(nbqubitsFor(layout), rng)
+  runOps(tableau, PrepareStateOps(inputLabel) + EncodeOps(layout) + ErrorIntroduction(errorIdxs))
+  syndrome = [outcome for outcome, _ in runOps(tableau, SyndromeOps(layout))]
+  unprepare = [(gate, 0) for gate in prepareOps[inputLabel][1]]
+  runOps(tableau, correctionFor(syndrome, layout) + CliffordDecodeOps(layout) + unprepare)
+  outcome, deterministic = tableau.measure(0)
+  return syndrome, deterministic and outcome == 0
+
+def _correctionTable(layout=SHOR_LAYOUT):
+  # Correction for every packed syndrome, as boolean (X, Z) masks over all qubits.
+  nbqubits = nbqubitsFor(layout)
+  zChecks, xChecks = syndromeChecks(layout)
+  nbchecks = len(zChecks) + len(xChecks)
+  xTable = np.zeros((2 ** nbchecks, nbqubits), dtype=bool)
+  zTable = np.zeros((2 ** nbchecks, nbqubits), dtype=bool)
+  for packed in range(2 ** nbchecks):
+    syndrome = [(packed >> (nbchecks - 1 - bit)) & 1 for bit in range(nbchecks)]
+    for gate, idx in correctionFor(syndrome, layout):
+      (xTable if gate == 'X' else zTable)[packed, idx] = True
+  return xTable, zTable
+
+def logicalFailures(allErrorIdxs, layout=SHOR_LAYOUT):
+  # Pauli-frame sweep: propagate every error pattern through the syndrome
+  # circuit at once and return a boolean array marking the patterns that
+  # leave a logical error after correction and decoding.
+  nbqubits = nbqubitsFor(layout)
+  errorMask = np.zeros((len(allErrorIdxs), nbqubits), dtype=bool)
+  for patternIdx, errorIdxs in enumerate(allErrorIdxs):
+    errorMask[patternIdx, list(errorIdxs)] = True
+  frame = PauliFrame(nbqubits, len(allErrorIdxs))
+  runOps(frame, EncodeOps(layout))
+  for qubit in range(nbqubits):
+    frame.injectX(qubit, errorMask[:, qubit])
+    frame.injectZ(qubit, errorMask[:, qubit])
+  syndrome = np.array(runOps(frame, SyndromeOps(layout))).T
+  packed = syndrome.dot(1 << np.arange(syndrome.shape[1])[::-1])
+  xTable, zTable = _correctionTable(layout)
+  frame.x ^= xTable[packed]
+  frame.z ^= zTable[packed]
+  runOps(frame, CliffordDecodeOps(layout))
+  return frame.x[:, 0] | frame.z[:, 0]
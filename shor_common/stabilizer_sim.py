@@ -0,0 +1,129 @@
+import numpy as np
+
+# Stabilizer simulators for Clifford circuits.
+#
+# Circuits are lists of ops, tuples of a gate name followed by qubit indices:
+# ('H', q), ('S', q), ('X', q), ('Z', q), ('CNOT', control, target) and
+# ('MEASURE', q). runOps dispatches them to either simulator below.
+#
+# Tableau is a CHP-style simulator (Aaronson & Gottesman): rows 0..n-1 hold
+# the destabilizers, rows n..2n-1 the stabilizers and row 2n is scratch space.
+# Each row is a Pauli string stored as x and z bits plus a sign bit r, so a
+# gate costs O(n) bit operations and a measurement at most O(n^2).
+#
+# PauliFrame tracks only the difference between an ideal reference run and a
+# run with errors, for a whole batch of error patterns at once. Measurement
+# results are returned as flips relative to the reference run.
+
+class Tableau:
+  def __init__(self, nbqubits, rng=None):
+    n = nbqubits
+    self.nbqubits = n
+    self.x = np.zeros((2*n + 1, n), dtype=bool)
+    self.z = np.zeros((2*n + 1, n), dtype=bool)
+    self.r = np.zeros(2*n + 1, dtype=bool)
+    self.x[np.arange(n), np.arange(n)] = True
+    self.z[n + np.arange(n), np.arange(n)] = True
+    self.rng = rng if rng is not None else np.random.default_rng()
+
+  def h(self, a):
+    self.r ^= self.x[:, a] & self.z[:, a]
+    self.x[:, a], self.z[:, a] = self.z[:, a].copy(), self.x[:, a].copy()
+
+  def s(self, a):
+    self.r ^= self.x[:, a] & self.z[:, a]
+    self.z[:, a] ^= self.x[:, a]
+
+  def cnot(self, a, b):
+    self.r ^= self.x[:, a] & self.z[:, b] & ~(self.x[:, b] ^ self.z[:, a])
+    self.x[:, b] ^= self.x[:, a]
+    self.z[:, a] ^= self.z[:, b]
+
+  def pauliX(self, a):
+    self.r ^= self.z[:, a]
+
+  def pauliZ(self, a):
+    self.r ^= self.x[:, a]
+
+  def _rowsum(self, hs, i):
+    # Replace rows hs by the product of row i and each of them, keeping track
+    # of the phase: the exponent of i picked up per qubit is g below.
+    x1, z1 = self.x[i], self.z[i]
+    x2, z2 = self.x[hs], self.z[hs]
+    g = np.where(x1 & z1, z2.astype(int) - x2,
+        np.where(x1, z2 * (2 * x2.astype(int) - 1),
+        np.where(z1, x2 * (1 - 2 * z2.astype(int)), 0)))
+    total = 2 * self.r[hs] + 2 * self.r[i] + np.sum(g, axis=-1)
+    self.r[hs] = (total % 4) == 2
+    self.x[hs] ^= x1
+    self.z[hs] ^= z1
+
+  def measure(self, a):
+    # Returns (outcome, deterministic).
+    n = self.nbqubits
+    anticommuting = np.flatnonzero(self.x[n:2*n, a])
+    if len(anticommuting):
+      p = anticommuting[0] + n
+      others = np.flatnonzero(self.x[:2*n, a])
+      others = others[others != p]
+      if len(others):
+        self._rowsum(others, p)
+      self.x[p - n], self.z[p - n], self.r[p - n] = self.x[p], self.z[p], self.r[p]
+      self.x[p] = False
+      self.z[p] = False
+      self.z[p, a] = True
+      self.r[p] = self.rng.integers(2)
+      return int(self.r[p]), False
+    scratch = 2*n
+    self.x[scratch] = False
+    self.z[scratch] = False
+    self.r[scratch] = False
+    for i in np.flatnonzero(self.x[:n, a]):
+      self._rowsum(scratch, i + n)
+    return int(self.r[scratch]), True
+
+
+class PauliFrame:
+  def __init__(self, nbqubits, batchSize=1):
+    self.nbqubits = nbqubits
+    self.x = np.zeros((batchSize, nbqubits), dtype=bool)
+    self.z = np.zeros((batchSize, nbqubits), dtype=bool)
+
+  def h(self, a):
+    self.x[:, a], self.z[:, a] = self.z[:, a].copy(), self.x[:, a].copy()
+
+  def s(self, a):
+    self.z[:, a] ^= self.x[:, a]
+
+  def cnot(self, a, b):
+    self.x[:, b] ^= self.x[:, a]
+    self.z[:, a] ^= self.z[:, b]
+
+  # Paulis in the circuit itself are part of the reference run.
+  def pauliX(self, a):
+    pass
+
+  def pauliZ(self, a):
+    pass
+
+  def injectX(self, a, mask=True):
+    self.x[:, a] ^= mask
+
+  def injectZ(self, a, mask=True):
+    self.z[:, a] ^= mask
+
+  def measure(self, a):
+    # An X component on the measured qubit flips the Z-basis outcome.
+    return self.x[:, a].copy()
+
+
+_methodNames = {'H': 'h', 'S': 's', 'X': 'pauliX', 'Z': 'pauliZ', 'CNOT': 'cnot', 'MEASURE': 'measure'}
+
+def runOps(sim, ops):
+  # Apply ops to a Tableau or PauliFrame, returning the measurement results in order.
+  results = []
+  for op in ops:
+    result = getattr(sim, _methodNames[op[0]])(*op[1:])
+    if op[0] == 'MEASURE':
+      results.append(result)
+  return results
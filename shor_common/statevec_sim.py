@@ -0,0 +1,351 @@
+import collections
+import math
+import numpy as np
+
+from shor_common import circuit_ir
+from shor_common.circuit_ir import SHOR_LAYOUT, EncodeOps, DecodeOps
+from shor_common.statevec_util import statesForInputs
+
+# Dependency-free statevector engine for the Shor-code circuits.
+# A state on n qubits is a C-contiguous complex array of length 2^n. Qubit q
+# is axis q of the (2,)*n tensor view, so qubit 0 is the most significant bit
+# of the basis index. All gates act in place on that array.
+# A batch of N states is an (N, 2^n) array; every gate acts on all rows at once.
+
+H = np.array([[1, 1], [1, -1]], dtype=complex) / math.sqrt(2)
+X = np.array([[0, 1], [1, 0]], dtype=complex)
+Y = np.array([[0, -1j], [1j, 0]], dtype=complex)
+Z = np.array([[1, 0], [0, -1]], dtype=complex)
+
+S = np.array([[1, 0], [0, 1j]], dtype=complex)
+
+_singleQubitGates = {'H': H, 'X': X, 'Y': Y, 'Z': Z, 'S': S}
+
+def rx(theta):
+  return np.array([[math.cos(theta/2), -1j * math.sin(theta/2)],
+                   [-1j * math.sin(theta/2), math.cos(theta/2)]], dtype=complex)
+
+def rz(phi):
+  return np.array([[complex(math.cos(phi/2), -math.sin(phi/2)), 0],
+                   [0, complex(math.cos(phi/2), math.sin(phi/2))]], dtype=complex)
+
+def zeroState(nbqubits):
+  state = np.zeros(2 ** nbqubits, dtype=complex)
+  state[0] = 1
+  return state
+
+def nbqubitsOf(state):
+  return int(state.shape[-1]).bit_length() - 1
+
+def applyGate(state, gate, qubit):
+  # View the state as (left, 2, right) with the target qubit in the middle axis
+  # and contract the 2x2 gate over it.
+  right = 2 ** (nbqubitsOf(state) - qubit - 1)
+  view = state.reshape(-1, 2, right)
+  view[...] = np.einsum('ij,ajb->aib', gate, view)
+
+def applyMultiControlledX(state, controls, target):
+  # Controlled-NOT with any number of controls is a permutation of basis
+  # states: swap the target-0 and target-1 slices where all controls are 1.
+  nbqubits = nbqubitsOf(state)
+  psi = state.reshape(state.shape[:-1] + (2,) * nbqubits)
+  sl0 = [slice(None)] * nbqubits
+  for control in controls:
+    sl0[control] = 1
+  sl1 = list(sl0)
+  sl0[target] = 0
+  sl1[target] = 1
+  sl0, sl1 = (Ellipsis,) + tuple(sl0), (Ellipsis,) + tuple(sl1)
+  tmp = psi[sl0].copy()
+  psi[sl0] = psi[sl1]
+  psi[sl1] = tmp
+
+def applyPermutation(state, qubits, table):
+  # Basis state i of the qubits (the first one most significant) goes to table[i].
+  nbqubits = nbqubitsOf(state)
+  psi = state.reshape(state.shape[:-1] + (2,) * nbqubits)
+  axes = [psi.ndim - nbqubits + qubit for qubit in qubits]
+  moved = np.moveaxis(psi, axes, range(psi.ndim - len(qubits), psi.ndim))
+  inverse = np.argsort(table)
+  values = moved.reshape(moved.shape[:-len(qubits)] + (-1,))[..., inverse]
+  moved[...] = values.reshape(moved.shape)
+
+def applyCnot(state, control, target):
+  applyMultiControlledX(state, [control], target)
+
+def applyToffoli(state, control1, control2, target):
+  applyMultiControlledX(state, [control1, control2], target)
+
+# The Shor-code building blocks applied to a state; the circuits themselves
+# are defined once, in circuit_ir.
+
+def PrepareState(state, inputValue):
+  applyOps(state, circuit_ir.PrepareState(inputValue))
+
+def BitFlipEncode(state, indices):
+  applyOps(state, circuit_ir.BitFlipEncode(indices))
+
+def PhaseFlipEncode(state, indices):
+  applyOps(state, circuit_ir.PhaseFlipEncode(indices))
+
+def ErrorIntroduction(state, errorIdxs):
+  applyOps(state, circuit_ir.ErrorIntroduction(errorIdxs))
+
+def BitFlipDecode(state, indices):
+  applyOps(state, circuit_ir.BitFlipDecode(indices))
+
+def PhaseFlipDecode(state, indices):
+  applyOps(state, circuit_ir.PhaseFlipDecode(indices))
+
+def runProgram(inputValue, errorIdxs, nbqubits=9):
+  state = zeroState(nbqubits)
+  PrepareState(state, inputValue)
+  runCode(state, errorIdxs)
+  return state
+
+def EncodeCircuit(state, layout=SHOR_LAYOUT):
+  applyOps(state, EncodeOps(layout))
+
+def DecodeCircuit(state, layout=SHOR_LAYOUT):
+  applyOps(state, DecodeOps(layout))
+
+# Classical fast path. X, CNOT, CCNOT and PERM permute the basis states, so a
+# run of them is one gather: new[j] = old[source[j]]. The source array of a
+# run depends only on its gates, not on input angles, and is cached in a
+# small LRU (PERMUTATION_CACHE_SIZE entries of 2^n indices, see
+# clearPermutationCache), so a sweep builds it once and reuses it for every
+# input and pattern. A run of diagonal gates (Z, S, RZ) is applied as one
+# phase vector, which is cheap to build and not cached. Both are limited to
+# CLASSICAL_MAX_QUBITS.
+PERMUTATION_OPS = ('X', 'CNOT', 'CCNOT', 'PERM')
+DIAGONAL_OPS = ('Z', 'S', 'RZ')
+CLASSICAL_MAX_QUBITS = 16
+PERMUTATION_CACHE_SIZE = 32
+
+_permutationCache = collections.OrderedDict()
+
+def clearPermutationCache():
+  _permutationCache.clear()
+
+def _permutationGate(op, idx, nbqubits):
+  # sigma with new[j] = old[sigma[j]] for one gate.
+  name = op[0]
+  shift = lambda qubit: nbqubits - 1 - qubit
+  if name == 'PERM':
+    qubits, inverse = op[1], np.argsort(op[2])
+    local = np.zeros_like(idx)
+    for qubit in qubits:
+      local = (local << 1) | ((idx >> shift(qubit)) & 1)
+    local = inverse[local]
+    sigma = idx & ~qubitMask(qubits, nbqubits)
+    for k, qubit in enumerate(reversed(qubits)):
+      sigma |= ((local >> k) & 1) << shift(qubit)
+    return sigma
+  if name == 'X':
+    return idx ^ (1 << shift(op[1]))
+  active = np.ones(len(idx), dtype=bool)
+  for control in op[1:-1]:
+    active &= (idx >> shift(control)) & 1 == 1
+  return np.where(active, idx ^ (1 << shift(op[-1])), idx)
+
+def permutationSource(ops, nbqubits):
+  # The source indices of a run of PERMUTATION_OPS, uncached.
+  idx = np.arange(2 ** nbqubits)
+  source = idx
+  for op in ops:
+    source = source[_permutationGate(op, idx, nbqubits)]
+  return source
+
+def permutationMap(ops, nbqubits):
+  # permutationSource through the cache.
+  key = (nbqubits, tuple((op[0], tuple(op[1]), tuple(op[2])) if op[0] == 'PERM' else op for op in ops))
+  if key in _permutationCache:
+    _permutationCache.move_to_end(key)
+    return _permutationCache[key]
+  source = permutationSource(ops, nbqubits)
+  _permutationCache[key] = source
+  while len(_permutationCache) > PERMUTATION_CACHE_SIZE:
+    _permutationCache.popitem(last=False)
+  return source
+
+def diagonalPhase(ops, nbqubits):
+  # The product of a run of DIAGONAL_OPS as a vector over the basis states.
+  idx = np.arange(2 ** nbqubits)
+  phase = np.ones(2 ** nbqubits, dtype=complex)
+  for op in ops:
+    diagonal = rz(op[2]) if op[0] == 'RZ' else _singleQubitGates[op[0]]
+    bit = (idx >> (nbqubits - 1 - op[1])) & 1
+    phase *= np.where(bit == 1, diagonal[1, 1], diagonal[0, 0])
+  return phase
+
+def applyOps(state, ops):
+  # Apply a list of op tuples (see circuit_ir). Measurements are skipped: the
+  # statevector is kept whole. Runs of two or more permutation or diagonal
+  # ops take the fast path above.
+  nbqubits = nbqubitsOf(state)
+  start = 0
+  while start < len(ops):
+    end = start
+    for kind in (PERMUTATION_OPS, DIAGONAL_OPS):
+      while end < len(ops) and ops[end][0] in kind:
+        end += 1
+      if end > start:
+        break
+    if end - start >= 2 and nbqubits <= CLASSICAL_MAX_QUBITS:
+      if ops[start][0] in PERMUTATION_OPS:
+        state[...] = state[..., permutationMap(ops[start:end], nbqubits)]
+      else:
+        state *= diagonalPhase(ops[start:end], nbqubits)
+      start = end
+    else:
+      _applyOp(state, ops[start])
+      start += 1
+
+def _applyOp(state, op):
+  name, qubits = op[0], op[1:]
+  if name == 'CNOT':
+    applyCnot(state, *qubits)
+  elif name == 'CCNOT':
+    applyToffoli(state, *qubits)
+  elif name == 'RX':
+    applyGate(state, rx(op[2]), op[1])
+  elif name == 'RZ':
+    applyGate(state, rz(op[2]), op[1])
+  elif name == 'U':
+    applyGate(state, op[2], op[1])
+  elif name == 'PERM':
+    applyPermutation(state, op[1], op[2])
+  elif name != 'MEASURE':
+    applyGate(state, _singleQubitGates[name], *qubits)
+
+def runCode(state, errorIdxs):
+  # Everything after PrepareState: encode, introduce errors and decode.
+  EncodeCircuit(state)
+  ErrorIntroduction(state, errorIdxs)
+  DecodeCircuit(state)
+
+# Compiled encode/decode segments, keyed on (layout, nbqubits).
+_compiledCodes = {}
+
+def compileStages(ops, nbqubits):
+  # ops as a tuple of stages for applyStages: every run of PERMUTATION_OPS
+  # becomes one ('GATHER', source) stage, the other ops are kept as they are.
+  stages, run = [], []
+  for op in list(ops) + [None]:
+    if op is not None and op[0] in PERMUTATION_OPS:
+      run.append(op)
+      continue
+    if run:
+      source = permutationSource(run, nbqubits)
+      source.flags.writeable = False
+      stages.append(('GATHER', source))
+      run = []
+    if op is not None and op[0] != 'MEASURE':
+      stages.append(op)
+  return tuple(stages)
+
+def applyStages(states, stages):
+  # Runs compiled stages on a state or a batch of states and returns the
+  # result as a new array; states itself is left untouched.
+  out = np.array(states, dtype=complex)
+  for stage in stages:
+    if stage[0] == 'GATHER':
+      # take, unlike out[..., source], always returns a C-contiguous array,
+      # which the in-place gates below need.
+      out = np.take(out, stage[1], axis=-1)
+    else:
+      _applyOp(out, stage)
+  return out
+
+def compiledCode(layout=SHOR_LAYOUT, nbqubits=9):
+  # The encode segment only ever acts on |0> and |1> of the data qubit, so it
+  # is stored as the two codewords (2, 2^n). The decode segment is stored as
+  # compiled stages: a gather for the bit-flip decoders, the H layer on the
+  # outer qubits and a gather for the outer decoder, so decoding a state costs
+  # O(2^n) per stage. Both are built once and are read-only.
+  key = (layout, nbqubits)
+  if key not in _compiledCodes:
+    codewords = np.zeros((2, 2 ** nbqubits), dtype=complex)
+    codewords[0, 0] = 1
+    codewords[1, 2 ** (nbqubits - 1)] = 1
+    EncodeCircuit(codewords, layout)
+    codewords.flags.writeable = False
+    _compiledCodes[key] = (codewords, compileStages(DecodeOps(layout), nbqubits))
+  return _compiledCodes[key]
+
+def qubitMask(idxs, nbqubits):
+  # Bit mask of the qubits in idxs, in basis-index order (qubit 0 = MSB).
+  mask = 0
+  for idx in idxs:
+    mask |= 1 << (nbqubits - 1 - idx)
+  return mask
+
+def pauliMasks(errors, nbqubits):
+  # (xMask, zMask) for an error pattern. Entries are either a plain qubit
+  # index, meaning X followed by Z as in ErrorIntroduction, or a
+  # (qubit, 'X' | 'Y' | 'Z') pair. Global phases are dropped.
+  xQubits, zQubits = [], []
+  for err in errors:
+    qubit, pauli = (err, 'Y') if isinstance(err, (int, np.integer)) else err
+    if pauli in 'XY':
+      xQubits.append(qubit)
+    if pauli in 'YZ':
+      zQubits.append(qubit)
+  return qubitMask(xQubits, nbqubits), qubitMask(zQubits, nbqubits)
+
+def applyPauliLayer(states, xMask, zMask):
+  # X on the qubits in xMask followed by Z on the qubits in zMask: an index
+  # gather followed by a sign flip. Returns a new array.
+  idx = np.arange(states.shape[-1])
+  out = states[..., idx ^ xMask]
+  bit = 0
+  while zMask >> bit:
+    if (zMask >> bit) & 1:
+      out[..., (idx >> bit) & 1 == 1] *= -1
+    bit += 1
+  return out
+
+def runCodeCompiled(errorIdxs, layout=SHOR_LAYOUT, nbqubits=9):
+  # Output states (2, 2^n) for the inputs |0> and |1>, using the cached
+  # segments so that only the Pauli layer depends on errorIdxs.
+  return runErrorSweepCompiled([errorIdxs], layout, nbqubits)[0]
+
+def runErrorSweepCompiled(allErrorIdxs, layout=SHOR_LAYOUT, nbqubits=9):
+  # Output states (P, 2, 2^n) for P error patterns. The Pauli layers are
+  # applied to the cached codewords and all patterns are decoded together.
+  codewords, decodeStages = compiledCode(layout, nbqubits)
+  errored = np.empty((len(allErrorIdxs),) + codewords.shape, dtype=complex)
+  for patternIdx, errorIdxs in enumerate(allErrorIdxs):
+    errored[patternIdx] = applyPauliLayer(codewords, *pauliMasks(errorIdxs, nbqubits))
+  return applyStages(errored, decodeStages)
+
+def isCorrected(errors, layout=SHOR_LAYOUT, nbqubits=9, tolerance=1e-6):
+  # A pattern is corrected when the decoder maps |0> and |1> to |0>|s> and
+  # |1>|s> with the same syndrome state |s>, i.e. it acts on the data qubit as
+  # the identity. errors is anything pauliMasks accepts.
+  out = runCodeCompiled(errors, layout, nbqubits).reshape(2, 2, -1)
+  return bool(np.all(np.abs(out[0, 1]) < tolerance) and np.all(np.abs(out[1, 0]) < tolerance)
+              and np.allclose(out[0, 0], out[1, 1], atol=tolerance))
+
+def runProgramBatch(inputAngles, errorIdxs, nbqubits=9):
+  # inputAngles is an (N, 2) array of (theta, phi) pairs. The circuit after
+  # PrepareState is linear, so it is only simulated for the basis inputs |0>
+  # and |1>; every output state is a combination of those two, which for all
+  # N inputs is a single (N, 2) x (2, 2^n) matrix product.
+  inputAngles = np.asarray(inputAngles, dtype=float).reshape(-1, 2)
+  basisOut = runCodeCompiled(errorIdxs, nbqubits=nbqubits)
+  return statesForInputs(inputAngles[:, 0], inputAngles[:, 1]) @ basisOut
+
+def dataQubitAmplitudes(state):
+  # After decoding the data qubit (qubit 0) is in a product state with the
+  # syndrome left on the other qubits. Pick the dominant syndrome and return
+  # the two data-qubit amplitudes belonging to it.
+  rows = state.reshape(2, -1)
+  syndromeIdx = np.argmax(np.sum(np.abs(rows) ** 2, axis=0))
+  return [complex(rows[0, syndromeIdx]), complex(rows[1, syndromeIdx])]
+
+def dataQubitAmplitudesBatch(states):
+  # Vectorised dataQubitAmplitudes for an (N, 2^n) batch, returns (N, 2).
+  rows = states.reshape(states.shape[0], 2, -1)
+  syndromeIdx = np.argmax(np.sum(np.abs(rows) ** 2, axis=1), axis=1)
+  return rows[np.arange(rows.shape[0]), :, syndromeIdx]
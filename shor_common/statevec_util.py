@@ -9,7 +9,6 @@ def _isCosPlusSin(phaseDiff):
   # The phase difference should be in the form cos(phi) + i sin(phi)
   if     phaseDiff.real < -1 or phaseDiff.real > 1 \
       or phaseDiff.imag < -1 or phaseDiff.imag > 1:
-    print("Error: complex component of " + str(phaseDiff) + " out of bounds")
     return False
   phiReal = math.acos(phaseDiff.real) # or -phiImag.      Range is [0, PI]
   phiImag = math.asin(phaseDiff.imag) # or PI - phiImag   Range is [-PI/2, PI/2]
@@ -20,8 +19,6 @@ def _isCosPlusSin(phaseDiff):
      _approxEqual((-phiReal - (math.pi - phiImag)) % math.pi, 0.0) or _approxEqual((-phiReal - (math.pi - phiImag)) % math.pi, 0.0):
     return True # phaseDiffA0 not of the form cos(phi) + i sin(phi)
   else:
-    print(phiReal)
-    print(phiImag)
     return False
 
 def stateForInput(th, ph):
@@ -29,6 +26,14 @@ def stateForInput(th, ph):
   ampl1 = complex(math.sin(ph/2) * math.sin(th/2), math.cos(ph/2) * math.sin(th/2) * -1)
   return [ampl0, ampl1]
 
+def statesForInputs(thetas, phis):
+  # Vectorised stateForInput: returns an (N, 2) array of amplitudes.
+  thetas = np.asarray(thetas, dtype=float)
+  phis = np.asarray(phis, dtype=float)
+  ampl0 = np.exp(-0.5j * phis) * np.cos(thetas/2)
+  ampl1 = -1j * np.exp(0.5j * phis) * np.sin(thetas/2)
+  return np.stack([ampl0, ampl1], axis=-1)
+
 def _clampedComponents(ampl):
   comps = [ampl.real, ampl.imag]
   for compIdx in [0, 1]:
@@ -37,14 +42,12 @@ def _clampedComponents(ampl):
       if _approxEqual(c, -1.0):
         comps[compIdx] = -1.0
       else:
-        print("Error: complex amplitude magnitude too large (negative).")
-        exit()
+        raise ValueError("complex amplitude magnitude too large (negative).")
     if c > 1.0:
       if _approxEqual(c, 1.0):
         comps[compIdx] = 1.0
       else:
-        print("Error: complex amplitude magnitude too large (positive).")
-        exit()
+        raise ValueError("complex amplitude magnitude too large (positive).")
   return complex(comps[0], comps[1])
 
 def sameState(psiA, psiB):
@@ -65,7 +68,6 @@ def sameState(psiA, psiB):
   # The phase difference should be in the form cos(phi) + i sin(phi)
   phaseDiff = _clampedComponents(phaseDiff)
   if not _isCosPlusSin(phaseDiff):
-    print("Not e^(i*phi)")
     return False
 
   # Finally check that the phase difference for the other eigenstate is the same
@@ -73,5 +75,38 @@ def sameState(psiA, psiB):
      or basedOnEigen == 1 and _approxEqual(psiA0 * phaseDiff, psiB0):
     return True
   else:
-    print("States not identical up to global phase difference.")
-    return False
\ No newline at end of file
+    return False
+
+def compareStates(expected, obtained, tolerance=0.00001):
+  # Vectorised sameState for arrays of states, one per row: (N, 2) amplitude
+  # pairs or (N, d) full or reduced states. Returns per-row fidelity, the
+  # global phase (radians) that best maps expected onto obtained, and a
+  # pass mask that is True where obtained equals expected up to that phase.
+  expected = np.atleast_2d(np.asarray(expected, dtype=complex))
+  obtained = np.atleast_2d(np.asarray(obtained, dtype=complex))
+  overlap = np.sum(np.conj(expected) * obtained, axis=-1)
+  norms = np.sum(np.abs(expected) ** 2, axis=-1) * np.sum(np.abs(obtained) ** 2, axis=-1)
+  fidelity = np.divide(np.abs(overlap) ** 2, norms, out=np.zeros(norms.shape), where=norms > 0)
+  globalPhase = np.angle(overlap)
+  residual = np.max(np.abs(obtained - np.exp(1j * globalPhase)[:, None] * expected), axis=-1)
+  passed = residual <= tolerance
+  return fidelity, globalPhase, passed
+
+def _qubitTensor(state, qubit, littleEndian):
+  # (2, rest) view of a statevector with the given qubit on the first axis.
+  # With littleEndian (Qiskit, Qubiter) qubit 0 is the least significant bit of
+  # the basis index, otherwise (Cirq, the NumPy engine) the most significant.
+  state = np.asarray(state).reshape(-1)
+  nbqubits = int(state.size).bit_length() - 1
+  axis = nbqubits - 1 - qubit if littleEndian else qubit
+  psi = state.reshape((2,) * nbqubits)
+  return np.moveaxis(psi, axis, 0).reshape(2, -1)
+
+def splitDataQubit(state, qubit=0, littleEndian=False):
+  # Factor the state as |data> (x) |rest>, assuming it is (close to) a product
+  # state, as after a successful decode. Returns the two data-qubit amplitudes
+  # and the normalised state of the remaining qubits; the global phase is put
+  # on the data qubit.
+  m = _qubitTensor(state, qubit, littleEndian)
+  u, s, vh = np.linalg.svd(m, full_matrices=False)
+  return u[:, 0] * s[0], vh[0]
@@ -0,0 +1,136 @@
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+
+# Parallel sweep over (inputValue, errorIdxs) jobs.
+#
+# A job is a module-level function job(context, inputValue, errorIdxs). The
+# context is whatever warmUp() returned in the worker running the job, so
+# expensive setup such as framework imports or Aer.get_backend happens once
+# per worker rather than once per job. Jobs are submitted in chunks and the
+# results are merged back in job order, so the output does not depend on the
+# number of workers or on which worker finished first.
+
+_workerContext = None
+
+def _initWorker(warmUp):
+  global _workerContext
+  _workerContext = warmUp() if warmUp is not None else None
+
+def _runChunk(job, chunk):
+  return [(jobIdx, job(_workerContext, inputValue, errorIdxs)) for jobIdx, inputValue, errorIdxs in chunk]
+
+def sweepJobs(inputValues, allErrorIdxs):
+  # All (inputValue, errorIdxs) pairs, input-major like the nested loops in testErrorCorrection.
+  return list(itertools.product(inputValues, allErrorIdxs))
+
+def runSweep(job, inputValues, allErrorIdxs, warmUp=None, maxWorkers=None, chunkSize=16):
+  # Returns a list of (inputValue, errorIdxs, result) in job order. With
+  # maxWorkers=1 everything runs in this process, which is handy for debugging.
+  jobs = sweepJobs(inputValues, allErrorIdxs)
+  numberedJobs = [(jobIdx, inputValue, errorIdxs) for jobIdx, (inputValue, errorIdxs) in enumerate(jobs)]
+  chunks = [numberedJobs[start:start + chunkSize] for start in range(0, len(numberedJobs), chunkSize)]
+  results = [None] * len(jobs)
+  if maxWorkers == 1:
+    _initWorker(warmUp)
+    for chunk in chunks:
+      for jobIdx, result in _runChunk(job, chunk):
+        results[jobIdx] = result
+  else:
+    maxWorkers = maxWorkers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(maxWorkers, initializer=_initWorker, initargs=(warmUp,)) as pool:
+      futures = [pool.submit(_runChunk, job, chunk) for chunk in chunks]
+      for future in concurrent.futures.as_completed(futures):
+        for jobIdx, result in future.result():
+          results[jobIdx] = result
+  return [(inputValue, errorIdxs, result) for (inputValue, errorIdxs), result in zip(jobs, results)]
+
+
+def patternCount(nbqubits, weight, paulis='XYZ'):
+  return math.comb(nbqubits, weight) * len(paulis) ** weight
+
+def errorPatterns(nbqubits, maxWeight, paulis='XYZ', start=0):
+  # Lazily yields (position, weight, pattern) for every Pauli error pattern of
+  # weight 0..maxWeight, where a pattern is a tuple of (qubit, pauli) pairs.
+  # position counts patterns from the start of weight 0; start skips whole
+  # weights arithmetically, so resuming from a checkpoint is cheap.
+  position = 0
+  for weight in range(maxWeight + 1):
+    count = patternCount(nbqubits, weight, paulis)
+    if position + count <= start:
+      position += count
+      continue
+    patterns = (tuple(zip(qubits, types))
+                for qubits in itertools.combinations(range(nbqubits), weight)
+                for types in itertools.product(paulis, repeat=weight))
+    skip = max(start - position, 0)
+    position += skip
+    for pattern in itertools.islice(patterns, skip, None):
+      yield position, weight, pattern
+      position += 1
+
+def _sweepParameters(isCorrected, nbqubits, maxWeight, paulis, stopAtFirstFailure):
+  # What a checkpoint must match to be resumed: the counts of a sweep with
+  # other parameters, or through another function, cannot be added to.
+  name = str(getattr(isCorrected, '__module__', None)) + '.' + \
+         getattr(isCorrected, '__qualname__', type(isCorrected).__qualname__)
+  return {'isCorrected': name, 'nbqubits': nbqubits, 'maxWeight': maxWeight,
+          'paulis': ''.join(paulis), 'stopAtFirstFailure': stopAtFirstFailure}
+
+def _loadCheckpoint(checkpointFile, parameters):
+  if checkpointFile is None or not os.path.exists(checkpointFile):
+    return {'parameters': parameters, 'position': 0, 'distribution': {}, 'firstFailures': {}}
+  with open(checkpointFile) as f:
+    state = json.load(f)
+  if state.get('parameters') != parameters:
+    raise ValueError("checkpoint " + checkpointFile + " is of a sweep with parameters " +
+                     str(state.get('parameters')) + ", not " + str(parameters))
+  return state
+
+def _saveCheckpoint(checkpointFile, state):
+  # Write to a temporary file first so an interrupted run never leaves a broken checkpoint.
+  with open(checkpointFile + '.tmp', 'w') as f:
+    json.dump(state, f)
+  os.replace(checkpointFile + '.tmp', checkpointFile)
+
+def sweepErrorWeights(isCorrected, nbqubits, maxWeight, paulis='XYZ', stopAtFirstFailure=False,
+                      checkpointFile=None, checkpointEvery=1000):
+  # Streams all patterns of weight 0..maxWeight through isCorrected(pattern)
+  # and returns the weight distribution of logical failures as
+  # {weight: [patterns checked, failures]} together with the first failing
+  # pattern per weight. With stopAtFirstFailure the rest of a weight is
+  # skipped once it has an uncorrectable pattern. When checkpointFile is
+  # given, progress is saved there and a rerun resumes from it; resuming a
+  # checkpoint of a sweep with other parameters raises ValueError.
+  parameters = _sweepParameters(isCorrected, nbqubits, maxWeight, paulis, stopAtFirstFailure)
+  state = _loadCheckpoint(checkpointFile, parameters)
+  distribution = {int(weight): counts for weight, counts in state['distribution'].items()}
+  firstFailures = {int(weight): tuple(tuple(err) for err in pattern) for weight, pattern in state['firstFailures'].items()}
+  position = state['position']
+  sinceCheckpoint = 0
+  weightStart = 0
+  for weight in range(maxWeight + 1):
+    weightEnd = weightStart + patternCount(nbqubits, weight, paulis)
+    if position < weightEnd and not (stopAtFirstFailure and weight in firstFailures):
+      for position, _, pattern in errorPatterns(nbqubits, weight, paulis, max(position, weightStart)):
+        counts = distribution.setdefault(weight, [0, 0])
+        counts[0] += 1
+        failed = not isCorrected(pattern)
+        if failed:
+          counts[1] += 1
+          firstFailures.setdefault(weight, pattern)
+        sinceCheckpoint += 1
+        if checkpointFile is not None and sinceCheckpoint >= checkpointEvery:
+          _saveCheckpoint(checkpointFile, {'parameters': parameters, 'position': position + 1,
+                                           'distribution': distribution, 'firstFailures': firstFailures})
+          sinceCheckpoint = 0
+        if failed and stopAtFirstFailure:
+          break
+    position = max(position, weightEnd)
+    weightStart = weightEnd
+  if checkpointFile is not None:
+    _saveCheckpoint(checkpointFile, {'parameters': parameters, 'position': position,
+                                     'distribution': distribution, 'firstFailures': firstFailures})
+  return distribution, firstFailures
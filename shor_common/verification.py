@@ -0,0 +1,100 @@
+import math
+import statistics
+
+# Statistical pass criterion for sampled runs.
+#
+# A sampled frequency never matches |amplitude|^2 to a fixed 1e-4, so a run
+# passes when its frequency of 1 on the data qubit is, with the requested
+# confidence, within tolerance of the expected probability, and fails when it
+# is, with the same confidence, outside that band. The band is judged with the
+# Wilson interval of the observed count.
+#
+# sequentialTest draws shots in batches that double in size and stops as soon
+# as the verdict is certain, so a corrected |0> or |1> (a deterministic
+# outcome) needs a few hundred shots and a broken run is usually caught in
+# the first batch. Each look at the data uses a confidence Bonferroni-corrected
+# for the number of looks in the final schedule, which keeps the overall
+# confidence of the verdict.
+
+def wilsonInterval(failures, trials, z=1.96):
+  # Wilson score interval for a binomial proportion.
+  if trials == 0:
+    return 0.0, 1.0
+  rate = failures / trials
+  denominator = 1 + z ** 2 / trials
+  centre = (rate + z ** 2 / (2 * trials)) / denominator
+  halfWidth = z * math.sqrt(rate * (1 - rate) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+  return max(0.0, centre - halfWidth), min(1.0, centre + halfWidth)
+
+def zScore(confidence):
+  return statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def minimumShots(tolerance, confidence=0.99, expected=0.5):
+  # Smallest number of shots for which the Wilson interval around the
+  # expected probability is narrower than +-tolerance.
+  z = zScore(confidence)
+
+  def narrowEnough(shots):
+    low, high = wilsonInterval(expected * shots, shots, z)
+    return low >= expected - tolerance and high <= expected + tolerance
+
+  high = 1
+  while not narrowEnough(high):
+    high *= 2
+  low = high // 2
+  while high - low > 1:
+    middle = (low + high) // 2
+    if narrowEnough(middle):
+      high = middle
+    else:
+      low = middle
+  return high
+
+def frequencyVerdict(ones, shots, expected, tolerance=0.05, confidence=0.99):
+  # True (pass), False (fail) or None (not enough shots to tell).
+  low, high = wilsonInterval(ones, shots, zScore(confidence))
+  if low >= expected - tolerance and high <= expected + tolerance:
+    return True
+  if high < expected - tolerance or low > expected + tolerance:
+    return False
+  return None
+
+def _schedule(batchShots, maxShots):
+  # Cumulative shot counts at which the data is looked at.
+  looks = []
+  shots = batchShots
+  while shots < maxShots:
+    looks.append(shots)
+    shots *= 2
+  return looks + [maxShots]
+
+def sequentialTest(sampleOnes, expected, tolerance=0.05, confidence=0.99, batchShots=32, maxShots=None):
+  # sampleOnes(shots) draws that many new shots and returns how many gave 1.
+  # Returns (passed, shots used, (low, high)), where passed is True, False,
+  # or None when maxShots is reached without a certain verdict; an
+  # inconclusive run is not a pass.
+  # The number of looks and the per-look confidence depend on each other:
+  # more looks need a higher confidence, which needs more shots and so more
+  # looks. Both only grow, so iterate until the number of looks is stable;
+  # the confidence is then corrected for exactly the looks that are made.
+  # The last look is sized so the interval is at most half the band: the
+  # observed frequency of a correct run is then, with that confidence, close
+  # enough to the expected one for the interval to fit inside the band.
+  looks = []
+  nextLooks = [maxShots or batchShots]
+  while len(nextLooks) != len(looks):
+    looks = nextLooks
+    lookConfidence = 1 - (1 - confidence) / len(looks)
+    limit = maxShots or max(batchShots, minimumShots(tolerance / 2, lookConfidence))
+    nextLooks = _schedule(batchShots, limit)
+  looks = nextLooks
+  z = zScore(lookConfidence)
+  ones = 0
+  shots = 0
+  for look in looks:
+    ones += sampleOnes(look - shots)
+    shots = look
+    verdict = frequencyVerdict(ones, shots, expected, tolerance, lookConfidence)
+    if verdict is not None:
+      break
+  return verdict, shots, wilsonInterval(ones, shots, z)
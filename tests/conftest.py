@@ -0,0 +1,57 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The tests import shor_common from the repository root, like the scripts do.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from shor_common import statevec_sim
+
+CLIFFORD_GATES = ('H', 'S', 'X', 'Z', 'CNOT')
+ALL_GATES = ('H', 'S', 'X', 'Y', 'Z', 'RX', 'RZ', 'CNOT', 'CCNOT')
+
+
+@pytest.fixture
+def rng():
+  return np.random.default_rng(1234)
+
+
+@pytest.fixture
+def randomOps(rng):
+  # Random circuit_ir op lists: randomOps(nbqubits, length, gates).
+  def make(nbqubits, length, gates=ALL_GATES):
+    ops = []
+    for _ in range(length):
+      name = str(rng.choice([gate for gate in gates if gate != 'CCNOT' or nbqubits >= 3]))
+      if name in ('CNOT', 'CCNOT'):
+        qubits = rng.choice(nbqubits, size=2 if name == 'CNOT' else 3, replace=False)
+        ops.append((name,) + tuple(int(qubit) for qubit in qubits))
+      elif name in ('RX', 'RZ'):
+        ops.append((name, int(rng.integers(nbqubits)), float(rng.uniform(0, 2 * np.pi))))
+      else:
+        ops.append((name, int(rng.integers(nbqubits))))
+    return ops
+  return make
+
+
+@pytest.fixture
+def randomState(rng):
+  def make(nbqubits):
+    state = rng.normal(size=2 ** nbqubits) + 1j * rng.normal(size=2 ** nbqubits)
+    return state / np.linalg.norm(state)
+  return make
+
+
+def referenceState(ops, nbqubits, state=None):
+  # ops applied gate by gate, without the fast paths of statevec_sim.applyOps.
+  state = statevec_sim.zeroState(nbqubits) if state is None else state.copy()
+  for op in ops:
+    statevec_sim._applyOp(state, op)
+  return state
+
+
+def sameUpToPhase(expected, obtained, tolerance=1e-9):
+  overlap = np.vdot(expected, obtained)
+  return abs(abs(overlap) - 1) < tolerance and np.allclose(obtained, overlap * expected, atol=tolerance)
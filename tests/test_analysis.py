@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from shor_common.analysis import (packBits, countsFromMeasurements, countsFromDict, marginal, qubitMarginals,
+                                  syndromeHistogram)
+
+# Histograms, marginals and syndromes of measurement results.
+
+
+def test_pack_bits_orders():
+  bits = [[1, 0, 0], [0, 1, 1]]
+  assert packBits(bits).tolist() == [4, 3]
+  assert packBits(bits, littleEndian=True).tolist() == [1, 6]
+  assert packBits([0, 1, 1]).tolist() == [0, 1, 1]
+
+
+def test_pack_bits_in_chunks(rng):
+  bits = rng.integers(2, size=(1000, 5))
+  assert np.array_equal(packBits(bits, chunkSize=64), packBits(bits))
+
+
+def test_counts_from_measurements(rng):
+  bits = rng.integers(2, size=(500, 3))
+  counts = countsFromMeasurements(bits)
+  assert counts.sum() == 500 and len(counts) == 8
+  for index in range(8):
+    row = [(index >> 2) & 1, (index >> 1) & 1, index & 1]
+    assert counts[index] == np.sum(np.all(bits == row, axis=1))
+
+
+def test_counts_from_dict_keys():
+  # Bitstrings are written with the highest qubit first: '001' has qubit 0 set.
+  assert countsFromDict({'001': 3, '100': 1}, 3).tolist() == [0, 1, 0, 0, 3, 0, 0, 0]
+  # Quantum Inspire keys are indices with qubit 0 as the least significant bit.
+  assert countsFromDict({'1': 0.25, '4': 0.75}, 3).tolist() == [0, 0.75, 0, 0, 0.25, 0, 0, 0]
+  assert countsFromDict({1: 0.25, 4: 0.75}, 3, littleEndian=True).tolist() == [0, 0.25, 0, 0, 0.75, 0, 0, 0]
+
+
+@pytest.mark.parametrize('littleEndian', [False, True])
+def test_marginals_match_the_measured_bits(rng, littleEndian):
+  nbqubits = 4
+  bits = rng.integers(2, size=(300, nbqubits))
+  counts = countsFromMeasurements(bits, littleEndian)
+  for qubits in ([2], [0, 3], [3, 1, 0]):
+    assert np.array_equal(marginal(counts, qubits, nbqubits, littleEndian),
+                          countsFromMeasurements(bits[:, qubits]))
+  ones = bits.sum(axis=0)
+  assert qubitMarginals(counts, nbqubits, littleEndian).tolist() == [[300 - one, one] for one in ones]
+
+
+def test_syndrome_histogram():
+  bits = np.array([[0, 1, 1, 0], [1, 1, 0, 0], [0, 1, 1, 1]])
+  # Syndrome from columns 2 and 0, column 2 first.
+  assert syndromeHistogram(bits, [2, 0]).tolist() == [0, 1, 2, 0]
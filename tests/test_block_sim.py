@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from conftest import referenceState, sameUpToPhase
+from shor_common import circuit_ir, concatenated, statevec_util
+from shor_common.block_sim import BlockState, blocksOf
+
+# BlockState against the dense engine for several block layouts.
+
+
+@pytest.mark.parametrize('blockSizes', [[6], [3, 3], [2, 2, 2], [1, 3, 2], [1, 1, 1, 1, 1, 1]])
+def test_random_circuits_match_statevector(blockSizes, randomOps):
+  for _ in range(10):
+    ops = randomOps(6, 40)
+    state = BlockState(blockSizes)
+    state.applyOps(ops)
+    assert np.allclose(state.toArray(), referenceState(ops, 6))
+
+
+def test_blocks_of_the_shor_code():
+  ops = circuit_ir.createProgram({'theta': 0, 'phi': 0}, (4,))
+  assert blocksOf(ops, 9) == [3, 3, 3]
+
+
+@pytest.mark.parametrize('errorIdxs', [(), (0,), (4,), (8,)])
+def test_shor_program_data_qubit(errorIdxs):
+  inputValue = {'theta': 1.1, 'phi': 2.3}
+  ops = circuit_ir.createProgram(inputValue, errorIdxs)
+  state = BlockState(blocksOf(ops, 9))
+  state.applyOps(ops)
+  assert sameUpToPhase(referenceState(ops, 9), state.toArray())
+  assert max(state.bondDimensions()) <= 4
+  expected = statevec_util.stateForInput(inputValue['theta'], inputValue['phi'])
+  _, _, passed = statevec_util.compareStates(expected, state.dataQubitAmplitudes())
+  assert passed.all()
+
+
+def test_concatenated_level_two():
+  inputValue = {'theta': 1.1, 'phi': 2.3}
+  ops = concatenated.createProgram(inputValue, (40,), 2)
+  nbqubits = concatenated.nbqubitsForLevel(2)
+  state = BlockState(blocksOf(ops, nbqubits))
+  state.applyOps(ops)
+  expected = statevec_util.stateForInput(inputValue['theta'], inputValue['phi'])
+  _, _, passed = statevec_util.compareStates(expected, state.dataQubitAmplitudes())
+  assert passed.all()
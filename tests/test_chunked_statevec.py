@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from conftest import referenceState
+from shor_common import circuit_ir, circuit_opt, statevec_util
+from shor_common.chunked_statevec import ChunkedState
+
+# ChunkedState against the in-memory engine, for chunks smaller than the state
+# so that ops on global qubits are exercised.
+
+
+@pytest.mark.parametrize('chunkQubits,maxGroupQubits', [(2, 1), (3, 2), (4, 3), (6, 2)])
+def test_random_circuits_match_statevector(chunkQubits, maxGroupQubits, randomOps, tmp_path):
+  for _ in range(10):
+    ops = circuit_opt.mergeFans(randomOps(6, 40))
+    with ChunkedState(6, chunkQubits=chunkQubits, directory=str(tmp_path), maxGroupQubits=maxGroupQubits) as state:
+      state.applyOps(ops)
+      assert np.allclose(state.toArray(), referenceState(ops, 6))
+  assert not list(tmp_path.iterdir())
+
+
+def test_complex64(randomOps, tmp_path):
+  ops = randomOps(6, 40)
+  with ChunkedState(6, dtype=np.complex64, chunkQubits=3, directory=str(tmp_path)) as state:
+    state.applyOps(ops)
+    assert state.toArray().dtype == np.complex64
+    assert np.allclose(state.toArray(), referenceState(ops, 6), atol=1e-5)
+
+
+@pytest.mark.parametrize('chunkQubits', [3, 8])
+def test_shor_program_data_qubit(chunkQubits, tmp_path):
+  inputValue = {'theta': 1.1, 'phi': 2.3}
+  for errorIdxs in [(), (0,), (4,), (8,)]:
+    ops = circuit_ir.createProgram(inputValue, errorIdxs)
+    with ChunkedState(9, chunkQubits=chunkQubits, directory=str(tmp_path)) as state:
+      state.applyOps(ops)
+      amplitudes = state.dataQubitAmplitudes()
+    expected = statevec_util.stateForInput(inputValue['theta'], inputValue['phi'])
+    _, _, passed = statevec_util.compareStates(expected, amplitudes)
+    assert passed.all()
@@ -0,0 +1,50 @@
+import itertools
+
+import pytest
+
+from conftest import referenceState, sameUpToPhase
+from shor_common import circuit_ir
+from shor_common.backends import BACKENDS, NumPyBackend, verify
+
+# circuit_ir: the cQASM round trip and the lowerings against createProgram.
+
+INPUT_VALUES = [{'theta': 0, 'phi': 0}, {'theta': 1.1, 'phi': 2.3}, {'theta': 3.14159, 'phi': 0.5}]
+PATTERNS = [(), (0,), (4,), (8,)]
+
+
+def test_cqasm_round_trip(randomOps):
+  for nbqubits in (3, 9):
+    ops = randomOps(nbqubits, 50) + [('MEASURE', qubit) for qubit in range(nbqubits)]
+    parsed, parsedQubits = circuit_ir.fromCQASM(circuit_ir.toCQASM(ops, nbqubits))
+    assert parsedQubits == nbqubits
+    assert parsed == ops
+
+
+def test_cqasm_of_the_shor_program():
+  ops = circuit_ir.createProgram(INPUT_VALUES[1], (2, 5), measure=True)
+  text = circuit_ir.toCQASM(ops, 9)
+  assert text.startswith('version 1.0\nqubits 9\n')
+  assert 'Toffoli q[2], q[1], q[0]' in text
+  assert circuit_ir.fromCQASM(text) == (ops, 9)
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_numpy_lowering_matches_create_program(optimize):
+  backend = NumPyBackend(optimize)
+  for inputValue, errorIdxs in itertools.product(INPUT_VALUES, PATTERNS):
+    ops = circuit_ir.createProgram(inputValue, errorIdxs)
+    kind, state, littleEndian = backend.simulate(None, ops, 9)
+    assert kind == 'statevector' and not littleEndian
+    assert sameUpToPhase(referenceState(ops, 9), state)
+
+
+@pytest.mark.parametrize('backendName', sorted(BACKENDS))
+def test_every_available_backend_corrects_single_errors(backendName):
+  backend = BACKENDS[backendName]
+  if backendName == 'quantuminspire' or not backend.available():
+    pytest.skip(backendName + ' is not available here')
+  context = backend.warmUp()
+  for inputValue, errorIdxs in itertools.product(INPUT_VALUES, PATTERNS):
+    ops = circuit_ir.createProgram(inputValue, errorIdxs)
+    passed, fidelity = verify(inputValue, backend.simulate(context, ops, 9))
+    assert passed and fidelity == pytest.approx(1)
@@ -0,0 +1,66 @@
+import itertools
+
+import pytest
+
+from conftest import referenceState, sameUpToPhase
+from shor_common import circuit_ir, circuit_opt, statevec_sim
+
+# The optimisation passes must not change the state a circuit produces.
+
+
+def _optimizedState(ops, nbqubits, state):
+  state = state.copy()
+  statevec_sim.applyOps(state, ops)
+  return state
+
+
+@pytest.mark.parametrize('nbqubits', [3, 5])
+@pytest.mark.parametrize('optimizationPass', [circuit_opt.cancelInverses, circuit_opt.fuseSingleQubit,
+                                              circuit_opt.mergeFans])
+def test_each_pass_preserves_arbitrary_states(nbqubits, optimizationPass, randomOps, randomState):
+  for _ in range(20):
+    ops = randomOps(nbqubits, 30)
+    psi = randomState(nbqubits)
+    assert sameUpToPhase(referenceState(ops, nbqubits, psi), _optimizedState(optimizationPass(ops), nbqubits, psi))
+
+
+@pytest.mark.parametrize('nbqubits', [3, 5])
+def test_optimize_preserves_arbitrary_states(nbqubits, randomOps, randomState):
+  for _ in range(20):
+    ops = randomOps(nbqubits, 30)
+    psi = randomState(nbqubits)
+    optimized = circuit_opt.optimize(ops, zeroQubits=())
+    assert sameUpToPhase(referenceState(ops, nbqubits, psi), _optimizedState(optimized, nbqubits, psi))
+
+
+@pytest.mark.parametrize('nbqubits', [3, 5])
+def test_optimize_from_zero_state(nbqubits, randomOps):
+  zero = statevec_sim.zeroState(nbqubits)
+  for _ in range(20):
+    ops = randomOps(nbqubits, 30)
+    optimized = circuit_opt.optimize(ops)
+    assert sameUpToPhase(referenceState(ops, nbqubits), _optimizedState(optimized, nbqubits, zero))
+
+
+def test_optimize_shor_programs():
+  inputValues = [{'theta': 0, 'phi': 0}, {'theta': 1.1, 'phi': 2.3}, {'theta': 3.14159, 'phi': 0.5}]
+  patterns = [()] + [(qubit,) for qubit in range(9)] + list(itertools.combinations(range(9), 2))[::5]
+  zero = statevec_sim.zeroState(9)
+  for inputValue, errorIdxs in itertools.product(inputValues, patterns):
+    ops = circuit_ir.createProgram(inputValue, errorIdxs, measure=True)
+    optimized = circuit_opt.optimize(ops)
+    assert len(optimized) <= len(ops)
+    assert sameUpToPhase(referenceState(ops, 9), _optimizedState(optimized, 9, zero))
+
+
+def test_optimize_cancels_the_error_free_code():
+  ops = circuit_ir.createProgram({'theta': 1.1, 'phi': 2.3}, ())
+  # Encoding and decoding cancel, so only the preparation of qubit 0 is left.
+  assert [circuit_ir.qubitsOf(op) for op in circuit_opt.optimize(ops)] == [(0,)]
+
+
+def test_fuse_drops_global_phases():
+  # X Z Y = i I and H Z H X = I.
+  assert circuit_opt.fuseSingleQubit([('X', 0), ('Z', 0), ('Y', 0)]) == []
+  assert circuit_opt.fuseSingleQubit([('H', 1), ('Z', 1), ('H', 1), ('X', 1)]) == []
+  assert len(circuit_opt.fuseSingleQubit([('H', 0), ('S', 0)])) == 1
@@ -0,0 +1,15 @@
+import pytest
+
+from shor_common import density_sim
+from shor_common.noise import CHANNELS
+
+# The exact density-matrix evaluation: the block method against the dense one.
+
+INPUT = {'theta': 1.1, 'phi': 2.3}
+
+
+@pytest.mark.parametrize('channel', CHANNELS)
+def test_block_method_matches_dense(channel):
+  dense = density_sim.logicalFidelity(INPUT, channel, 0.1, method='dense')
+  blocks = density_sim.logicalFidelity(INPUT, channel, 0.1, method='blocks')
+  assert blocks == pytest.approx(dense, abs=1e-14)
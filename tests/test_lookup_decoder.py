@@ -0,0 +1,54 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from shor_common import shor_syndrome_code, statevec_sim
+from shor_common.lookup_decoder import CSSDecoder, errorMasks, packErrors, shorDecoder
+
+# The lookup-table decoder against the simulated Shor code and on the Steane code.
+
+STEANE_CHECKS = np.array([[0, 0, 0, 1, 1, 1, 1],
+                          [0, 1, 1, 0, 0, 1, 1],
+                          [1, 0, 1, 0, 1, 0, 1]], dtype=bool)
+STEANE_LOGICAL = np.ones(7, dtype=bool)
+
+
+def _patterns(nbqubits, maxWeight):
+  return [errorIdxs for weight in range(maxWeight + 1) for errorIdxs in itertools.combinations(range(nbqubits), weight)]
+
+
+def test_shor_decoder_matches_pauli_frame():
+  patterns = _patterns(9, 3)
+  errors = errorMasks(patterns, 9)
+  assert list(shorDecoder().failures(errors, errors)) == list(shor_syndrome_code.logicalFailures(patterns))
+
+
+def test_shor_decoder_matches_statevector_for_separate_x_and_z(rng):
+  decoder = shorDecoder()
+  for _ in range(100):
+    xErrors, zErrors = rng.random((2, 9)) < 0.2
+    errors = [(int(qubit), 'X') for qubit in np.flatnonzero(xErrors)] + \
+             [(int(qubit), 'Z') for qubit in np.flatnonzero(zErrors)]
+    assert decoder.failures(xErrors[None], zErrors[None])[0] == (not statevec_sim.isCorrected(errors))
+
+
+def test_steane_code():
+  decoder = CSSDecoder(STEANE_CHECKS, STEANE_CHECKS, STEANE_LOGICAL, STEANE_LOGICAL)
+  patterns = _patterns(7, 2)
+  errors = errorMasks(patterns, 7)
+  none = np.zeros_like(errors)
+  weights = errors.sum(axis=1)
+  for xErrors, zErrors in [(errors, none), (none, errors), (errors, errors)]:
+    failures = decoder.failures(xErrors, zErrors)
+    assert not failures[weights <= 1].any()
+    assert failures[weights == 2].all()
+  xSyndromes, zSyndromes = decoder.syndromes(errors, errors)
+  xCorrections, zCorrections = decoder.corrections(xSyndromes, zSyndromes)
+  assert not decoder.syndromes(errors ^ xCorrections, errors ^ zCorrections)[0].any()
+  assert np.array_equal(decoder.failuresPacked(packErrors(errors), packErrors(none)), decoder.failures(errors, none))
+
+
+def test_too_many_checks():
+  with pytest.raises(ValueError):
+    CSSDecoder(np.eye(30, dtype=bool), np.eye(30, dtype=bool), np.ones(30, dtype=bool), np.ones(30, dtype=bool))
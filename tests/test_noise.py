@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from shor_common import density_sim, noise
+from shor_common.verification import wilsonInterval
+
+# The Monte-Carlo noise engine: batching, intervals and agreement with the
+# exact density-matrix evaluation.
+
+INPUT = {'theta': 1.1, 'phi': 2.3}
+
+
+def test_memory_batches_do_not_change_fidelities():
+  fidelities = [noise.noisyFidelities(INPUT, 'depolarizing', 0.1, 2000, rng=np.random.default_rng(5), batchSize=size)
+                for size in (1, 7, 4096)]
+  assert np.allclose(fidelities[0], fidelities[1]) and np.allclose(fidelities[0], fidelities[2])
+
+
+def test_no_noise_no_infidelity():
+  mean, low, high = noise.logicalInfidelity(INPUT, 'depolarizing', 0.0, 500, rng=np.random.default_rng(5))
+  assert mean == 0.0 and low == 0.0
+  # No failure in 500 trajectories does not make the infidelity certainly zero.
+  assert 0.0 < high <= 1.96 ** 2 / 500
+  assert noise.logicalFailureRate(INPUT, 'bitflip', 0.0, 500, rng=np.random.default_rng(5))[:2] == (0, 0.0)
+
+
+@pytest.mark.parametrize('channel,nbTrajectories', [('depolarizing', 20000), ('bitflip', 20000),
+                                                    ('amplitudedamping', 2000)])
+def test_mean_infidelity_matches_density_matrix(channel, nbTrajectories):
+  p = 0.1
+  mean, low, high = noise.logicalInfidelity(INPUT, channel, p, nbTrajectories, rng=np.random.default_rng(5), z=4)
+  exact = 1 - density_sim.logicalFidelity(INPUT, channel, p)
+  assert low <= mean <= high
+  assert low <= exact <= high
+
+
+def test_mean_interval_of_binary_samples_is_wilson():
+  samples = np.zeros(400)
+  samples[:30] = 1
+  assert noise.meanInterval(samples)[1:] == pytest.approx(wilsonInterval(30, 400))
+
+
+def test_failure_rate_interval():
+  failures, rate, low, high = noise.logicalFailureRate(INPUT, 'depolarizing', 0.2, 4000,
+                                                       rng=np.random.default_rng(5))
+  assert rate == failures / 4000
+  assert low < rate < high
@@ -0,0 +1,82 @@
+import sys
+import types
+
+import pytest
+
+from shor_common.backends import BACKENDS
+from shor_common.qlm_session import QLMSession
+
+# QLMSession against a stand-in for the qat package, which is not public.
+
+
+class _Result:
+  def __init__(self, state, amplitude):
+    self.state = state
+    self.amplitude = amplitude
+    self.probability = abs(amplitude) ** 2
+
+
+class _Program:
+  def to_circ(self, name):
+    return ('circ', name)
+
+
+@pytest.fixture
+def fakeQat(monkeypatch):
+  record = {'servers': [], 'written': [], 'attached': []}
+
+  class Server:
+    def __init__(self, simulator, handlers):
+      record['servers'].append(self)
+
+  class Task:
+    def __init__(self, circuit):
+      self.circuit = circuit
+
+    def attach(self, server):
+      record['attached'].append(server)
+
+    def states(self, qubits):
+      # |10...0> with amplitude 1.
+      return [_Result([qubit == 0 for qubit in qubits], 1.0)]
+
+  modules = {'qat': {}, 'qat.linalg': {'LinAlg': object}, 'qat.core': {},
+             'qat.core.qpu': {'Server': Server}, 'qat.core.qpu.agent': {'GenericAgent': object},
+             'qat.core.qpu.stateanalyzer': {'StateAnalyzer': object}, 'qat.core.task': {'Task': Task},
+             'qat.core.circ': {'writecirc': lambda circuit, fileName: record['written'].append((circuit, fileName))}}
+  for name, attributes in modules.items():
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    monkeypatch.setitem(sys.modules, name, module)
+  for name in modules:
+    if '.' in name:
+      parent, child = name.rsplit('.', 1)
+      setattr(sys.modules[parent], child, sys.modules[name])
+  return record
+
+
+def test_circ_files_only_in_debug(fakeQat, tmp_path):
+  QLMSession(3).run(_Program())
+  assert fakeQat['written'] == []
+  circFile = str(tmp_path / 'debug.circ')
+  QLMSession(3, debug=True, circFile=circFile).run(_Program())
+  assert fakeQat['written'] == [(('circ', 'error_correction_3'), circFile)]
+
+
+def test_one_server_across_batches(fakeQat):
+  session = QLMSession(3)
+  for _ in range(3):
+    results = session.runBatch([_Program(), _Program()])
+    assert [result[0].state for result in results] == [[True, False, False]] * 2
+  assert len(fakeQat['servers']) == 1
+  assert fakeQat['attached'] == [session.server] * 6
+
+
+def test_backend_reuses_its_session(fakeQat):
+  backend = BACKENDS['qlm']
+  context = backend.warmUp()
+  for _ in range(3):
+    kind, state, littleEndian = backend.run(context, ('circ', 'error_correction_3'), 3)
+    assert kind == 'statevector' and not littleEndian
+    assert list(state) == [0, 0, 0, 0, 1, 0, 0, 0]
+  assert len(fakeQat['servers']) == 1
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from shor_common import circuit_ir, quantum_inspire
+from shor_common.quantum_inspire import LocalQuantumInspire, executeAll
+
+# Concurrent submission with retries, against a fake API, and the offline
+# stand-in for Quantum Inspire.
+
+
+class _FlakyApi:
+  # Fails the first nbFailures calls of every program, then returns it.
+  def __init__(self, nbFailures=0, latency=0.0):
+    self.nbFailures = nbFailures
+    self.latency = latency
+    self.calls = {}
+    self.inFlight = 0
+    self.maxInFlight = 0
+    self._lock = threading.Lock()
+
+  def execute_qasm(self, qasm, backend_type=None, number_of_shots=1):
+    with self._lock:
+      self.calls[qasm] = self.calls.get(qasm, 0) + 1
+      attempt = self.calls[qasm]
+      self.inFlight += 1
+      self.maxInFlight = max(self.maxInFlight, self.inFlight)
+    time.sleep(self.latency)
+    with self._lock:
+      self.inFlight -= 1
+    if attempt <= self.nbFailures:
+      raise ConnectionError("busy")
+    return {'qasm': qasm, 'shots': number_of_shots}
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+  # Backoff delays, recorded instead of slept, without jitter.
+  delays = []
+  async def sleep(delay):
+    delays.append(delay)
+  monkeypatch.setattr(quantum_inspire.asyncio, 'sleep', sleep)
+  monkeypatch.setattr(quantum_inspire.random, 'random', lambda: 0.5)
+  return delays
+
+
+def test_results_in_submission_order():
+  qasms = [str(index) for index in range(20)]
+  arrived = []
+  results = executeAll(_FlakyApi(latency=0.001), qasms, 'backend', 3, onResult=lambda index, _: arrived.append(index))
+  assert results == [{'qasm': qasm, 'shots': 3} for qasm in qasms]
+  assert sorted(arrived) == list(range(20))
+
+
+def test_retries_with_exponential_backoff(sleeps):
+  api = _FlakyApi(nbFailures=3)
+  results = executeAll(api, ['a'], 'backend', retries=3, backoff=0.5, maxBackoff=1.5)
+  assert results == [{'qasm': 'a', 'shots': 1}]
+  assert api.calls == {'a': 4}
+  assert sleeps == [0.5, 1.0, 1.5]
+
+
+def test_failure_after_the_last_retry(sleeps):
+  api = _FlakyApi(nbFailures=3)
+  results = executeAll(api, ['a', 'b'], 'backend', retries=2)
+  assert all(isinstance(result, ConnectionError) for result in results)
+  assert api.calls == {'a': 3, 'b': 3}
+
+
+def test_in_flight_jobs_are_capped():
+  api = _FlakyApi(latency=0.01)
+  executeAll(api, [str(index) for index in range(40)], 'backend', maxInFlight=4)
+  assert api.maxInFlight == 4
+
+
+def test_local_quantum_inspire_histogram():
+  ops = [('H', 0), ('CNOT', 0, 2), ('X', 1)]
+  qi = LocalQuantumInspire(rng=np.random.default_rng(3))
+  backendType = qi.get_backend_type_by_name('QX single-node simulator')
+  result = qi.execute_qasm(circuit_ir.toCQASM(ops, 3), backend_type=backendType)
+  # Qubit 0 is the least significant bit of the keys: |010> and |111>.
+  assert result['histogram'] == pytest.approx({'2': 0.5, '7': 0.5})
+  sampled = qi.execute_qasm(circuit_ir.toCQASM(ops, 3), backend_type=backendType, number_of_shots=1000)
+  assert set(sampled['histogram']) == {'2', '7'}
+  assert sum(sampled['histogram'].values()) == pytest.approx(1)
+
+
+def test_local_quantum_inspire_failures_are_retried(sleeps):
+  qi = LocalQuantumInspire(failureRate=0.5, rng=np.random.default_rng(3))
+  qasms = [circuit_ir.toCQASM([('X', 0)], 1)] * 20
+  results = executeAll(qi, qasms, qi.get_backend_type_by_name('QX single-node simulator'), retries=10)
+  assert all(result['histogram'] == {'1': 1.0} for result in results)
+  assert sleeps
@@ -0,0 +1,104 @@
+import os
+import sys
+import types
+
+import pytest
+
+from shor_common.qubiter_pipeline import QubiterPipeline
+
+# QubiterPipeline's segment files, against a stand-in for Qubiter, which is
+# not installed.
+
+
+@pytest.fixture
+def fakeQubiter(monkeypatch):
+  # SEO_writer writes one English line per gate; SEO_simulator appends the
+  # prefix of each segment it runs to the state.
+  class SEO_writer:
+    def __init__(self, prefix, embedder, english_out, picture_out):
+      self.english = english_out
+      self.picture = picture_out
+
+    def _write(self, *line):
+      self.english.write(' '.join(str(part) for part in line) + '\n')
+      self.picture.write(line[0] + '\n')
+
+    def write_H(self, bit):
+      self._write('HAD2', bit)
+
+    def write_X(self, bit):
+      self._write('SIGX', bit)
+
+    def write_Y(self, bit):
+      self._write('SIGY', bit)
+
+    def write_Z(self, bit):
+      self._write('SIGZ', bit)
+
+    def write_cnot(self, control_bit, target_bit):
+      self._write('SIGX', target_bit, 'IF', control_bit)
+
+  class SEO_simulator:
+    def __init__(self, prefix, nbqubits, state):
+      self.cur_st_vec_dict = {'pure': state + [os.path.basename(prefix)]}
+
+  class StateVec:
+    @staticmethod
+    def get_standard_basis_st_vec(bits):
+      return []
+
+  modules = {'SEO_writer': {'SEO_writer': SEO_writer, 'CktEmbedder': lambda *sizes: None},
+             'SEO_simulator': {'SEO_simulator': SEO_simulator}, 'StateVec': {'StateVec': StateVec},
+             'Controls': {'Controls': object}, 'OneBitGates': {'OneBitGates': object}}
+  for name, attributes in modules.items():
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    monkeypatch.setitem(sys.modules, name, module)
+
+
+@pytest.fixture
+def writes(monkeypatch):
+  written = []
+  write = QubiterPipeline._write
+  def record(self, path, text):
+    written.append(os.path.basename(path))
+    write(self, path, text)
+  monkeypatch.setattr(QubiterPipeline, '_write', record)
+  return written
+
+
+def test_segments_are_named_by_their_english(fakeQubiter, tmp_path):
+  pipeline = QubiterPipeline(3, str(tmp_path))
+  prefix = pipeline.segment([('H', 0), ('CNOT', 0, 1)])
+  assert prefix == pipeline.segment([('H', 0), ('CNOT', 0, 1)])
+  assert prefix != pipeline.segment([('H', 0), ('CNOT', 0, 2)])
+  with open(prefix + '_3_ZLeng.txt') as f:
+    assert f.read() == pipeline.english([('H', 0), ('CNOT', 0, 1)])[0]
+  # Another pipeline, in another process, finds the same file.
+  assert QubiterPipeline(3, str(tmp_path)).segment([('H', 0), ('CNOT', 0, 1)]) == prefix
+
+
+def test_segments_are_written_once(fakeQubiter, writes, tmp_path):
+  pipeline = QubiterPipeline(3, str(tmp_path))
+  for _ in range(3):
+    pipeline.segment([('H', 0)])
+    pipeline.segment([('X', 2)])
+  assert len(writes) == 2
+  QubiterPipeline(3, str(tmp_path)).segment([('H', 0)])
+  assert len(writes) == 2
+  assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+
+
+def test_pictures_only_in_debug(fakeQubiter, tmp_path):
+  QubiterPipeline(3, str(tmp_path)).segment([('H', 0)])
+  assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('_ZLpic.txt')]
+  QubiterPipeline(3, str(tmp_path), debug=True).segment([('H', 0)])
+  assert len([name for name in os.listdir(str(tmp_path)) if name.endswith('_ZLpic.txt')]) == 1
+
+
+def test_run_chains_segments(fakeQubiter, tmp_path):
+  pipeline = QubiterPipeline(3, str(tmp_path))
+  segments = [[('H', 0)], [], [('X', 1)], [('H', 0)]]
+  state = pipeline.run(segments)
+  assert state == [os.path.basename(pipeline.segment(ops)) for ops in segments if ops]
+  assert state[0] == state[2]
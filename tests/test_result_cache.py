@@ -0,0 +1,79 @@
+import concurrent.futures
+import os
+import threading
+
+from shor_common import circuit_ir, result_cache
+from shor_common.quantum_inspire import LocalQuantumInspire, executeAll
+from shor_common.result_cache import CachedQuantumInspire, ResultCache, cacheKey
+
+
+def test_get_put_roundtrip(tmp_path):
+  cache = ResultCache(str(tmp_path))
+  key = cacheKey('H q[0]\n', 'numpy')
+  assert cache.get(key) is None
+  cache.put(key, ('statevector', [1, 0], False))
+  assert cache.get(key) == ('statevector', [1, 0], False)
+
+
+def test_concurrent_writes_of_one_key(tmp_path):
+  cache = ResultCache(str(tmp_path))
+  key = cacheKey('X q[0]\n', 'numpy')
+  start = threading.Barrier(16)
+
+  def write(value):
+    start.wait()
+    for _ in range(20):
+      cache.put(key, value)
+    return value
+
+  with concurrent.futures.ThreadPoolExecutor(16) as executor:
+    written = list(executor.map(write, range(16)))
+  assert cache.get(key) in written
+  assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+
+
+def test_eviction_keeps_size_within_budget(tmp_path, monkeypatch):
+  monkeypatch.setattr(result_cache, 'EVICT_INTERVAL', 1000)
+  cache = ResultCache(str(tmp_path), maxBytes=4000)
+  for index in range(100):
+    cache.put(cacheKey(str(index), 'numpy'), bytes(200))
+  total = sum(os.path.getsize(os.path.join(str(tmp_path), name)) for name in os.listdir(str(tmp_path)))
+  assert total <= 4000
+  assert cache.get(cacheKey('99', 'numpy')) == bytes(200)
+
+
+class _CountingApi(LocalQuantumInspire):
+  def __init__(self):
+    super().__init__(latency=0.01)
+    self.calls = 0
+    self._callsLock = threading.Lock()
+
+  def execute_qasm(self, qasm, backend_type=None, number_of_shots=1):
+    with self._callsLock:
+      self.calls += 1
+    return super().execute_qasm(qasm, backend_type=backend_type, number_of_shots=number_of_shots)
+
+
+def test_cached_quantum_inspire_under_submit_all(tmp_path):
+  programs = [circuit_ir.toCQASM([('H', 0), ('CNOT', 0, 1)], 2), circuit_ir.toCQASM([('X', 1)], 2)]
+  qasms = [programs[index % 2] for index in range(80)]
+  api = _CountingApi()
+  cached = CachedQuantumInspire(api, ResultCache(str(tmp_path)))
+  results = executeAll(cached, qasms, api.get_backend_type_by_name('QX single-node simulator'), maxInFlight=16,
+                       retries=0)
+  assert not [result for result in results if isinstance(result, Exception)]
+  assert api.calls == 2
+  assert results[0] == results[2] and results[1] == results[3]
+
+
+def test_cached_quantum_inspire_keeps_a_fixed_lock_pool(tmp_path):
+  # More programs than locks: each is still submitted exactly once.
+  qasms = [circuit_ir.toCQASM([('RX', 0, 0.01 * index)], 1) for index in range(40)] * 2
+  api = _CountingApi()
+  cached = CachedQuantumInspire(api, ResultCache(str(tmp_path)), stripes=4)
+  results = executeAll(cached, qasms, api.get_backend_type_by_name('QX single-node simulator'), maxInFlight=16,
+                       retries=0)
+  assert not [result for result in results if isinstance(result, Exception)]
+  assert api.calls == 40
+  assert results[:40] == results[40:]
+  assert len(cached._keyLocks) == 4
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from shor_common.sampling import ShotSampler, probabilitiesOf, extractBits
+
+# Shots drawn from one simulation against the exact probabilities.
+
+SHOTS = 200000
+
+
+def _within(counts, probabilities, shots, sigmas=5):
+  # Every frequency within a few binomial standard deviations of its probability.
+  spread = sigmas * np.sqrt(probabilities * (1 - probabilities) / shots) + 1e-12
+  return np.all(np.abs(counts / shots - probabilities) <= spread)
+
+
+def _exactMarginal(probabilities, qubit, nbqubits, littleEndian):
+  axis = nbqubits - 1 - qubit if littleEndian else qubit
+  others = tuple(other for other in range(nbqubits) if other != axis)
+  return np.sum(probabilities.reshape((2,) * nbqubits), axis=others)
+
+
+def test_counts_match_probabilities(rng, randomState):
+  probabilities = probabilitiesOf(randomState(4))
+  counts = ShotSampler(probabilities, 4, rng=rng).counts(SHOTS)
+  assert counts.sum() == SHOTS
+  assert _within(counts, probabilities, SHOTS)
+
+
+@pytest.mark.parametrize('littleEndian', [False, True])
+def test_shots_and_qubit_counts_match_marginals(rng, randomState, littleEndian):
+  nbqubits = 4
+  sampler = ShotSampler.fromState(randomState(nbqubits), nbqubits, littleEndian, rng)
+  bits = sampler.bits(SHOTS)
+  for qubit in range(nbqubits):
+    exact = _exactMarginal(sampler.probabilities, qubit, nbqubits, littleEndian)
+    ones = np.sum(bits[:, qubit])
+    assert _within(np.array([SHOTS - ones, ones]), exact, SHOTS)
+    assert _within(sampler.qubitCounts(SHOTS, qubit), exact, SHOTS)
+
+
+def test_extract_bits_orders():
+  # Basis index 0b0011 on four qubits.
+  assert extractBits([3], 4).tolist() == [[False, False, True, True]]
+  assert extractBits([3], 4, littleEndian=True).tolist() == [[True, True, False, False]]
+  assert extractBits([3], 4, qubits=[3, 0]).tolist() == [[True, False]]
+
+
+def test_samples_are_reproducible(randomState):
+  probabilities = probabilitiesOf(randomState(3))
+  first = ShotSampler(probabilities, 3, rng=np.random.default_rng(7)).shots(100)
+  second = ShotSampler(probabilities, 3, rng=np.random.default_rng(7)).shots(100)
+  assert np.array_equal(first, second)
+
+
+def test_only_statevector_results_are_sampled():
+  with pytest.raises(ValueError):
+    ShotSampler.fromResult(('probabilities', 0.5, 0.5), 1)
@@ -0,0 +1,71 @@
+import copy
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import CLIFFORD_GATES, referenceState, sameUpToPhase
+from shor_common import shor_syndrome_code, statevec_sim
+from shor_common.stabilizer_sim import PauliFrame, Tableau, runOps
+
+# The stabilizer simulators against the dense engine on random Clifford circuits.
+
+
+def _probabilityOfOne(state, qubit, nbqubits):
+  bits = (np.arange(len(state)) >> (nbqubits - 1 - qubit)) & 1
+  return float(np.sum(np.abs(state[bits == 1]) ** 2))
+
+
+@pytest.mark.parametrize('nbqubits', [2, 4, 6])
+def test_tableau_measurements_match_statevector(nbqubits, rng, randomOps):
+  for _ in range(20):
+    ops = randomOps(nbqubits, 40, CLIFFORD_GATES)
+    tableau = Tableau(nbqubits, rng)
+    runOps(tableau, ops)
+    state = referenceState(ops, nbqubits)
+    for qubit in range(nbqubits):
+      p1 = _probabilityOfOne(state, qubit, nbqubits)
+      outcome, deterministic = copy.deepcopy(tableau).measure(qubit)
+      if deterministic:
+        assert p1 == pytest.approx(outcome, abs=1e-9)
+      else:
+        assert p1 == pytest.approx(0.5, abs=1e-9)
+
+
+@pytest.mark.parametrize('nbqubits', [3, 5])
+def test_pauli_frame_propagates_errors_like_statevector(nbqubits, rng, randomOps, randomState):
+  # An error E before the circuit C equals C E C^dagger after it; the frame
+  # holds that Pauli.
+  batchSize = 8
+  errors = rng.integers(2, size=(2, batchSize, nbqubits)).astype(bool)
+  ops = randomOps(nbqubits, 40, CLIFFORD_GATES)
+  frame = PauliFrame(nbqubits, batchSize)
+  for qubit in range(nbqubits):
+    frame.injectX(qubit, errors[0, :, qubit])
+    frame.injectZ(qubit, errors[1, :, qubit])
+  runOps(frame, ops)
+  psi = randomState(nbqubits)
+  ideal = referenceState(ops, nbqubits, psi)
+  for pattern in range(batchSize):
+    xMask = statevec_sim.qubitMask(np.flatnonzero(errors[0, pattern]), nbqubits)
+    zMask = statevec_sim.qubitMask(np.flatnonzero(errors[1, pattern]), nbqubits)
+    errored = referenceState(ops, nbqubits, statevec_sim.applyPauliLayer(psi, xMask, zMask))
+    xMask = statevec_sim.qubitMask(np.flatnonzero(frame.x[pattern]), nbqubits)
+    zMask = statevec_sim.qubitMask(np.flatnonzero(frame.z[pattern]), nbqubits)
+    assert sameUpToPhase(errored, statevec_sim.applyPauliLayer(ideal, xMask, zMask))
+
+
+def test_logical_failures_match_tableau_runs(rng):
+  patterns = [()] + [(qubit,) for qubit in range(9)] + list(itertools.combinations(range(9), 2))
+  failures = shor_syndrome_code.logicalFailures(patterns)
+  for errorIdxs, failed in zip(patterns, failures):
+    corrected = [shor_syndrome_code.runSyndromeCode(label, errorIdxs, rng=rng)[1] for label in ('0', '+')]
+    assert failed == (not all(corrected))
+
+
+def test_logical_failures_match_statevector_correction():
+  patterns = [()] + [(qubit,) for qubit in range(9)] + list(itertools.combinations(range(9), 2))
+  failures = shor_syndrome_code.logicalFailures(patterns)
+  corrected = [statevec_sim.isCorrected(errorIdxs) for errorIdxs in patterns]
+  assert not failures[:10].any()
+  assert list(failures) == [not ok for ok in corrected]
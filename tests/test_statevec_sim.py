@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from conftest import referenceState
+from shor_common import circuit_opt, statevec_sim
+
+# The permutation and diagonal fast paths of applyOps against gate-by-gate
+# simulation, and the bound on the permutation cache.
+
+CLASSICAL_GATES = ('X', 'Z', 'S', 'RZ', 'CNOT', 'CCNOT')
+
+
+@pytest.mark.parametrize('nbqubits', [3, 6])
+@pytest.mark.parametrize('gates', [CLASSICAL_GATES, CLASSICAL_GATES + ('H', 'RX')])
+def test_apply_ops_matches_gate_by_gate(nbqubits, gates, randomOps, randomState):
+  for _ in range(20):
+    ops = circuit_opt.mergeFans(randomOps(nbqubits, 30, gates))
+    psi = randomState(nbqubits)
+    state = psi.copy()
+    statevec_sim.applyOps(state, ops)
+    assert np.allclose(state, referenceState(ops, nbqubits, psi))
+
+
+def test_apply_ops_on_a_batch(randomOps, randomState):
+  ops = randomOps(4, 40, CLASSICAL_GATES + ('H',))
+  batch = np.array([randomState(4) for _ in range(5)])
+  expected = np.array([referenceState(ops, 4, psi) for psi in batch])
+  statevec_sim.applyOps(batch, ops)
+  assert np.allclose(batch, expected)
+
+
+def test_fallback_above_classical_max_qubits(monkeypatch, randomOps, randomState):
+  monkeypatch.setattr(statevec_sim, 'CLASSICAL_MAX_QUBITS', 2)
+  statevec_sim.clearPermutationCache()
+  ops = randomOps(4, 30, CLASSICAL_GATES)
+  psi = randomState(4)
+  state = psi.copy()
+  statevec_sim.applyOps(state, ops)
+  assert np.allclose(state, referenceState(ops, 4, psi))
+  assert not statevec_sim._permutationCache
+
+
+def test_permutation_cache_is_bounded_and_ignores_angles(monkeypatch, randomOps, rng):
+  monkeypatch.setattr(statevec_sim, 'PERMUTATION_CACHE_SIZE', 4)
+  statevec_sim.clearPermutationCache()
+  state = statevec_sim.zeroState(5)
+  for _ in range(50):
+    ops = randomOps(5, 6, ('X', 'CNOT', 'CCNOT'))
+    ops += [('RZ', int(rng.integers(5)), float(rng.uniform(0, 2 * np.pi))) for _ in range(3)]
+    statevec_sim.applyOps(state, ops)
+    assert len(statevec_sim._permutationCache) <= 4
+  assert all(name in statevec_sim.PERMUTATION_OPS for _, ops in statevec_sim._permutationCache for name, *_ in ops)
+  statevec_sim.clearPermutationCache()
+
+
+def test_compiled_code_matches_run_code():
+  patterns = [(), (0,), (4,), (2, 7), ((3, 'X'), (5, 'Z'))]
+  compiled = statevec_sim.runErrorSweepCompiled(patterns)
+  for errorIdxs, out in zip(patterns, compiled):
+    state = np.zeros((2, 2 ** 9), dtype=complex)
+    state[0, 0] = state[1, 2 ** 8] = 1
+    statevec_sim.EncodeCircuit(state)
+    statevec_sim.applyOps(state, [(pauli, qubit) for qubit, pauli in
+                                  [(err, 'X') if isinstance(err, int) else err for err in errorIdxs] +
+                                  [(err, 'Z') for err in errorIdxs if isinstance(err, int)]])
+    statevec_sim.DecodeCircuit(state)
+    assert np.allclose(out, state)
+
+
+def test_compiled_code_is_read_only():
+  codewords, stages = statevec_sim.compiledCode()
+  with pytest.raises(ValueError):
+    codewords[0, 0] = 0
+  assert all(not stage[1].flags.writeable for stage in stages if stage[0] == 'GATHER')
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from shor_common import circuit_ir, statevec_sim
+from shor_common.statevec_util import stateForInput, statesForInputs, sameState, compareStates, splitDataQubit
+
+from conftest import sameUpToPhase
+
+# State comparison, and extracting the data qubit from full statevectors in
+# either qubit order.
+
+
+def _littleEndian(state, nbqubits):
+  # Qiskit order: qubit 0 is the least significant bit of the basis index.
+  return state.reshape((2,) * nbqubits).transpose().reshape(-1)
+
+
+def test_compare_states_ignores_global_phase():
+  expected = stateForInput(1.2, 0.4)
+  fidelity, globalPhase, passed = compareStates(expected, np.exp(0.9j) * np.array(expected))
+  assert passed[0] and fidelity[0] == pytest.approx(1)
+  assert globalPhase[0] == pytest.approx(0.9)
+
+
+def test_compare_states_catches_a_mismatch():
+  expected = stateForInput(1.2, 0.4)
+  # A relative phase is not a global one.
+  fidelity, _, passed = compareStates(expected, np.array(expected) * [1, 1j])
+  assert not passed[0] and fidelity[0] < 1 - 1e-3
+  fidelity, _, passed = compareStates(expected, stateForInput(1.2 + 1e-3, 0.4))
+  assert not passed[0] and fidelity[0] == pytest.approx(1)
+
+
+def test_compare_states_agrees_with_same_state(rng, randomState):
+  thetas = rng.uniform(0, np.pi, 50)
+  phis = rng.uniform(0, 2 * np.pi, 50)
+  expected = statesForInputs(thetas, phis)
+  obtained = expected * np.exp(1j * rng.uniform(0, 2 * np.pi, (50, 1)))
+  # sameState raises when the amplitudes' magnitudes differ, so the
+  # mismatches are relative phases.
+  obtained[::3, 1] *= np.exp(0.5j)
+  obtained[1::5, 1] *= -1
+  _, _, passed = compareStates(expected, obtained)
+  assert list(passed) == [sameState(a, b) for a, b in zip(expected, obtained)]
+  assert 0 < np.sum(passed) < 50
+  # Full states of several qubits are compared the same way.
+  states = np.array([randomState(3) for _ in range(4)])
+  _, _, passed = compareStates(states, np.stack([states[0] * 1j, states[1], states[0], -states[3]]))
+  assert list(passed) == [True, True, False, True]
+
+
+def test_split_data_qubit_of_a_product_state(randomState):
+  data = randomState(1)
+  rest = randomState(3)
+  amplitudes, remainder = splitDataQubit(np.kron(data, rest))
+  assert sameUpToPhase(data, amplitudes)
+  assert np.allclose(np.kron(amplitudes, remainder), np.kron(data, rest))
+  # The same state in Qiskit order has the data qubit as the last factor.
+  amplitudes, remainder = splitDataQubit(_littleEndian(np.kron(data, rest), 4), littleEndian=True)
+  assert sameUpToPhase(data, amplitudes)
+  assert np.allclose(np.kron(remainder, amplitudes), _littleEndian(np.kron(data, rest), 4))
+
+
+def test_split_data_qubit_of_a_qiskit_ordered_decode():
+  inputValue = {'theta': 2.1, 'phi': 0.7}
+  nbqubits = 9
+  for errorIdxs in [(), (4,)]:
+    state = statevec_sim.zeroState(nbqubits)
+    statevec_sim.applyOps(state, circuit_ir.createProgram(inputValue, errorIdxs))
+    amplitudes, _ = splitDataQubit(_littleEndian(state, nbqubits), 0, littleEndian=True)
+    assert sameUpToPhase(np.array(stateForInput(inputValue['theta'], inputValue['phi'])), amplitudes)
+    # Read in the wrong order, qubit 0 is an ancilla.
+    amplitudes, _ = splitDataQubit(_littleEndian(state, nbqubits), 0)
+    assert not sameUpToPhase(np.array(stateForInput(inputValue['theta'], inputValue['phi'])), amplitudes)
@@ -0,0 +1,80 @@
+import itertools
+import json
+import time
+
+import pytest
+
+from shor_common import statevec_sim
+from shor_common.sweep import errorPatterns, patternCount, runSweep, sweepErrorWeights
+
+# The parallel sweep, pattern streaming and checkpoint resume.
+
+
+def _warmUp():
+  return 'ready'
+
+
+def _job(context, inputValue, errorIdxs):
+  # Later jobs finish first, so the merge has to restore the order.
+  time.sleep(0.002 * (3 - len(errorIdxs)))
+  return context, inputValue['theta'], sum(errorIdxs)
+
+
+def test_run_sweep_keeps_job_order():
+  inputValues = [{'theta': theta} for theta in range(3)]
+  allErrorIdxs = [()] + [(qubit,) for qubit in range(5)] + list(itertools.combinations(range(5), 2))
+  expected = [(inputValue, errorIdxs, ('ready', inputValue['theta'], sum(errorIdxs)))
+              for inputValue, errorIdxs in itertools.product(inputValues, allErrorIdxs)]
+  assert runSweep(_job, inputValues, allErrorIdxs, warmUp=_warmUp, maxWorkers=1) == expected
+  assert runSweep(_job, inputValues, allErrorIdxs, warmUp=_warmUp, maxWorkers=3, chunkSize=4) == expected
+
+
+def test_error_patterns_start():
+  everything = list(errorPatterns(4, 3, 'XZ'))
+  assert len(everything) == sum(patternCount(4, weight, 'XZ') for weight in range(4))
+  assert [position for position, _, _ in everything] == list(range(len(everything)))
+  for start in (0, 1, 8, 9, 10, 33, len(everything) - 1, len(everything)):
+    assert list(errorPatterns(4, 3, 'XZ', start)) == everything[start:]
+
+
+class _Interrupted(Exception):
+  pass
+
+
+class _Corrected:
+  # isCorrected for the Shor code that can be made to stop after a number of calls.
+  def __init__(self, interruptAfter=None):
+    self.interruptAfter = interruptAfter
+
+  def __call__(self, pattern):
+    if self.interruptAfter is not None:
+      if self.interruptAfter == 0:
+        raise _Interrupted()
+      self.interruptAfter -= 1
+    return statevec_sim.isCorrected(pattern)
+
+
+@pytest.mark.parametrize('stopAtFirstFailure', [False, True])
+def test_checkpoint_resume_matches_uninterrupted_run(tmp_path, stopAtFirstFailure):
+  expected = sweepErrorWeights(_Corrected(), 9, 2, stopAtFirstFailure=stopAtFirstFailure)
+  checkpointFile = str(tmp_path / 'sweep.json')
+  for interruptAfter in (17, 10):
+    with pytest.raises(_Interrupted):
+      sweepErrorWeights(_Corrected(interruptAfter), 9, 2, stopAtFirstFailure=stopAtFirstFailure,
+                        checkpointFile=checkpointFile, checkpointEvery=5)
+    with open(checkpointFile) as f:
+      assert json.load(f)['position'] > 0
+  assert sweepErrorWeights(_Corrected(), 9, 2, stopAtFirstFailure=stopAtFirstFailure,
+                           checkpointFile=checkpointFile, checkpointEvery=5) == expected
+
+
+def test_checkpoint_of_another_sweep_is_refused(tmp_path):
+  checkpointFile = str(tmp_path / 'sweep.json')
+  sweepErrorWeights(_Corrected(), 9, 1, checkpointFile=checkpointFile)
+  for kwargs in ({'nbqubits': 9, 'maxWeight': 2}, {'nbqubits': 9, 'maxWeight': 1, 'paulis': 'XZ'},
+                 {'nbqubits': 8, 'maxWeight': 1}):
+    with pytest.raises(ValueError):
+      sweepErrorWeights(_Corrected(), checkpointFile=checkpointFile, **kwargs)
+  with pytest.raises(ValueError):
+    sweepErrorWeights(lambda pattern: True, 9, 1, checkpointFile=checkpointFile)
+  assert sweepErrorWeights(_Corrected(), 9, 1, checkpointFile=checkpointFile)[0] == {0: [1, 0], 1: [27, 0]}
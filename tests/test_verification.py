@@ -0,0 +1,54 @@
+import pytest
+
+from shor_common.verification import wilsonInterval, zScore, minimumShots, frequencyVerdict, sequentialTest
+
+# The statistical pass criterion of the sampled scripts.
+
+
+def test_wilson_interval_covers_the_rate():
+  assert wilsonInterval(0, 0) == (0.0, 1.0)
+  low, high = wilsonInterval(0, 100)
+  assert low == 0.0 and 0 < high < 0.05
+  low, high = wilsonInterval(50, 100)
+  assert low < 0.5 < high
+  assert high - 0.5 == pytest.approx(0.5 - low)
+
+
+def test_minimum_shots_narrows_the_interval():
+  shots = minimumShots(0.05)
+  z = zScore(0.99)
+  low, high = wilsonInterval(shots // 2, shots, z)
+  assert high - low <= 0.1
+  low, high = wilsonInterval((shots - 1) // 2, shots - 1, z)
+  assert high - low > 0.1
+
+
+@pytest.mark.parametrize('ones, shots, verdict', [(0, 1000, True), (1000, 1000, False), (20, 1000, True),
+                                                  (150, 1000, False), (3, 30, None), (60, 1000, None)])
+def test_frequency_verdict(ones, shots, verdict):
+  # Expected probability 0, within 0.05.
+  assert frequencyVerdict(ones, shots, 0.0) is verdict
+
+
+@pytest.mark.parametrize('probability', [0.0, 0.2, 0.5, 1.0])
+def test_sequential_test_rarely_fails_a_correct_run(rng, probability):
+  confidence = 0.9
+  runs = [sequentialTest(lambda shots: rng.binomial(shots, probability), probability, confidence=confidence)
+          for _ in range(500)]
+  falseFails = sum(passed is not True for passed, _, _ in runs)
+  assert falseFails <= (1 - confidence) * len(runs)
+  assert all(shots <= 4096 for _, shots, _ in runs)
+
+
+def test_sequential_test_catches_a_wrong_run(rng):
+  runs = [sequentialTest(lambda shots: rng.binomial(shots, 0.7), 0.5) for _ in range(100)]
+  assert all(passed is False for passed, _, _ in runs)
+  # A deterministic outcome that is wrong is caught in the first batch.
+  passed, shots, _ = sequentialTest(lambda shots: shots, 0.0)
+  assert passed is False and shots == 32
+
+
+def test_sequential_test_is_inconclusive_without_shots():
+  passed, shots, (low, high) = sequentialTest(lambda shots: shots // 2, 0.5, maxShots=64)
+  assert passed is None and shots == 64
+  assert low < 0.5 < high